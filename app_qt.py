@@ -1,9 +1,10 @@
 import os
 import sys
+import argparse
 import time
+# Import trước cv2 / PyQt5 để mốc thời gian khởi động gần lúc process bắt đầu nhất
+from src.startup import since_start, load_models, MODEL_NAMES
 import cv2
-import torch
-import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                             QWidget, QLabel, QPushButton, QTextEdit, QFrame, 
                             QGridLayout, QProgressBar, QGroupBox, QSplitter, QSizePolicy)
@@ -13,24 +14,98 @@ from PyQt5.QtGui import QImage, QPixmap, QFont, QPalette, QColor
 from src.model import StabilityDetector
 from src.text_processor import TextProcessor
 from src.frame_processor import FrameProcessor
-from src.hand_tracking import handDetector
-from src.classification import Classifier
-from src.tone_predictor import TonePredictor
+from src.capture import LatestFrameBuffer, FrameGrabber
+from src.profiler import StageProfiler
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
+PROFILE_STAGES = ('frame', 'detect', 'fast_classify', 'crop', 'classify', 'tone')
+PROFILE_UPDATE_INTERVAL = 15  # Số frame giữa hai lần cập nhật thống kê profiler
+DISPLAY_INTERVAL_MS = 33      # GUI lấy frame / trạng thái mới nhất ~30 lần mỗi giây
+
+STATUS_STYLES = {
+    'tone': """
+                QLabel {
+                    background-color: #fef9e7;
+                    color: #e67e22;
+                    font: bold 16px 'Segoe UI';
+                    padding: 8px;
+                    border-radius: 4px;
+                }
+            """,
+    'char': """
+                QLabel {
+                    background-color: #d5f4e6;
+                    color: #27ae60;
+                    font: bold 16px 'Segoe UI';
+                    padding: 8px;
+                    border-radius: 4px;
+                }
+            """,
+}
+CONFIDENCE_STYLES = {
+    'high': "color: #27ae60; font: bold 14px 'Segoe UI';",
+    'medium': "color: #f39c12; font: bold 14px 'Segoe UI';",
+    'low': "color: #e74c3c; font: bold 14px 'Segoe UI';",
+}
+
+
+def sparkline(counts):
+    """Vẽ histogram dạng chuỗi ký tự khối"""
+    blocks = "▁▂▃▄▅▆▇█"
+    peak = max(counts) if len(counts) else 0
+    if not peak:
+        return ""
+    return "".join(blocks[min(7, int(c * 7 / peak))] for c in counts)
+
+
 class VideoThread(QThread):
-    """Thread để xử lý video"""
-    frame_ready = pyqtSignal(np.ndarray)
-    status_update = pyqtSignal(dict)
+    """Thread để xử lý video.
+
+    Camera được đọc trong một luồng riêng (FrameGrabber) và chỉ giữ frame mới
+    nhất; vòng lặp suy luận luôn lấy frame mới nhất và đếm số frame cũ bị bỏ qua.
+
+    Kết quả không được đẩy sang GUI bằng signal mỗi frame (signal xếp hàng khi GUI chậm):
+    frame đã đổi sang RGB và thu nhỏ vừa display_size được ghi vào display_buffer (chỉ giữ
+    frame mới nhất), trạng thái mới nhất nằm ở self.status. GUI tự lấy theo nhịp hiển thị.
+    """
     
     def __init__(self, frame_processor):
         super().__init__()
         self.frame_processor = frame_processor
         self.cap = None
+        self.grabber = None
+        self.frame_buffer = LatestFrameBuffer()
         self.is_running = False
         self.fps = 0
         self.pTime = 0
+        self.dropped_frames = 0
+        self.latency_ms = 0.0
+        self.frame_count = 0
+        self.stage_timings = {}
+        self.display_buffer = LatestFrameBuffer()
+        self.display_size = None  # (rộng, cao) vùng hiển thị, GUI cập nhật
+        self.status = None
+        
+    def render(self, frame):
+        """BGR -> RGB thu nhỏ vừa display_size (giữ tỉ lệ), chạy trên thread xử lý thay cho GUI."""
+        size = self.display_size
+        if size:
+            height, width = frame.shape[:2]
+            scale = min(size[0] / width, size[1] / height)
+            if scale > 0 and abs(scale - 1.0) > 1e-3:
+                frame = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))),
+                                   interpolation=cv2.INTER_LINEAR)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        
+    def collect_stage_timings(self):
+        """Tổng hợp p50/p95 và histogram trượt của từng giai đoạn từ profiler"""
+        profiler = self.frame_processor.profiler
+        summary = profiler.summary()
+        for name, stats in summary.items():
+            counts, _ = profiler.histogram(name, bins=12)
+            stats['hist'] = counts.tolist()
+        return summary
         
     def start_camera(self):
         """Bắt đầu camera"""
@@ -38,51 +113,102 @@ class VideoThread(QThread):
         # self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)  # Tăng kích thước camera
         # self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
         # self.cap.set(cv2.CAP_PROP_FPS, 20)
+        # Bộ đệm riêng cho mỗi phiên: luồng đọc cũ còn kẹt không thể đóng bộ đệm của phiên mới
+        self.frame_buffer = LatestFrameBuffer()
+        self.display_buffer.reset()
+        self.status = None
+        self.dropped_frames = 0
+        self.latency_ms = 0.0
+        self.pTime = 0
+        self.grabber = FrameGrabber(self.cap, self.frame_buffer)
         self.is_running = True
+        self.grabber.start()
         self.start()
         
     def stop_camera(self):
         """Dừng camera"""
         self.is_running = False
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        self.frame_buffer.close()
         self.quit()
         self.wait()
+        if self.grabber:
+            # Camera được giải phóng sau khi luồng đọc thoát, không giải phóng giữa lúc cap.read()
+            if not self.grabber.stop(release=True):
+                print("[WARNING] Luồng đọc camera chưa dừng, camera sẽ được giải phóng khi luồng thoát")
+            self.grabber = None
+        elif self.cap:
+            self.cap.release()
+        self.cap = None
         
     def run(self):
-        """Vòng lặp chính của thread"""
-        while self.is_running and self.cap:
-            ret, frame = self.cap.read()
-            if ret:
-                # Xử lý frame
-                frame_out = self.frame_processor.process_frame(frame)
-                
-                # Tính FPS
-                cTime = time.time()
-                self.fps = 1 / (cTime - self.pTime) if self.pTime else 0
-                self.pTime = cTime
-                
-                # Emit frame
-                self.frame_ready.emit(frame_out)
-                
-                # Emit status
-                status_data = {
-                    'fps': self.fps,
-                    'status': "Nhận dấu thanh" if self.frame_processor.tone_collection else "Nhận ký tự",
-                    'tone_collection': self.frame_processor.tone_collection,
-                    'current_char': self.frame_processor.text_processor.current_word[-1] if self.frame_processor.text_processor.current_word else "",
-                    'tone_prediction': self.frame_processor.tone_predictor.current_prediction or "",
-                    'tone_confidence': self.frame_processor.tone_predictor.current_confidence or 0,
-                    'display_text': self.frame_processor.text_processor.get_display_text() or "",
-                    'prediction_threshold': self.frame_processor.tone_predictor.prediction_threshold
-                }
-                self.status_update.emit(status_data)
-                
-            self.msleep(50)  # ~20 FPS
+        """Vòng lặp suy luận: luôn xử lý frame mới nhất trong bộ đệm"""
+        last_seq = 0
+        buffer = self.frame_buffer
+        while self.is_running:
+            item = buffer.get(last_seq, timeout=0.5)
+            if item is None:
+                if buffer.closed:
+                    break
+                continue
+            seq, captured_at, frame = item
+            # Các frame bị ghi đè trước khi kịp xử lý
+            self.dropped_frames += seq - last_seq - 1
+            last_seq = seq
+
+            # Xử lý frame
+            frame_out = self.frame_processor.process_frame(frame)
+            self.latency_ms = (time.perf_counter() - captured_at) * 1000
+            
+            # Tính FPS
+            cTime = time.time()
+            self.fps = 1 / (cTime - self.pTime) if self.pTime else 0
+            self.pTime = cTime
+            
+            # Ảnh hiển thị: GUI lấy frame mới nhất từ display_buffer
+            self.display_buffer.put(self.render(frame_out), captured_at)
+            
+            # Thống kê profiler (chỉ khi bật, cập nhật thưa để giảm chi phí)
+            self.frame_count += 1
+            if self.frame_processor.profiler.enabled and self.frame_count % PROFILE_UPDATE_INTERVAL == 0:
+                self.stage_timings = self.collect_stage_timings()
+            
+            # Trạng thái mới nhất (gán một lần, GUI đọc nguyên dict)
+            self.status = {
+                'fps': self.fps,
+                'status': "Nhận dấu thanh" if self.frame_processor.tone_collection else "Nhận ký tự",
+                'tone_collection': self.frame_processor.tone_collection,
+                'current_char': self.frame_processor.text_processor.current_word[-1] if self.frame_processor.text_processor.current_word else "",
+                'tone_prediction': self.frame_processor.tone_prediction or "",
+                'tone_confidence': self.frame_processor.tone_confidence or 0,
+                'display_text': self.frame_processor.text_processor.get_display_text() or "",
+                'prediction_threshold': self.frame_processor.tone_predictor.prediction_threshold,
+                'dropped_frames': self.dropped_frames,
+                'latency_ms': self.latency_ms,
+                'stage_timings': self.stage_timings,
+                'pose_cache': self.frame_processor.pose_cache.stats() if self.frame_processor.pose_cache else {},
+                'fast_path': self.frame_processor.classifier.stats() if hasattr(self.frame_processor.classifier, 'stats') else {},
+                'detector': self.frame_processor.detector.stats() if hasattr(self.frame_processor.detector, 'stats') else {},
+                'frame_gate': self.frame_processor.frame_gate.stats() if self.frame_processor.frame_gate else {}
+            }
+
+class ModelLoader(QThread):
+    """Tải + warm-up mediapipe, Classifier và TonePredictor song song ngoài GUI thread."""
+    progress = pyqtSignal(str, int, int)  # tên mô hình, số đã xong, tổng số
+    loaded = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def run(self):
+        try:
+            models = load_models(on_progress=lambda name, elapsed, done, total: self.progress.emit(name, done, total))
+        except (Exception, SystemExit) as e:
+            # Classifier gọi exit() khi thiếu checkpoint: báo lỗi thay vì để thread chết im lặng
+            self.failed.emit(str(e) or type(e).__name__)
+            return
+        self.loaded.emit(models)
+
 
 class ModernSignLanguageQt(QMainWindow):
-    def __init__(self):
+    def __init__(self, profile=False, trace_path=None, record_path=None):
         super().__init__()
         self.setWindowTitle("Nhận Diện Ngôn Ngữ Ký Hiệu - PyQt5")
         self.setGeometry(100, 100, 1600, 900)  # Tăng kích thước cửa sổ chính
@@ -90,27 +216,81 @@ class ModernSignLanguageQt(QMainWindow):
         # Thiết lập theme
         self.setup_theme()
         
-        # Khởi tạo AI components
-        self.detector = handDetector(maxHands=1)
-        self.classifier = Classifier()
-        self.tone_predictor = TonePredictor()
+        # Profiler từng giai đoạn (tắt mặc định)
+        self.trace_path = trace_path
+        self.profiler = StageProfiler(enabled=profile or bool(trace_path), trace=bool(trace_path))
+        # Ghi log phiên landmark (.vslr) để phát lại sau
+        self.record_path = record_path
+        self.recorder = None
+        
+        # Thành phần nhẹ tạo ngay; mô hình AI được tải nền bởi ModelLoader
+        self.detector = None
+        self.classifier = None
+        self.tone_predictor = None
         self.stability_detector = StabilityDetector(max_frames=12, stability_threshold=0.025)
         self.text_processor = TextProcessor()
+        self.frame_processor = None
+        self.video_thread = None
+        self.camera_started_at = None
+        self.display_seq = 0
+        self.shown_status = None
+        self.shown_timings = None
+        
+        # Tạo giao diện
+        self.init_ui()
+        self.start_btn.setEnabled(False)
+        self.status_label.setText("Đang tải mô hình...")
+        
+        self.model_loader = ModelLoader()
+        self.model_loader.progress.connect(self.on_model_progress)
+        self.model_loader.loaded.connect(self.on_models_loaded)
+        self.model_loader.failed.connect(self.on_models_failed)
+        self.model_loader.start()
+        
+        # GUI lấy frame / trạng thái mới nhất theo nhịp hiển thị thay vì nhận signal mỗi frame
+        self.display_timer = QTimer(self)
+        self.display_timer.setInterval(DISPLAY_INTERVAL_MS)
+        self.display_timer.timeout.connect(self.refresh_display)
+        
+    def on_model_progress(self, name, done, total):
+        """Cập nhật thanh tiến trình khi một mô hình đã tải + warm-up xong"""
+        self.load_progress.setValue(done)
+        self.load_progress.setFormat(f"Đã tải {name} (%v/%m)")
+        
+    def on_models_loaded(self, models):
+        """Tạo FrameProcessor / VideoThread khi đủ mô hình và bật nút Bắt đầu"""
+        self.detector = models['detector']
+        self.classifier = models['classifier']
+        self.tone_predictor = models['tone_predictor']
+        if self.record_path:
+            from src.session_log import SessionLogWriter
+            self.recorder = SessionLogWriter(self.record_path)
+            print(f"[INFO] Ghi log phiên landmark vào {self.record_path}")
         self.frame_processor = FrameProcessor(
             detector=self.detector,
             classifier=self.classifier,
             tone_predictor=self.tone_predictor,
             stability_detector=self.stability_detector,
-            text_processor=self.text_processor
+            text_processor=self.text_processor,
+            profiler=self.profiler,
+            recorder=self.recorder
         )
         
         # Khởi tạo video thread
         self.video_thread = VideoThread(self.frame_processor)
-        self.video_thread.frame_ready.connect(self.update_frame)
-        self.video_thread.status_update.connect(self.update_status)
         
-        # Tạo giao diện
-        self.init_ui()
+        self.load_progress.setVisible(False)
+        self.start_btn.setEnabled(True)
+        self.status_label.setText("Sẵn sàng")
+        print(f"[INFO] Mô hình sẵn sàng sau {since_start():.2f}s kể từ khi khởi động")
+        
+    def on_models_failed(self, message):
+        self.load_progress.setFormat("Lỗi tải mô hình")
+        self.status_label.setText("Lỗi tải mô hình")
+        self.show_error(f"Không thể tải mô hình: {message}")
+        
+    def log_time_to_window(self):
+        print(f"[INFO] Time-to-window: {since_start():.2f}s")
         
     def setup_theme(self):
         """Thiết lập theme hiện đại"""
@@ -268,6 +448,8 @@ class ModernSignLanguageQt(QMainWindow):
         # Video display
         self.video_label = QLabel()
         self.video_label.setMinimumSize(640, 480)  # Tăng kích thước video
+        # Kích thước do layout quyết định, không theo pixmap (ảnh được thu nhỏ vừa nhãn)
+        self.video_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
         self.video_label.setAlignment(Qt.AlignCenter)
         self.video_label.setStyleSheet("""
             QLabel {
@@ -364,8 +546,33 @@ class ModernSignLanguageQt(QMainWindow):
         self.confidence_label.setObjectName("valueLabel")
         grid_layout.addWidget(self.confidence_label, 4, 1)
         
+        # Latency (capture -> kết quả)
+        grid_layout.addWidget(QLabel("Độ trễ:"), 5, 0)
+        self.latency_label = QLabel("0 ms")
+        self.latency_label.setObjectName("valueLabel")
+        grid_layout.addWidget(self.latency_label, 5, 1)
+        
+        # Frame cũ bị bỏ qua
+        grid_layout.addWidget(QLabel("Frame bỏ qua:"), 6, 0)
+        self.dropped_label = QLabel("0")
+        self.dropped_label.setObjectName("valueLabel")
+        grid_layout.addWidget(self.dropped_label, 6, 1)
+        
         info_layout.addLayout(grid_layout)
         
+        # Tiến trình tải mô hình nền (ẩn khi xong)
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, len(MODEL_NAMES))
+        self.load_progress.setValue(0)
+        self.load_progress.setFormat("Đang tải mô hình (%v/%m)")
+        info_layout.addWidget(self.load_progress)
+        
+        # Thời gian từng giai đoạn (chỉ hiển thị khi bật profiler)
+        self.profile_label = QLabel("")
+        self.profile_label.setStyleSheet("font: 12px 'Consolas', 'Courier New', monospace; color: #2c3e50;")
+        self.profile_label.setVisible(self.profiler.enabled)
+        info_layout.addWidget(self.profile_label)
+        
         # Text display
         text_label = QLabel("Văn bản nhận diện:")
         text_label.setStyleSheet("font: bold 18px 'Segoe UI'; color: #2c3e50; margin-top: 20px;")
@@ -381,20 +588,19 @@ class ModernSignLanguageQt(QMainWindow):
         
     def start_camera(self):
         """Bắt đầu camera"""
+        if self.video_thread is None:
+            return
         try:
+            self.camera_started_at = time.perf_counter()
+            self.display_seq = 0
+            self.shown_status = None
+            self.update_display_size()
             self.video_thread.start_camera()
+            self.display_timer.start()
             self.start_btn.setEnabled(False)
             self.stop_btn.setEnabled(True)
             self.status_label.setText("Đang khởi động...")
-            self.status_label.setStyleSheet("""
-                QLabel {
-                    background-color: #d5f4e6;
-                    color: #27ae60;
-                    font: bold 16px 'Segoe UI';
-                    padding: 8px;
-                    border-radius: 4px;
-                }
-            """)
+            self.status_label.setStyleSheet(STATUS_STYLES['char'])
         except Exception as e:
             self.show_error(f"Không thể khởi động camera: {str(e)}")
             
@@ -402,7 +608,7 @@ class ModernSignLanguageQt(QMainWindow):
         """Xóa tất cả văn bản đã nhận diện"""
         try:
             # Reset text processor
-            self.frame_processor.text_processor.clear_text()
+            self.text_processor.clear_text()
             
             # Clear display
             self.text_display.setPlainText("Văn bản sẽ hiển thị ở đây...")
@@ -422,11 +628,11 @@ class ModernSignLanguageQt(QMainWindow):
         """Xóa ký tự cuối cùng của từ hiện tại"""
         try:
             # Xóa ký tự cuối
-            deleted = self.frame_processor.text_processor.delete_last_word()
+            deleted = self.text_processor.delete_last_word()
             
             if deleted:
                 # Cập nhật hiển thị
-                display_text = self.frame_processor.text_processor.get_display_text()
+                display_text = self.text_processor.get_display_text()
                 if display_text:
                     self.text_display.setPlainText(display_text)
                 else:
@@ -453,7 +659,7 @@ class ModernSignLanguageQt(QMainWindow):
             import os
             
             # Lấy văn bản hiện tại
-            text = self.frame_processor.text_processor.get_full_text()
+            text = self.text_processor.get_full_text()
             
             if not text or not text.strip():
                 self.show_error("Không có văn bản để lưu!")
@@ -504,6 +710,7 @@ class ModernSignLanguageQt(QMainWindow):
             
     def stop_camera(self):
         """Dừng camera"""
+        self.display_timer.stop()
         self.video_thread.stop_camera()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
@@ -520,63 +727,95 @@ class ModernSignLanguageQt(QMainWindow):
         self.video_label.setText("Nhấn 'Bắt đầu' để khởi động camera")
         self.video_label.setPixmap(QPixmap())
         
+    def update_display_size(self):
+        """Báo cho thread xử lý kích thước vùng hiển thị để thu nhỏ ảnh đúng cỡ"""
+        if self.video_thread is not None:
+            rect = self.video_label.contentsRect()
+            self.video_thread.display_size = (rect.width(), rect.height())
+        
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_display_size()
+        
+    def refresh_display(self):
+        """Gọi theo QTimer: lấy frame / trạng thái mới nhất nếu có, bỏ qua nếu không đổi"""
+        if self.video_thread is None:
+            return
+        item = self.video_thread.display_buffer.get(self.display_seq, timeout=0)
+        if item is not None:
+            self.display_seq = item[0]
+            self.update_frame(item[2])
+        status = self.video_thread.status
+        if status is not None and status is not self.shown_status:
+            self.shown_status = status
+            self.update_status(status)
+        
     def update_frame(self, frame):
-        """Cập nhật frame video"""
-        height, width, channel = frame.shape
-        bytes_per_line = 3 * width
-        q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
-        pixmap = QPixmap.fromImage(q_image)
-        self.video_label.setPixmap(pixmap.scaled(960, 540, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        """Hiển thị ảnh RGB đã được thu nhỏ sẵn trên thread xử lý"""
+        if self.camera_started_at is not None:
+            now = time.perf_counter()
+            print(f"[INFO] Time-to-first-result: {now - self.camera_started_at:.2f}s sau khi bấm Bắt đầu "
+                  f"({since_start(now):.2f}s kể từ khi khởi động)")
+            self.camera_started_at = None
+        height, width = frame.shape[:2]
+        q_image = QImage(frame.data, width, height, frame.strides[0], QImage.Format_RGB888)
+        self.video_label.setPixmap(QPixmap.fromImage(q_image))
+        
+    @staticmethod
+    def set_text(widget, text):
+        """setText chỉ khi nội dung khác (mỗi lần setText có thể kéo theo layout + vẽ lại)"""
+        if widget.text() != text:
+            widget.setText(text)
+            
+    @staticmethod
+    def set_style(widget, style):
+        """setStyleSheet chỉ khi đổi style (mỗi lần gọi Qt phải phân tích lại stylesheet)"""
+        if widget.styleSheet() != style:
+            widget.setStyleSheet(style)
         
     def update_status(self, status_data):
-        """Cập nhật thông tin trạng thái"""
+        """Cập nhật thông tin trạng thái, chỉ chạm vào widget có giá trị thay đổi"""
         # FPS
-        self.fps_label.setText(f"{status_data['fps']:.1f}")
+        self.set_text(self.fps_label, f"{status_data['fps']:.1f}")
+        self.set_text(self.latency_label, f"{status_data['latency_ms']:.0f} ms")
+        self.set_text(self.dropped_label, str(status_data['dropped_frames']))
         
         # Status
-        status = status_data['status']
-        if status_data['tone_collection']:
-            self.status_label.setStyleSheet("""
-                QLabel {
-                    background-color: #fef9e7;
-                    color: #e67e22;
-                    font: bold 16px 'Segoe UI';
-                    padding: 8px;
-                    border-radius: 4px;
-                }
-            """)
-        else:
-            self.status_label.setStyleSheet("""
-                QLabel {
-                    background-color: #d5f4e6;
-                    color: #27ae60;
-                    font: bold 16px 'Segoe UI';
-                    padding: 8px;
-                    border-radius: 4px;
-                }
-            """)
-        self.status_label.setText(status)
+        self.set_style(self.status_label, STATUS_STYLES['tone' if status_data['tone_collection'] else 'char'])
+        self.set_text(self.status_label, status_data['status'])
         
         # Character
-        self.char_label.setText(status_data['current_char'] or "-")
+        self.set_text(self.char_label, status_data['current_char'] or "-")
         
         # Tone
-        self.tone_label.setText(status_data['tone_prediction'] or "-")
+        self.set_text(self.tone_label, status_data['tone_prediction'] or "-")
         
         # Confidence
         confidence = status_data['tone_confidence']
-        self.confidence_label.setText(f"{confidence:.2f}")
+        self.set_text(self.confidence_label, f"{confidence:.2f}")
         
         if confidence > status_data['prediction_threshold']:
-            self.confidence_label.setStyleSheet("color: #27ae60; font: bold 14px 'Segoe UI';")
+            self.set_style(self.confidence_label, CONFIDENCE_STYLES['high'])
         elif confidence > 0.5:
-            self.confidence_label.setStyleSheet("color: #f39c12; font: bold 14px 'Segoe UI';")
+            self.set_style(self.confidence_label, CONFIDENCE_STYLES['medium'])
         else:
-            self.confidence_label.setStyleSheet("color: #e74c3c; font: bold 14px 'Segoe UI';")
+            self.set_style(self.confidence_label, CONFIDENCE_STYLES['low'])
+        
+        # Profiler (thống kê chỉ được tính lại mỗi PROFILE_UPDATE_INTERVAL frame)
+        stage_timings = status_data.get('stage_timings')
+        if stage_timings and stage_timings is not self.shown_timings:
+            self.shown_timings = stage_timings
+            lines = []
+            for name in PROFILE_STAGES:
+                stats = stage_timings.get(name)
+                if stats:
+                    lines.append(f"{name:<13}{stats['p50_ms']:6.1f}{stats['p95_ms']:7.1f} ms  {sparkline(stats['hist'])}")
+            self.profile_label.setText("giai đoạn       p50    p95\n" + "\n".join(lines))
         
         # Text
-        if status_data['display_text']:
-            self.text_display.setPlainText(status_data['display_text'])
+        display_text = status_data['display_text']
+        if display_text and self.text_display.toPlainText() != display_text:
+            self.text_display.setPlainText(display_text)
         
     def show_error(self, message):
         """Hiển thị lỗi"""
@@ -585,15 +824,30 @@ class ModernSignLanguageQt(QMainWindow):
         
     def closeEvent(self, event):
         """Xử lý khi đóng ứng dụng"""
-        if self.video_thread.is_running:
+        if self.model_loader.isRunning():
+            self.model_loader.wait()
+        if self.video_thread is not None and self.video_thread.is_running:
             self.stop_camera()
+        if self.trace_path:
+            self.profiler.export_trace(self.trace_path)
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"[INFO] Đã ghi {self.recorder.frames} frame, {self.recorder.crops} ảnh crop "
+                  f"({self.recorder.bytes_written / 1e6:.2f} MB) vào {self.record_path}")
         event.accept()
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Nhận diện ngôn ngữ ký hiệu - PyQt5")
+    parser.add_argument("--profile", action="store_true", help="Hiển thị thời gian từng giai đoạn")
+    parser.add_argument("--trace", metavar="FILE", help="Xuất trace-event JSON khi đóng ứng dụng")
+    parser.add_argument("--record", metavar="FILE", help="Ghi landmark từng frame ra log phiên .vslr")
+    args, qt_args = parser.parse_known_args()
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setFont(QFont('Segoe UI', 10))  # Thiết lập font mặc định
-    window = ModernSignLanguageQt()
+    window = ModernSignLanguageQt(profile=args.profile, trace_path=args.trace, record_path=args.record)
     window.show()
+    QTimer.singleShot(0, window.log_time_to_window)
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+"""So sánh N thread gọi mô hình dùng chung trực tiếp (batch 1) với gom batch (MicroBatcher).
+
+Mỗi thread mô phỏng một phiên của src.service: gọi liên tục predict_tensor với một ảnh
+crop (1, 3, 224, 224) hoặc TonePredictor.predict với một chuỗi TONE_FRAMES_COUNT frame
+trong --duration giây. Với mỗi số thread đo thông lượng (lần gọi/giây), độ trễ p50/p95
+của từng lời gọi, và với chế độ gom batch thêm kích thước batch trung bình / tỉ lệ đầy.
+
+Chế độ trực tiếp gọi mô hình đồng thời từ nhiều thread như trước khi có batching
+(TonePredictor được bọc LockedModel như trong src.service).
+
+Ví dụ:
+    python -m benchmarks.bench_batching --callers 1,4,8,16
+    python -m benchmarks.bench_batching --target tone --batch-size 16 --wait-ms 1
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+from src.batching import BatchedClassifier, BatchedTonePredictor
+from src.config import CLASSIFIER_BATCH_SIZE, CLASSIFIER_BATCH_WAIT_MS, TONE_BATCH_SIZE, TONE_BATCH_WAIT_MS
+from src.config import TONE_FRAMES_COUNT
+
+
+def run_callers(call, make_request, callers, duration):
+    """callers thread cùng gọi call(request) trong duration giây, trả về (số lần/giây, p50 ms, p95 ms)."""
+    latencies = [[] for _ in range(callers)]
+    stop = threading.Event()
+
+    def worker(i):
+        request = make_request(i)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            call(request)
+            latencies[i].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    lat_ms = np.concatenate([np.asarray(l) for l in latencies]) * 1000.0
+    return lat_ms.size / elapsed, float(np.percentile(lat_ms, 50)), float(np.percentile(lat_ms, 95))
+
+
+def bench(label, direct, batched, batcher, make_request, levels, duration):
+    print(label)
+    print(f"{'thread':>7}{'chế độ':>10}{'lần/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'batch TB':>10}{'đầy':>7}")
+    for callers in levels:
+        for mode, call in (('trực tiếp', direct), ('gom batch', batched)):
+            before = (batcher.batches, batcher.items)
+            rate, p50, p95 = run_callers(call, make_request, callers, duration)
+            extra = ''
+            if mode == 'gom batch':
+                batches, items = batcher.batches - before[0], batcher.items - before[1]
+                mean = items / batches if batches else 0.0
+                extra = f"{mean:>10.1f}{mean / batcher.max_batch_size:>7.0%}"
+            print(f"{callers:>7}{mode:>10}{rate:>10.1f}{p50:>9.2f}{p95:>9.2f}{extra}")
+    batcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo gom batch lời gọi mô hình giữa nhiều thread")
+    parser.add_argument("--target", choices=('classifier', 'tone', 'both'), default='both')
+    parser.add_argument("--callers", default="1,4,8,16", help="Số thread gọi đồng thời, nhiều mức cách nhau dấu phẩy")
+    parser.add_argument("--duration", type=float, default=5.0, help="Số giây đo mỗi mức")
+    parser.add_argument("--classifier", default="trained_models/last.pt")
+    parser.add_argument("--tone-model", default="trained_models/lstm_model_final.h5")
+    parser.add_argument("--batch-size", type=int, default=None, help="Mặc định theo config của từng mô hình")
+    parser.add_argument("--wait-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.callers.split(',') if n.strip()]
+    rng = np.random.default_rng(0)
+
+    if args.target in ('classifier', 'both'):
+        if not os.path.isfile(args.classifier):
+            print(f"[WARNING] Bỏ qua classifier: không tìm thấy {args.classifier}")
+        else:
+            from src.classification import Classifier
+
+            classifier = Classifier(args.classifier)
+            batched = BatchedClassifier(classifier, args.batch_size or CLASSIFIER_BATCH_SIZE,
+                                        CLASSIFIER_BATCH_WAIT_MS if args.wait_ms is None else args.wait_ms)
+            crops = rng.random((max(levels), 1, 3, 224, 224), dtype=np.float32)
+            classifier.predict_tensor(crops[0])
+            bench(f"Classifier.predict_tensor ({classifier.backend}, batch tối đa {batched.batcher.max_batch_size}, "
+                  f"chờ {batched.batcher.max_wait * 1000:.1f} ms)",
+                  classifier.predict_tensor, batched.predict_tensor, batched.batcher, lambda i: crops[i],
+                  levels, args.duration)
+
+    if args.target in ('tone', 'both'):
+        from src.service import LockedModel
+        from src.tone_predictor import TonePredictor
+
+        tone_predictor = TonePredictor(args.tone_model)
+        if tone_predictor.runner is None:
+            print("[WARNING] Bỏ qua TonePredictor: mô hình chưa được tải")
+            return
+        batched = BatchedTonePredictor(tone_predictor, args.batch_size or TONE_BATCH_SIZE,
+                                       TONE_BATCH_WAIT_MS if args.wait_ms is None else args.wait_ms)
+        sequences = rng.random((max(levels), TONE_FRAMES_COUNT, 21 * 3), dtype=np.float32)
+        bench(f"TonePredictor.predict ({tone_predictor.backend}, batch tối đa {batched.batcher.max_batch_size}, "
+              f"chờ {batched.batcher.max_wait * 1000:.1f} ms)",
+              LockedModel(tone_predictor).predict, batched.predict, batched.batcher, lambda i: sequences[i],
+              levels, args.duration)
+
+
+if __name__ == "__main__":
+    main()
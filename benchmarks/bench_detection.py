@@ -0,0 +1,173 @@
+"""Đo chi phí mỗi frame của handDetector: toàn frame gốc, toàn frame thu nhỏ, theo dõi vùng.
+
+Luôn đo phần chuẩn bị đầu vào cho MediaPipe (resize + BGR->RGB) với bbox lấy từ log
+landmark, ở 720p và 1080p, kèm số pixel MediaPipe phải nhận (sao chép, chuyển đổi và
+resize nội bộ tỉ lệ với số pixel này). Với --video (có tay trong hình) và MediaPipe đã cài, đo
+thêm toàn bộ findHands (đầu-cuối, gồm MediaPipe) ở ba chế độ:
+    full     - frame gốc (detection_size=None, không theo dõi vùng), chế độ mặc định
+    resized  - frame thu nhỏ theo DETECTION_INPUT_SIZE (DETECTION_RESIZE_ENABLED)
+    roi      - theo dõi vùng quanh bbox trước (ROI_WORKING_SIZE, ROI_TRACKING_ENABLED), mất dấu
+               thì tìm lại toàn frame
+và độ lệch landmark so với full trên các frame cả hai chế độ cùng thấy tay: khoảng cách
+trung bình của 21 điểm (pixel của frame gốc), chia cho cạnh dài bbox của full. Chỉ nên bật
+resized / roi trong config khi findHands nhanh hơn rõ rệt và độ lệch nhỏ.
+
+Ví dụ:
+    python -m benchmarks.bench_detection
+    python -m benchmarks.bench_detection --video hand.mp4 --frames 600
+"""
+import argparse
+import importlib.util
+import time
+
+import cv2
+import numpy as np
+
+from src.config import DETECTION_INPUT_SIZE, ROI_WORKING_SIZE, ROI_EXPAND
+from src.hand_frame import HandFrame, square_region
+from src.replay import load_landmark_log, synthetic_landmark_log
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080)}
+
+
+def percentiles(latencies):
+    lat_ms = np.asarray(latencies) * 1000.0
+    return float(np.percentile(lat_ms, 50)), float(np.percentile(lat_ms, 95))
+
+
+def prepare_full(frame, _):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def prepare_resized(frame, _, size=DETECTION_INPUT_SIZE):
+    h, w = frame.shape[:2]
+    scale = size / max(h, w)
+    small = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+
+def prepare_roi(frame, roi, size=ROI_WORKING_SIZE):
+    x1, y1, x2, y2 = roi
+    crop = frame[y1:y2, x1:x2]
+    side = max(x2 - x1, y2 - y1)
+    if side > size:
+        scale = size / side
+        crop = cv2.resize(crop, (max(1, round((x2 - x1) * scale)), max(1, round((y2 - y1) * scale))),
+                          interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+
+
+def bench_prepare(landmarks, present, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8), (0, 0), 4)
+    rois = [square_region(HandFrame(pts, frame.shape).bbox, frame.shape, ROI_EXPAND)
+            for pts, has_hand in zip(landmarks, present) if has_hand]
+    results = {}
+    for name, fn in (('full', prepare_full), ('resized', prepare_resized), ('roi', prepare_roi)):
+        for roi in rois[:5]:
+            fn(frame, roi)
+        latencies, pixels = [], []
+        for roi in rois:
+            t0 = time.perf_counter()
+            rgb = fn(frame, roi)
+            latencies.append(time.perf_counter() - t0)
+            pixels.append(rgb.shape[0] * rgb.shape[1])
+        results[name] = (*percentiles(latencies), float(np.mean(pixels)))
+    return results
+
+
+def read_video(path, width, height, max_frames):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, (width, height)))
+    cap.release()
+    return frames
+
+
+def bench_detector(frames):
+    from src.hand_tracking import handDetector
+
+    modes = {
+        'full': dict(detection_size=None, roi_tracking=False),
+        'resized': dict(detection_size=DETECTION_INPUT_SIZE, roi_tracking=False),
+        'roi': dict(detection_size=DETECTION_INPUT_SIZE, roi_tracking=True),
+    }
+    results = {}
+    reference = None
+    for name, kwargs in modes.items():
+        detector = handDetector(maxHands=1, **kwargs)
+        latencies, found, points = [], 0, []
+        for frame in frames:
+            t0 = time.perf_counter()
+            hands, _ = detector.findHands(frame, draw=False)
+            latencies.append(time.perf_counter() - t0)
+            found += bool(hands)
+            points.append(hands[0] if hands else None)
+        if reference is None:
+            reference = points
+        results[name] = (*percentiles(latencies), found, detector.stats()['roi_rate'],
+                         landmark_drift(reference, points))
+    return results
+
+
+def landmark_drift(reference, points):
+    """Độ lệch landmark so với reference (HandFrame hoặc None mỗi frame): (p50, p95) theo cạnh dài bbox."""
+    drifts = []
+    for ref, hand in zip(reference, points):
+        if ref is None or hand is None:
+            continue
+        h, w = ref.image_shape
+        scale = np.array([w, h], dtype=np.float32)
+        distance = np.linalg.norm((hand.points[:, :2] - ref.points[:, :2]) * scale, axis=1).mean()
+        drifts.append(distance / max(ref.bbox[2], ref.bbox[3], 1))
+    if not drifts:
+        return float('nan'), float('nan')
+    return float(np.percentile(drifts, 50)), float(np.percentile(drifts, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo chi phí phát hiện tay theo chế độ đầu vào")
+    parser.add_argument("--landmarks", help="Log landmark .npz để lấy bbox (mặc định: sinh giả lập)")
+    parser.add_argument("--video", help="Video có tay để đo findHands với MediaPipe thật")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    if args.landmarks:
+        # Chỉ lấy bbox: độ phân giải đo là các mức trong RESOLUTIONS, không theo frame_shape của log
+        landmarks, present, _, _ = load_landmark_log(args.landmarks)
+    else:
+        landmarks, present, _ = synthetic_landmark_log(args.frames)
+
+    print(f"Chuẩn bị đầu vào MediaPipe (DETECTION_INPUT_SIZE={DETECTION_INPUT_SIZE}, "
+          f"ROI_WORKING_SIZE={ROI_WORKING_SIZE}, ROI_EXPAND={ROI_EXPAND})")
+    print(f"{'độ phân giải':<14}{'chế độ':<10}{'p50 ms':>9}{'p95 ms':>9}{'pixel vào':>12}{'so với gốc':>12}")
+    for label, (width, height) in RESOLUTIONS.items():
+        results = bench_prepare(landmarks, present, width, height)
+        base_pixels = results['full'][2]
+        for name, (p50, p95, pixels) in results.items():
+            print(f"{label:<14}{name:<10}{p50:>9.3f}{p95:>9.3f}{pixels / 1e6:>10.2f}MP{pixels / base_pixels:>12.1%}")
+
+    if not args.video:
+        return
+    if importlib.util.find_spec('mediapipe') is None:
+        print("[WARNING] Bỏ qua đo findHands: chưa cài mediapipe")
+        return
+    print(f"findHands trên {args.video}")
+    print(f"{'độ phân giải':<14}{'chế độ':<10}{'p50 ms':>9}{'p95 ms':>9}{'có tay':>8}{'tỉ lệ vùng':>11}"
+          f"{'lệch p50':>10}{'lệch p95':>10}")
+    for label, (width, height) in RESOLUTIONS.items():
+        frames = read_video(args.video, width, height, args.frames)
+        if not frames:
+            print(f"[ERROR] Không đọc được frame từ {args.video}")
+            return
+        for name, (p50, p95, found, roi_rate, (drift50, drift95)) in bench_detector(frames).items():
+            print(f"{label:<14}{name:<10}{p50:>9.2f}{p95:>9.2f}{found:>8}{roi_rate:>10.0%}"
+                  f"{drift50:>10.1%}{drift95:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Đo tỉ lệ dùng lại landmark, chi phí và độ cũ của landmark khi dùng StaticSceneGate.
+
+Mặc định dựng cảnh giả lập: bàn tay (21 chấm tròn) trên nền có vân, nhiễu cảm biến
+mỗi frame, xen kẽ đoạn giữ yên ký hiệu và đoạn di chuyển. Với mỗi frame, nếu cổng
+cho dùng lại thì so landmark dùng lại với landmark thật để đo sai lệch (pixel);
+ngược lại coi như chạy phát hiện và lấy landmark thật.
+
+Với --video và MediaPipe đã cài, chạy handDetector thật có / không có cổng và
+so thời gian phát hiện trung bình mỗi frame.
+
+Ví dụ:
+    python -m benchmarks.bench_frame_gate
+    python -m benchmarks.bench_frame_gate --video hand.mp4 --threshold 3 --max-reuse 3
+"""
+import argparse
+import importlib.util
+import time
+
+import cv2
+import numpy as np
+
+from src.config import FRAME_GATE_THRESHOLD, FRAME_GATE_MAX_REUSE
+from src.frame_gate import StaticSceneGate
+from src.hand_frame import HandFrame
+
+
+def hold_and_move_log(num_frames, seed=0, segment=45):
+    """Landmark (N, 21, 3): đoạn giữ yên (run tay rất nhỏ) xen kẽ đoạn di chuyển / đổi tư thế."""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, 21, endpoint=False)
+    base = np.stack([0.08 * np.cos(angles), 0.12 * np.sin(angles), np.zeros(21)], axis=1)
+    landmarks = np.empty((num_frames, 21, 3), dtype=np.float32)
+    moving = np.zeros(num_frames, dtype=bool)
+    center = np.array([0.5, 0.5, 0.0])
+    for start in range(0, num_frames, segment):
+        end = min(start + segment, num_frames)
+        move = (start // segment) % 2 == 1
+        moving[start:end] = move
+        for i in range(start, end):
+            if move:
+                center[:2] = np.clip(center[:2] + rng.normal(0, 0.01, size=2), 0.25, 0.75)
+            tremor = rng.normal(0, 0.0005, size=(21, 3)) * [1, 1, 0]
+            landmarks[i] = base + center + tremor
+    return landmarks, moving
+
+
+def render(landmarks, width, height, seed=0, noise=2.0):
+    """Dựng frame BGR: nền có vân + các chấm tay + nhiễu cảm biến Gauss."""
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(60, 200, size=(height, width, 3), dtype=np.uint8), (0, 0), 6)
+    for pts in landmarks:
+        frame = background.copy()
+        for x, y, _ in pts:
+            cv2.circle(frame, (int(x * width), int(y * height)), max(4, width // 100), (150, 180, 220), -1)
+        frame = cv2.add(frame, rng.normal(0, noise, size=frame.shape).astype(np.int16), dtype=cv2.CV_8U)
+        yield frame
+
+
+def simulate(landmarks, moving, width, height, gate):
+    reuse_errors, gate_ms = [], []
+    reused_moving = 0
+    for i, frame in enumerate(render(landmarks, width, height)):
+        t0 = time.perf_counter()
+        reuse = gate.should_reuse(frame)
+        gate_ms.append((time.perf_counter() - t0) * 1000)
+        truth = landmarks[i]
+        if reuse:
+            diff = (gate.hands[0].points[:, :2] - truth[:, :2]) * [width, height]
+            reuse_errors.append(float(np.abs(diff).max()))
+            reused_moving += bool(moving[i])
+        else:
+            gate.update([HandFrame(truth, frame.shape)], frame.shape)
+    return np.array(reuse_errors), np.array(gate_ms), reused_moving
+
+
+def bench_video(path, max_frames, threshold, max_reuse):
+    from src.hand_tracking import handDetector
+
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    for label, gate in (('không cổng', None), ('có cổng', StaticSceneGate(threshold, max_reuse))):
+        detector = handDetector(maxHands=1)
+        start = time.perf_counter()
+        for frame in frames:
+            if gate is not None and gate.should_reuse(frame):
+                continue
+            hands, _ = detector.findHands(frame, draw=False)
+            if gate is not None:
+                gate.update(hands, frame.shape)
+        per_frame = (time.perf_counter() - start) / max(len(frames), 1) * 1000
+        rate = gate.stats()['reuse_rate'] if gate is not None else 0.0
+        print(f"{label:<12}{per_frame:>10.2f} ms/frame   dùng lại {rate:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo StaticSceneGate (dùng lại landmark khi cảnh tĩnh)")
+    parser.add_argument("--frames", type=int, default=450)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--threshold", type=float, default=FRAME_GATE_THRESHOLD)
+    parser.add_argument("--max-reuse", type=int, default=FRAME_GATE_MAX_REUSE)
+    parser.add_argument("--video", help="Video có tay để đo với MediaPipe thật")
+    args = parser.parse_args()
+
+    landmarks, moving = hold_and_move_log(args.frames)
+    gate = StaticSceneGate(threshold=args.threshold, max_reuse=args.max_reuse)
+    errors, gate_ms, reused_moving = simulate(landmarks, moving, args.width, args.height, gate)
+    stats = gate.stats()
+    print(f"Cảnh giả lập {args.width}x{args.height}, {args.frames} frame "
+          f"(ngưỡng {args.threshold}, tối đa {args.max_reuse} frame dùng lại liên tiếp)")
+    print(f"    dùng lại: {stats['reused']}/{stats['reused'] + stats['detected']} frame ({stats['reuse_rate']:.0%}), "
+          f"trong đó {reused_moving} frame đang di chuyển")
+    print(f"    chi phí cổng: p50 {np.percentile(gate_ms, 50):.3f} ms, p95 {np.percentile(gate_ms, 95):.3f} ms")
+    if errors.size:
+        print(f"    sai lệch landmark dùng lại: p50 {np.percentile(errors, 50):.1f} px, "
+              f"p95 {np.percentile(errors, 95):.1f} px, max {errors.max():.1f} px")
+
+    if args.video:
+        if importlib.util.find_spec('mediapipe') is None:
+            print("[WARNING] Bỏ qua đo với MediaPipe: chưa cài mediapipe")
+            return
+        bench_video(args.video, args.frames, args.threshold, args.max_reuse)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Đo thời gian GUI thread của app_qt cho mỗi frame: đường hiển thị cũ và mới.
+
+    cũ   VideoThread emit frame BGR gốc + dict trạng thái mỗi frame; GUI tạo QImage,
+         rgbSwapped, scaled(960x540, SmoothTransformation) và setText / setStyleSheet
+         mọi nhãn kể cả khi giá trị không đổi
+    mới  thread xử lý đổi màu + thu nhỏ vừa video_label (VideoThread.render, không tính vào
+         GUI thread); GUI lấy frame mới nhất theo QTimer, chỉ cập nhật nhãn có giá trị thay đổi
+
+Cửa sổ thật (ModernSignLanguageQt) được dựng không tải mô hình; mỗi frame tính cả
+app.processEvents() để gồm thời gian layout + vẽ lại. Trạng thái giả lập giống khi chạy:
+FPS / độ trễ đổi mỗi frame, ký tự / dấu / văn bản đổi thưa.
+
+Ví dụ:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_gui
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_gui --frames 300 --resolutions 1080p
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+import app_qt
+from app_qt import CONFIDENCE_STYLES, STATUS_STYLES, ModernSignLanguageQt, VideoThread
+
+RESOLUTIONS = {'720p': (720, 1280, 3), '1080p': (1080, 1920, 3)}
+
+
+def make_statuses(count):
+    """Chuỗi dict trạng thái như VideoThread tạo ra khi đang nhận diện"""
+    rng = np.random.default_rng(0)
+    text = ""
+    statuses = []
+    for i in range(count):
+        if i % 20 == 0:
+            text += "abcdefghiklmnopqrstuvxy"[(i // 20) % 23]
+        tone = i % 90 >= 60
+        statuses.append({
+            'fps': 25.0 + rng.random() * 5,
+            'status': "Nhận dấu thanh" if tone else "Nhận ký tự",
+            'tone_collection': tone,
+            'current_char': text[-1],
+            'tone_prediction': "sac" if tone else "",
+            'tone_confidence': 0.9 if tone else 0.0,
+            'display_text': text,
+            'prediction_threshold': 0.8,
+            'dropped_frames': i // 50,
+            'latency_ms': 30.0 + rng.random() * 10,
+            'stage_timings': {},
+        })
+    return statuses
+
+
+def legacy_update_frame(window, frame):
+    height, width, channel = frame.shape
+    q_image = QImage(frame.data, width, height, 3 * width, QImage.Format_RGB888).rgbSwapped()
+    pixmap = QPixmap.fromImage(q_image)
+    window.video_label.setPixmap(pixmap.scaled(960, 540, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+
+
+def legacy_update_status(window, status_data):
+    window.fps_label.setText(f"{status_data['fps']:.1f}")
+    window.latency_label.setText(f"{status_data['latency_ms']:.0f} ms")
+    window.dropped_label.setText(str(status_data['dropped_frames']))
+    window.status_label.setStyleSheet(STATUS_STYLES['tone' if status_data['tone_collection'] else 'char'])
+    window.status_label.setText(status_data['status'])
+    window.char_label.setText(status_data['current_char'] or "-")
+    window.tone_label.setText(status_data['tone_prediction'] or "-")
+    confidence = status_data['tone_confidence']
+    window.confidence_label.setText(f"{confidence:.2f}")
+    if confidence > status_data['prediction_threshold']:
+        window.confidence_label.setStyleSheet(CONFIDENCE_STYLES['high'])
+    elif confidence > 0.5:
+        window.confidence_label.setStyleSheet(CONFIDENCE_STYLES['medium'])
+    else:
+        window.confidence_label.setStyleSheet(CONFIDENCE_STYLES['low'])
+    if status_data['display_text']:
+        window.text_display.setPlainText(status_data['display_text'])
+
+
+def run_legacy(app, window, frames, statuses):
+    gui_ms = []
+    for frame, status in zip(frames, statuses):
+        t0 = time.perf_counter()
+        legacy_update_frame(window, frame)
+        legacy_update_status(window, status)
+        app.processEvents()
+        gui_ms.append((time.perf_counter() - t0) * 1000.0)
+    return gui_ms, []
+
+
+def run_new(app, window, frames, statuses):
+    thread = window.video_thread
+    window.display_seq = 0
+    window.shown_status = None
+    window.update_display_size()
+    gui_ms, render_ms = [], []
+    for frame, status in zip(frames, statuses):
+        # Phần của thread xử lý
+        t0 = time.perf_counter()
+        thread.display_buffer.put(thread.render(frame))
+        thread.status = status
+        render_ms.append((time.perf_counter() - t0) * 1000.0)
+        # Một nhịp QTimer của GUI
+        t0 = time.perf_counter()
+        window.refresh_display()
+        app.processEvents()
+        gui_ms.append((time.perf_counter() - t0) * 1000.0)
+    return gui_ms, render_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thời gian GUI thread mỗi frame của app_qt")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--resolutions", default="720p,1080p")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    # Chỉ đo giao diện: không tải mô hình
+    app_qt.ModelLoader.start = lambda self: None
+    window = ModernSignLanguageQt()
+    window.video_thread = VideoThread(None)
+    window.show()
+    app.processEvents()
+    rect = window.video_label.contentsRect()
+    print(f"video_label {rect.width()}x{rect.height()}, {args.frames} frame")
+
+    statuses = make_statuses(args.frames)
+    rng = np.random.default_rng(1)
+    print(f"{'độ phân giải':<14}{'đường':<7}{'GUI p50':>9}{'GUI p95':>9}{'GUI TB':>9}{'worker TB':>11}")
+    for name in args.resolutions.split(','):
+        shape = RESOLUTIONS[name.strip()]
+        pool = [rng.integers(0, 255, size=shape, dtype=np.uint8) for _ in range(4)]
+        frames = [pool[i % len(pool)] for i in range(args.frames)]
+        for label, run in (('cũ', run_legacy), ('mới', run_new)):
+            run(app, window, frames[:10], statuses[:10])  # làm nóng
+            gui_ms, render_ms = run(app, window, frames, statuses)
+            worker = f"{np.mean(render_ms):>11.2f}" if render_ms else f"{'-':>11}"
+            print(f"{name:<14}{label:<7}{np.percentile(gui_ms, 50):>9.2f}{np.percentile(gui_ms, 95):>9.2f}"
+                  f"{np.mean(gui_ms):>9.2f}{worker}")
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Kiểm tra và đo src.kinematics so với cách tính cũ (dựng lại mảng từ deque mỗi frame).
+
+Phát lại một log landmark (hoặc log giả lập), cho cả hai cách tính cùng một chuỗi
+thao tác như FrameProcessor (thêm frame, xoá lịch sử khi mất tay) và đếm số frame
+có quyết định khác nhau: ổn định, đang chuyển động, bắt đầu / kết thúc cử chỉ.
+
+Ví dụ:
+    python -m benchmarks.bench_kinematics --landmarks session.npz
+"""
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+
+from src.kinematics import HandKinematics
+from src.model import StabilityDetector
+from src.replay import load_landmark_log, synthetic_landmark_log
+
+
+class LegacyKinematics:
+    """Bản sao cách tính cũ của StabilityDetector / FrameProcessor để so sánh."""
+
+    def __init__(self, max_frames, stability_threshold, movement_threshold, motion_threshold, count_required):
+        self.max_frames = max_frames
+        self.stability_threshold = stability_threshold
+        self.movement_threshold = movement_threshold
+        self.motion_threshold = motion_threshold
+        self.count_required = count_required
+        self.keypoints_history = deque(maxlen=max_frames)
+        self.hand_positions = deque(maxlen=10)
+        self.motion_history = deque(maxlen=15)
+        self.motion_energy_history = deque(maxlen=15)
+        self.gesture_active = False
+
+    def is_stable(self):
+        if len(self.keypoints_history) < self.max_frames:
+            return False
+        arr = np.array(self.keypoints_history)
+        return np.mean(np.var(arr, axis=0)) < self.stability_threshold
+
+    def is_hand_moving(self):
+        if len(self.hand_positions) < 2:
+            return False
+        arr = np.array(self.hand_positions)
+        total_move = np.sum(np.linalg.norm(np.diff(arr, axis=0), axis=1))
+        return total_move > self.movement_threshold
+
+    def update_motion_state(self, kpts):
+        self.motion_history.append(kpts)
+        if len(self.motion_history) < 2:
+            self.motion_energy_history.append(0.0)
+            return None
+        energy = np.mean(np.linalg.norm(kpts - self.motion_history[-2], axis=1))
+        self.motion_energy_history.append(energy)
+        recent = list(self.motion_energy_history)[-self.count_required:]
+        above = [e > self.motion_threshold for e in recent]
+        below = [e < self.motion_threshold for e in recent]
+        if not self.gesture_active and all(above) and len(above) == self.count_required:
+            self.gesture_active = True
+            return 'start'
+        if self.gesture_active and all(below) and len(below) == self.count_required:
+            self.gesture_active = False
+            return 'end'
+        return None
+
+    def step(self, kpts, avg_xy):
+        event = self.update_motion_state(kpts)
+        self.keypoints_history.append(kpts.flatten())
+        self.hand_positions.append(avg_xy)
+        return self.is_stable(), self.is_hand_moving(), event
+
+    def lost(self):
+        self.keypoints_history.clear()
+        self.hand_positions.clear()
+
+
+class IncrementalKinematics:
+    def __init__(self, max_frames, stability_threshold, movement_threshold, motion_threshold, count_required):
+        self.movement_threshold = movement_threshold
+        self.stability = StabilityDetector(max_frames=max_frames, stability_threshold=stability_threshold)
+        self.kinematics = HandKinematics(10, motion_threshold, count_required, 15)
+
+    def step(self, kpts, avg_xy):
+        event = self.kinematics.update_motion(kpts)
+        self.stability.add_keypoints(kpts.flatten())
+        self.kinematics.add_position(avg_xy)
+        return self.stability.is_stable(), self.kinematics.is_moving(self.movement_threshold), event
+
+    def lost(self):
+        self.stability.reset()
+        self.kinematics.clear_positions()
+
+
+def mixed_motion_log(num_frames, seed=0, segment=40):
+    """Log giả lập xen kẽ giữ yên / trôi chậm / vẽ dấu nhanh để quyết định đổi trạng thái thường xuyên."""
+    landmarks, present, timestamps = synthetic_landmark_log(num_frames, seed)
+    rng = np.random.default_rng(seed + 1)
+    scales = rng.choice([0.0, 0.5, 3.0, 12.0], size=num_frames // segment + 1)
+    steps = rng.normal(0, 0.004, size=(num_frames, 1, 3)) * np.repeat(scales, segment)[:num_frames, None, None]
+    steps[..., 2] = 0
+    landmarks = landmarks + np.cumsum(steps, axis=0)
+    return landmarks, present, timestamps
+
+
+def run(engine, landmarks, present):
+    decisions, latencies = [], []
+    for kpts, has_hand in zip(landmarks, present):
+        t0 = time.perf_counter()
+        if has_hand:
+            avg_xy = ((kpts[20, 0] + kpts[8, 0]) / 2, (kpts[20, 1] + kpts[8, 1]) / 2)
+            decisions.append(engine.step(kpts, avg_xy))
+        else:
+            engine.lost()
+            decisions.append(None)
+        latencies.append((time.perf_counter() - t0) * 1e6)
+    return decisions, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh kinematics tăng dần với cách tính cũ")
+    parser.add_argument("--landmarks", help="Log landmark .npz (mặc định: sinh giả lập)")
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--max-frames", type=int, default=12)
+    parser.add_argument("--stability-threshold", type=float, default=0.025)
+    args = parser.parse_args()
+
+    if args.landmarks:
+        landmarks, present, _, _ = load_landmark_log(args.landmarks)
+    else:
+        landmarks, present, _ = mixed_motion_log(args.frames)
+    landmarks = landmarks.astype(np.float64)
+    params = (args.max_frames, args.stability_threshold, 0.03, 0.03, 7)
+
+    legacy, legacy_us = run(LegacyKinematics(*params), landmarks, present)
+    incremental, incremental_us = run(IncrementalKinematics(*params), landmarks, present)
+
+    names = ('ổn định', 'chuyển động', 'cử chỉ')
+    mismatches = [0, 0, 0]
+    positives = [0, 0, 0]
+    for old, new in zip(legacy, incremental):
+        if old is None:
+            continue
+        for i in range(3):
+            mismatches[i] += old[i] != new[i]
+            positives[i] += bool(old[i])
+
+    print(f"{len(landmarks)} frame, {int(np.sum(present))} có tay")
+    for name, miss, pos in zip(names, mismatches, positives):
+        print(f"    {name:<12} khác nhau {miss:>4} frame  (cũ: {pos} frame dương tính / sự kiện)")
+    print(f"{'cách tính':<12}{'p50 µs':>9}{'p95 µs':>9}")
+    print(f"{'cũ':<12}{np.percentile(legacy_us, 50):>9.1f}{np.percentile(legacy_us, 95):>9.1f}")
+    print(f"{'tăng dần':<12}{np.percentile(incremental_us, 50):>9.1f}{np.percentile(incremental_us, 95):>9.1f}")
+    if any(mismatches):
+        raise SystemExit("[ERROR] Quyết định khác với cách tính cũ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Benchmark end-to-end cho pipeline nhận diện bằng cách phát lại dữ liệu đã ghi.
+
+Đo độ trễ p50/p95/p99 và thông lượng cho từng giai đoạn:
+    detect    - handDetector.findHands (MediaPipe thật, cần --real-detector)
+    crop      - CropPreprocessor (bbox trong frame -> tensor 224x224)
+    classify  - Classifier.predict_tensor với 1 ảnh (và N ảnh nếu --batch-size > 1)
+    tone      - TonePredictor.predict trên cửa sổ TONE_FRAMES_COUNT frame
+    pipeline  - FrameProcessor.process_frame với ReplayDetector
+
+Kết quả có thể lưu làm baseline JSON và so sánh ở các lần chạy sau.
+
+Ví dụ:
+    python -m benchmarks.bench_pipeline --landmarks session.npz --save-baseline
+    python -m benchmarks.bench_pipeline --landmarks session.npz --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+from src.config import TONE_FRAMES_COUNT
+from src.profiler import StageProfiler
+from src.replay import ReplayDetector, load_landmark_log, synthetic_landmark_log
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+ALL_STAGES = ('detect', 'crop', 'classify', 'tone', 'pipeline')
+
+
+def summarize(latencies, total_time):
+    """Tính thống kê độ trễ (ms) và thông lượng (lần/giây)."""
+    lat_ms = np.asarray(latencies, dtype=np.float64) * 1000.0
+    if lat_ms.size == 0:
+        return None
+    return {
+        'count': int(lat_ms.size),
+        'mean_ms': float(lat_ms.mean()),
+        'p50_ms': float(np.percentile(lat_ms, 50)),
+        'p95_ms': float(np.percentile(lat_ms, 95)),
+        'p99_ms': float(np.percentile(lat_ms, 99)),
+        'throughput': float(lat_ms.size / total_time) if total_time > 0 else 0.0
+    }
+
+
+def measure(fn, items, warmup=3):
+    """Gọi fn(item) cho từng item, trả về thống kê độ trễ."""
+    for item in items[:warmup]:
+        fn(item)
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def load_frames(video_path, num_frames, width, height):
+    """Đọc frame từ video, hoặc tạo frame giả kích thước width x height nếu không có video."""
+    if video_path:
+        import cv2
+        cap = cv2.VideoCapture(video_path)
+        frames = []
+        while len(frames) < num_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if frames:
+            return frames
+        print(f"[WARNING] Không đọc được frame từ {video_path}, dùng frame giả")
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    return [base] * num_frames
+
+
+def load_models(classifier_path, tone_model_path, stages):
+    """Tải các mô hình cần thiết, bỏ qua giai đoạn nếu thiếu mô hình hoặc thư viện."""
+    classifier = tone_predictor = None
+    if {'classify', 'pipeline'} & stages:
+        if os.path.isfile(classifier_path):
+            try:
+                from src.classification import Classifier
+                classifier = Classifier(model_path=classifier_path)
+            except ImportError as e:
+                print(f"[WARNING] Bỏ qua classifier: {e}")
+        else:
+            print(f"[WARNING] Không tìm thấy mô hình ký tự tại {classifier_path}")
+    if {'tone', 'pipeline'} & stages:
+        try:
+            from src.tone_predictor import TonePredictor
+            tone_predictor = TonePredictor(model_path=tone_model_path)
+            if tone_predictor.runner is None:
+                tone_predictor = None
+        except ImportError as e:
+            print(f"[WARNING] Bỏ qua tone predictor: {e}")
+    return classifier, tone_predictor
+
+
+def build_frame_processor(detector, classifier, tone_predictor, profiler=None):
+    from src.model import StabilityDetector
+    from src.text_processor import TextProcessor
+    from src.frame_processor import FrameProcessor
+    frame_processor = FrameProcessor(
+        detector=detector,
+        classifier=classifier,
+        tone_predictor=tone_predictor,
+        stability_detector=StabilityDetector(max_frames=12, stability_threshold=0.025),
+        text_processor=TextProcessor(),
+        profiler=profiler
+    )
+    # ReplayDetector không dựa vào nội dung frame (frame giả giống hệt nhau): tắt việc dùng lại landmark
+    frame_processor.frame_gate = None
+    return frame_processor
+
+
+def run_benchmark(frames, landmarks, present, stages, classifier=None, tone_predictor=None,
+                  real_detector=False, warmup=3, profiler=None, batch_size=1, frame_shape=None):
+    """Chạy các giai đoạn được chọn, trả về dict {tên giai đoạn: thống kê}.
+
+    frame_shape là shape frame lúc ghi log landmark (None: theo frame đưa vào).
+    """
+    results = {}
+    replay = ReplayDetector(landmarks, present, frame_shape=frame_shape)
+    n = len(frames)
+    present_idx = [i for i in range(n) if present[i % len(present)]]
+
+    if 'detect' in stages and real_detector:
+        try:
+            from src.hand_tracking import handDetector
+            detector = handDetector(maxHands=1)
+            results['detect'] = measure(lambda f: detector.findHands(f, draw=False), frames, warmup)
+        except ImportError as e:
+            print(f"[WARNING] Bỏ qua detect: {e}")
+
+    # Chuẩn bị bbox từ landmark phát lại cho các giai đoạn crop / classify
+    helper = build_frame_processor(replay, None, None)
+    crop_inputs = []
+    for i in present_idx:
+        replay.index = i % len(present)
+        hands, _ = replay.findHands(frames[i])
+        if hands:
+            crop_inputs.append((frames[i], hands[0].bbox))
+
+    if 'crop' in stages and crop_inputs:
+        results['crop'] = measure(lambda a: helper.preprocessor(*a), crop_inputs, warmup)
+
+    if 'classify' in stages and classifier is not None and crop_inputs:
+        tensors = [t.copy() for t in (helper.preprocessor(*a) for a in crop_inputs) if t is not None]
+        results['classify'] = measure(classifier.predict_tensor, tensors, warmup)
+        if batch_size > 1:
+            batches = [np.concatenate(tensors[i:i + batch_size]) for i in range(0, len(tensors) - batch_size + 1, batch_size)]
+            if batches:
+                results[f'classify_b{batch_size}'] = measure(classifier.predict_tensor, batches, min(warmup, 1))
+
+    if 'tone' in stages and tone_predictor is not None:
+        kpts = landmarks.reshape(len(landmarks), -1)
+        windows = [kpts[i:i + TONE_FRAMES_COUNT] for i in range(0, len(kpts) - TONE_FRAMES_COUNT + 1, 5)]
+        if windows:
+            results['tone'] = measure(lambda w: tone_predictor.predict(list(w)), windows, warmup)
+
+    if 'pipeline' in stages and classifier is not None and tone_predictor is not None:
+        replay.reset()
+        frame_processor = build_frame_processor(replay, classifier, tone_predictor, profiler)
+        results['pipeline'] = measure(frame_processor.process_frame, frames, warmup=0)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """In bảng so sánh với baseline, trả về danh sách giai đoạn bị chậm đi quá ngưỡng."""
+    regressions = []
+    print(f"{'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'Δp50':>10}{'Δp95':>10}")
+    for stage, stats in results.items():
+        base = baseline.get('stages', {}).get(stage) if baseline else None
+        line = f"{stage:<10}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['throughput']:>10.1f}"
+        if base:
+            d50 = (stats['p50_ms'] - base['p50_ms']) / base['p50_ms'] * 100 if base['p50_ms'] else 0.0
+            d95 = (stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0.0
+            line += f"{d50:>+9.1f}%{d95:>+9.1f}%"
+            if d50 > threshold * 100:
+                regressions.append(stage)
+                line += "  <-- REGRESSION"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline nhận diện bằng dữ liệu phát lại")
+    parser.add_argument("--landmarks", help="Log landmark .npz (mặc định: sinh giả lập)")
+    parser.add_argument("--video", help="Video nguồn frame (mặc định: frame giả)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, help="Kích thước frame giả (mặc định: theo log, giả lập 1280x720)")
+    parser.add_argument("--height", type=int)
+    parser.add_argument("--stages", default=",".join(ALL_STAGES))
+    parser.add_argument("--real-detector", action="store_true", help="Đo MediaPipe thật cho giai đoạn detect")
+    parser.add_argument("--classifier", default="trained_models/last.pt")
+    parser.add_argument("--tone-model", default="trained_models/lstm_model_final.h5")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1, help="Đo thêm predict_batch với N ảnh mỗi lần")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Ghi kết quả lần chạy này làm baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Ngưỡng chậm đi của p50 (0.10 = 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file")
+    parser.add_argument("--trace", help="Xuất trace-event JSON của giai đoạn pipeline")
+    args = parser.parse_args()
+
+    stages = set(s.strip() for s in args.stages.split(",") if s.strip())
+    if args.landmarks:
+        landmarks, present, _, frame_shape = load_landmark_log(args.landmarks)
+    else:
+        landmarks, present, _ = synthetic_landmark_log(args.frames)
+        frame_shape = None
+    height, width = frame_shape[:2] if frame_shape else (720, 1280)
+    frames = load_frames(args.video, args.frames, args.width or width, args.height or height)
+    classifier, tone_predictor = load_models(args.classifier, args.tone_model, stages)
+
+    profiler = StageProfiler(enabled=True, window=len(frames), trace=True) if args.trace else None
+    results = run_benchmark(frames, landmarks, present, stages, classifier, tone_predictor,
+                            real_detector=args.real_detector, warmup=args.warmup, profiler=profiler,
+                            batch_size=args.batch_size, frame_shape=frame_shape)
+    if profiler is not None:
+        profiler.export_trace(args.trace)
+    report = {
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'cpu_count': os.cpu_count()},
+        'input': {'frames': len(frames), 'frame_shape': list(frames[0].shape),
+                  'landmarks': args.landmarks or "synthetic"},
+        'stages': results
+    }
+
+    baseline = None
+    if not args.save_baseline and os.path.isfile(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"[INFO] Chưa có baseline tại {args.baseline} (chạy với --save-baseline để tạo)")
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Đã lưu baseline vào {args.baseline}")
+    if regressions and args.fail_on_regression:
+        print(f"[ERROR] Chậm đi so với baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
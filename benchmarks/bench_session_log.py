@@ -0,0 +1,74 @@
+"""Kích thước và tốc độ ghi / đọc log phiên landmark (.vslr) so với .npz của save_landmark_log.
+
+Sinh --minutes phút landmark giả lập ở --fps (mặc định 1 giờ, 30 FPS; bàn tay trôi chậm
+có nhiễu độc lập từng điểm, 10% frame không có tay), ghi từng frame qua SessionLogWriter
+như FrameProcessor, rồi đọc lại lần lượt từng frame. In:
+    MB / byte/frame   kích thước file
+    ghi µs            thời gian add() trung bình mỗi frame (gồm ghi khối xuống đĩa)
+    đọc s             duyệt toàn bộ frame bằng SessionLog (giải mã từng khối)
+    sai số            sai khác lớn nhất của landmark sau lượng tử hoá
+    đệm KB            bộ nhớ đệm cố định của writer (không tăng theo độ dài phiên)
+
+Ví dụ:
+    python -m benchmarks.bench_session_log
+    python -m benchmarks.bench_session_log --minutes 10 --fps 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.replay import save_landmark_log, synthetic_landmark_log
+from src.session_log import SessionLog, SessionLogWriter
+
+
+def bench_vslr(path, landmarks, present, timestamps, compress):
+    start = time.perf_counter()
+    with SessionLogWriter(path, compress=compress) as writer:
+        for i in range(len(present)):
+            writer.add(timestamps[i], landmarks[i] if present[i] else None)
+        buffered = writer.timestamps.nbytes + writer.landmarks.nbytes + writer.present.nbytes
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    error = 0.0
+    with SessionLog(path) as log:
+        for i, (timestamp, has_hand, points) in enumerate(log):
+            if has_hand:
+                error = max(error, float(np.abs(points - landmarks[i]).max()))
+    read_s = time.perf_counter() - start
+    return os.path.getsize(path), write_s, read_s, error, buffered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo kích thước / tốc độ log phiên landmark")
+    parser.add_argument("--minutes", type=float, default=60.0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    args = parser.parse_args()
+
+    num_frames = int(args.minutes * 60 * args.fps)
+    landmarks, present, _ = synthetic_landmark_log(num_frames)
+    timestamps = 1.7e9 + np.arange(num_frames) / args.fps
+    print(f"{num_frames} frame ({args.minutes:.0f} phút, {args.fps:.0f} FPS), {present.mean():.0%} có tay")
+    print(f"{'định dạng':<16}{'MB':>8}{'byte/frame':>12}{'ghi µs':>9}{'đọc s':>8}{'sai số':>10}{'đệm KB':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, compress in (('vslr nén', True), ('vslr không nén', False)):
+            size, write_s, read_s, error, buffered = bench_vslr(
+                os.path.join(tmp, f"{int(compress)}.vslr"), landmarks, present, timestamps, compress)
+            print(f"{label:<16}{size / 1e6:>8.2f}{size / num_frames:>12.1f}{write_s / num_frames * 1e6:>9.1f}"
+                  f"{read_s:>8.2f}{error:>10.1e}{buffered / 1024:>8.1f}")
+
+        path = os.path.join(tmp, "log.npz")
+        start = time.perf_counter()
+        save_landmark_log(path, landmarks, present, timestamps)
+        write_s = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(f"{'npz (float32)':<16}{size / 1e6:>8.2f}{size / num_frames:>12.1f}{write_s / num_frames * 1e6:>9.1f}"
+              f"{'-':>8}{0.0:>10.1e}{'toàn bộ':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""So sánh truyền frame giữa hai process: SharedFrameRing (shared memory) và multiprocessing.Queue.
+
+Process con đóng vai process đọc camera: ghi --frames frame BGR (720p, 1080p) nhanh nhất có
+thể, hoặc theo nhịp --fps. Process chính đóng vai FrameProcessor: lấy frame, đọc vài pixel
+và (tuỳ chọn) giả lập thời gian suy luận --work-ms. Mỗi cấu hình in:
+    f/s        số frame consumer nhận được mỗi giây
+    bỏ         frame bị ghi đè trước khi kịp đọc (ring: drop-oldest; queue không bỏ mà chặn producer)
+                 hoặc bị bỏ qua vì đã có frame mới hơn (shm mới nhất: get(latest=True))
+    get ms     thời gian consumer nằm trong get() (chờ + giải pickle với queue)
+    trễ p50/p95  từ lúc producer ghi tới lúc consumer nhận (time.perf_counter, CLOCK_MONOTONIC)
+
+Ví dụ:
+    python -m benchmarks.bench_shm_ring
+    python -m benchmarks.bench_shm_ring --fps 30 --work-ms 50   # consumer chậm hơn camera
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import time
+
+import numpy as np
+
+from src.shm_ring import SharedFrameRing
+
+RESOLUTIONS = {'720p': (720, 1280, 3), '1080p': (1080, 1920, 3)}
+
+
+def make_frames(shape, count=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 255, size=shape, dtype=np.uint8) for _ in range(count)]
+
+
+def produce_ring(ring, shape, count, fps):
+    frames = make_frames(shape)
+    interval = 1.0 / fps if fps else 0.0
+    start = time.perf_counter()
+    for i in range(count):
+        ring.put(frames[i % len(frames)])
+        if interval:
+            time.sleep(max(0.0, start + (i + 1) * interval - time.perf_counter()))
+    ring.close()
+
+
+def produce_queue(q, shape, count, fps):
+    frames = make_frames(shape)
+    interval = 1.0 / fps if fps else 0.0
+    start = time.perf_counter()
+    for i in range(count):
+        q.put((i + 1, time.perf_counter(), frames[i % len(frames)]))
+        if interval:
+            time.sleep(max(0.0, start + (i + 1) * interval - time.perf_counter()))
+    q.put(None)
+
+
+def consume(get, work_ms):
+    """Gọi get() tới khi hết frame, trả về (số frame, số bỏ, giây, [get ms], [trễ ms])."""
+    received = dropped = 0
+    last_seq = 0
+    get_ms, latency_ms = [], []
+    start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        item = get(last_seq)
+        t1 = time.perf_counter()
+        if item is None:
+            break
+        seq, timestamp, frame = item
+        get_ms.append((t1 - t0) * 1000.0)
+        latency_ms.append((t1 - timestamp) * 1000.0)
+        dropped += seq - last_seq - 1
+        last_seq = seq
+        received += 1
+        # Chạm vào dữ liệu frame (với ring là đọc thẳng từ shared memory)
+        int(frame[0, 0, 0]) + int(frame[-1, -1, -1])
+        if work_ms:
+            time.sleep(work_ms / 1000.0)
+    return received, dropped, time.perf_counter() - start, get_ms, latency_ms
+
+
+def run_ring(shape, count, fps, work_ms, slots, latest=False):
+    context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+    ring = SharedFrameRing.create(shape, slots, context)
+    producer = context.Process(target=produce_ring, args=(ring, shape, count, fps))
+    producer.start()
+    try:
+        return consume(lambda last_seq: ring.get(last_seq, timeout=5.0, latest=latest), work_ms)
+    finally:
+        producer.join()
+        ring.dispose()
+
+
+def run_queue(shape, count, fps, work_ms, slots):
+    context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+    q = context.Queue(maxsize=slots)
+    producer = context.Process(target=produce_queue, args=(q, shape, count, fps))
+    producer.start()
+
+    def get(_):
+        try:
+            return q.get(timeout=5.0)
+        except queue.Empty:
+            return None
+
+    try:
+        return consume(get, work_ms)
+    finally:
+        producer.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo truyền frame giữa process: shared memory ring và Queue")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--fps", type=float, default=None, help="Nhịp của producer (mặc định: nhanh nhất có thể)")
+    parser.add_argument("--work-ms", type=float, default=0.0, help="Thời gian xử lý giả lập mỗi frame ở consumer")
+    parser.add_argument("--slots", type=int, default=4, help="Số ô của ring / kích thước tối đa của Queue")
+    parser.add_argument("--resolutions", default="720p,1080p")
+    args = parser.parse_args()
+
+    print(f"{args.frames} frame, producer {'%.0f FPS' % args.fps if args.fps else 'tối đa'}, "
+          f"consumer xử lý {args.work_ms:.0f} ms/frame, {args.slots} ô")
+    print(f"{'độ phân giải':<14}{'cách truyền':<15}{'f/s':>9}{'bỏ':>7}{'get ms':>9}{'trễ p50':>9}{'trễ p95':>9}")
+    for name in args.resolutions.split(','):
+        shape = RESOLUTIONS[name.strip()]
+        for label, run, kwargs in (('queue', run_queue, {}), ('shm ring', run_ring, {}),
+                                   ('shm mới nhất', run_ring, {'latest': True})):
+            received, dropped, elapsed, get_ms, latency_ms = run(shape, args.frames, args.fps, args.work_ms,
+                                                                 args.slots, **kwargs)
+            print(f"{name:<14}{label:<15}{received / elapsed:>9.1f}{dropped:>7}{np.mean(get_ms):>9.3f}"
+                  f"{np.percentile(latency_ms, 50):>9.2f}{np.percentile(latency_ms, 95):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Thời gian từ lúc kết thúc cử chỉ dấu thanh tới lúc dấu thanh được áp dụng: chạy cả chuỗi và luồng.
+
+Mỗi cử chỉ là một phiên landmark ngắn: giữ tay 1s, di chuyển theo một quỹ đạo (thẳng / cung /
+lượn sóng, --min-duration tới --max-duration giây), giữ yên 1s rồi bỏ tay. Phiên được phát lại
+qua FrameProcessor với ReplayDetector và VirtualClock (thời gian ảo theo timestamp 30 FPS có
+dao động), classifier không bao giờ chốt ký tự để chỉ đo đường dấu thanh. Chỉ giữ các cử chỉ mà
+chế độ chạy cả chuỗi (như trước) áp dụng được dấu thanh, rồi so sánh với chế độ luồng:
+    trễ          thời điểm áp dụng - thời điểm frame chuyển động cuối (âm: chốt trước khi hết cử chỉ)
+    chốt sớm     số cử chỉ được chốt trước khi hết cử chỉ nhờ TONE_EARLY_COMMIT_*
+    trùng nhãn   tỉ lệ cử chỉ cho cùng dấu thanh với chế độ chạy cả chuỗi
+Cuối cùng đo chi phí LSTM: predict cả chuỗi, push() một frame và finish() (chỉ chạy các bước đệm).
+
+Với path (log landmark .npz / .vslr của phiên ghi thật, đọc bằng load_landmark_log), cả phiên được
+phát lại một lần mỗi chế độ. Phiên ghi không đánh dấu lúc kết thúc cử chỉ, nên mỗi dấu thanh của chế
+độ luồng được ghép với dấu thanh gần nhất (trong --match-window giây) của chế độ cả chuỗi:
+    lệch         thời điểm áp dụng của luồng - của cả chuỗi (âm: luồng áp dụng sớm hơn)
+    trùng nhãn   tỉ lệ cặp cho cùng dấu thanh; chỉ có ở một chế độ là dấu thanh thêm / mất
+Đây là số đo dùng để chỉnh TONE_EARLY_COMMIT_* trước khi bật TONE_STREAMING_ENABLED /
+TONE_EARLY_COMMIT_ENABLED. Chỉ đường dấu thanh được đo (classifier không chốt ký tự).
+
+Ví dụ:
+    python -m benchmarks.bench_tone_stream
+    python -m benchmarks.bench_tone_stream --gestures 200 --seed 1
+    python -m benchmarks.bench_tone_stream sessions/*.vslr
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from src.batch_transcribe import build_frame_processor
+from src.classification import BatchPrediction
+from src.config import CLASSES, TONE_FRAMES_COUNT
+from src.replay import DEFAULT_FRAME_SHAPE, ReplayDetector, VirtualClock, load_landmark_log
+
+FPS = 30.0
+HAND = np.stack([
+    0.08 * np.cos(np.linspace(0, 2 * np.pi, 21, endpoint=False)),
+    0.12 * np.sin(np.linspace(0, 2 * np.pi, 21, endpoint=False)),
+    np.zeros(21)
+], axis=1).astype(np.float32)
+
+
+class NoLetterClassifier:
+    """Phân bố đều trên mọi lớp: FrameProcessor không bao giờ chốt ký tự."""
+
+    def predict_landmarks(self, hand):
+        return BatchPrediction(np.zeros(len(CLASSES), dtype=np.float32))
+
+
+def make_gesture(rng, min_duration, max_duration):
+    """Phiên một cử chỉ: (landmarks, present, timestamps, thời điểm frame chuyển động cuối)."""
+    x0, y0 = rng.uniform(0.3, 0.7, size=2)
+    dx, dy = rng.uniform(-0.3, 0.3, size=2)
+    amp, freq = rng.uniform(-0.15, 0.15), rng.uniform(2, 6)
+    kind = rng.integers(3)
+    hold = int(FPS)
+    moving = int(rng.uniform(min_duration, max_duration) * FPS)
+    t = np.linspace(0, 1, moving)
+    wave = [np.zeros_like(t), np.sin(np.pi * t), np.sin(freq * np.pi * t)][kind]
+    path = np.stack([x0 + dx * t, y0 + dy * t + amp * wave], axis=1)
+    path = np.concatenate([np.repeat(path[:1], hold, axis=0), path, np.repeat(path[-1:], hold, axis=0)])
+    landmarks = HAND[None] + np.pad(path, ((0, 0), (0, 1)))[:, None, :]
+    landmarks += rng.normal(0, 0.001, size=landmarks.shape)
+    gap = int(1.5 * FPS)
+    landmarks = np.concatenate([np.clip(landmarks, 0, 1), np.zeros((gap, 21, 3))]).astype(np.float32)
+    present = np.arange(len(landmarks)) < len(path)
+    timestamps = 1000.0 + np.cumsum(rng.uniform(0.028, 0.039, size=len(landmarks)))
+    return landmarks, present, timestamps, float(timestamps[hold + moving - 1])
+
+
+def run_session(tone_predictor, landmarks, present, timestamps, streaming, frame_shape=DEFAULT_FRAME_SHAPE):
+    """Phát lại một phiên trên frame kích thước frame_shape, trả về danh sách (dấu thanh, thời điểm áp dụng, chốt sớm)."""
+    clock = VirtualClock(timestamps[0])
+    detector = ReplayDetector(landmarks, present, loop=False, frame_shape=frame_shape)
+    frame_processor = build_frame_processor(NoLetterClassifier(), tone_predictor, detector, clock=clock)
+    frame_processor.frame_gate = None
+    frame_processor.tone_streaming = streaming
+    frame_processor.tone_early_commit = streaming
+    applied = []
+    apply_tone = frame_processor.text_processor.apply_tone_to_word
+
+    def record(tone):
+        stream = frame_processor.tone_stream
+        applied.append((tone, clock(), stream is not None and frame_processor.tone_ready_early()))
+        apply_tone(tone)
+
+    frame_processor.text_processor.apply_tone_to_word = record
+    frame = np.zeros(frame_shape, dtype=np.uint8)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for timestamp in timestamps:
+            clock.set(timestamp)
+            frame_processor.process_frame(frame)
+            # Classifier không chốt ký tự: coi như đã có ký tự mới sau mỗi dấu thanh, để các
+            # dấu thanh tiếp theo trong một phiên ghi dài vẫn được nhận
+            frame_processor.tone_just_processed = False
+    return applied
+
+
+def run_gesture(tone_predictor, gesture, streaming):
+    """Phát lại một cử chỉ giả lập, trả về (dấu thanh, thời điểm áp dụng, chốt sớm) hoặc None."""
+    landmarks, present, timestamps, _ = gesture
+    applied = run_session(tone_predictor, landmarks, present, timestamps, streaming)
+    return applied[0] if applied else None
+
+
+def match_tones(baseline, streamed, window):
+    """Ghép mỗi dấu thanh luồng với dấu thanh cả chuỗi gần nhất chưa ghép (trong window giây).
+
+    Returns:
+        (danh sách (dấu cả chuỗi, dấu luồng, lệch giây, chốt sớm), số chỉ có ở cả chuỗi, số chỉ có ở luồng)
+    """
+    pairs, used = [], set()
+    for tone, t, early in streamed:
+        candidates = [(abs(t - bt), i) for i, (_, bt, _) in enumerate(baseline)
+                      if i not in used and abs(t - bt) <= window]
+        if not candidates:
+            continue
+        _, i = min(candidates)
+        used.add(i)
+        pairs.append((baseline[i][0], tone, t - baseline[i][1], early))
+    return pairs, len(baseline) - len(used), len(streamed) - len(pairs)
+
+
+def bench_recordings(tone_predictor, paths, window):
+    """So sánh hai chế độ trên các phiên ghi thật."""
+    pairs, missing, extra, total = [], 0, 0, 0
+    for path in paths:
+        landmarks, present, timestamps, frame_shape = load_landmark_log(path)
+        if not len(present):
+            print(f"[WARNING] {path} không có frame nào")
+            continue
+        baseline = run_session(tone_predictor, landmarks, present, timestamps, False, frame_shape)
+        streamed = run_session(tone_predictor, landmarks, present, timestamps, True, frame_shape)
+        matched, only_baseline, only_streamed = match_tones(baseline, streamed, window)
+        same = sum(a == b for a, b, _, _ in matched)
+        print(f"{path}: {timestamps[-1] - timestamps[0]:.0f}s, dấu thanh cả chuỗi {len(baseline)}, "
+              f"luồng {len(streamed)}, ghép {len(matched)} (trùng nhãn {same}), "
+              f"mất {only_baseline}, thêm {only_streamed}")
+        pairs += matched
+        missing += only_baseline
+        extra += only_streamed
+        total += len(baseline)
+    print(f"Tổng: {total} dấu thanh cả chuỗi, ghép {len(pairs)}, mất {missing}, thêm {extra}")
+    if not pairs:
+        return
+    shift = np.array([p[2] for p in pairs]) * 1000.0
+    early = np.array([p[3] for p in pairs])
+    same = np.array([p[0] == p[1] for p in pairs])
+    print(f"lệch p50 {np.percentile(shift, 50):.0f}ms, p95 {np.percentile(shift, 95):.0f}ms, "
+          f"trung bình {shift.mean():.0f}ms; trùng nhãn {same.mean():.0%}")
+    if early.any():
+        print(f"chốt sớm {early.sum()}/{len(pairs)}, trùng nhãn khi chốt sớm {same[early].mean():.0%}")
+
+
+def lstm_costs(tone_predictor, repeats=200):
+    rng = np.random.default_rng(0)
+    frames = rng.random((TONE_FRAMES_COUNT, 21, 3), dtype=np.float32)
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        tone_predictor.predict(list(frames))
+    predict_ms = (time.perf_counter() - t0) / repeats * 1000.0
+    push_ms, finish_ms = [], []
+    for _ in range(repeats):
+        stream = tone_predictor.start_stream()
+        t0 = time.perf_counter()
+        for frame in frames[:20]:
+            stream.push(frame)
+        push_ms.append((time.perf_counter() - t0) / 20 * 1000.0)
+        t0 = time.perf_counter()
+        stream.finish()
+        finish_ms.append((time.perf_counter() - t0) * 1000.0)
+    return predict_ms, float(np.mean(push_ms)), float(np.mean(finish_ms))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo trễ từ hết cử chỉ tới áp dụng dấu thanh: cả chuỗi và luồng")
+    parser.add_argument("path", nargs="*", help="Log landmark .npz / .vslr của phiên ghi thật (mặc định: cử chỉ giả lập)")
+    parser.add_argument("--match-window", type=float, default=1.5,
+                        help="Khoảng cách tối đa (giây) khi ghép dấu thanh của hai chế độ trên phiên ghi")
+    parser.add_argument("--gestures", type=int, default=100, help="Số cử chỉ thử (chỉ giữ cử chỉ chạy cả chuỗi nhận được)")
+    parser.add_argument("--min-duration", type=float, default=1.4, help="Thời gian chuyển động tối thiểu (giây)")
+    parser.add_argument("--max-duration", type=float, default=2.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from src.tone_predictor import TonePredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        tone_predictor = TonePredictor(backend='numpy')
+    if tone_predictor.start_stream() is None:
+        print("[ERROR] Cần mô hình LSTM backend 'numpy' (python -m src.numpy_lstm)")
+        return
+    if args.path:
+        bench_recordings(tone_predictor, args.path, args.match_window)
+        return
+
+    rng = np.random.default_rng(args.seed)
+    latencies = {False: [], True: []}
+    early = same = kept = 0
+    for _ in range(args.gestures):
+        gesture = make_gesture(rng, args.min_duration, args.max_duration)
+        baseline = run_gesture(tone_predictor, gesture, streaming=False)
+        if baseline is None:
+            continue
+        streamed = run_gesture(tone_predictor, gesture, streaming=True)
+        kept += 1
+        gesture_end = gesture[3]
+        latencies[False].append((baseline[1] - gesture_end) * 1000.0)
+        if streamed is not None:
+            latencies[True].append((streamed[1] - gesture_end) * 1000.0)
+            early += streamed[2]
+            same += streamed[0] == baseline[0]
+
+    print(f"{kept}/{args.gestures} cử chỉ được chế độ cả chuỗi áp dụng dấu thanh")
+    if not kept:
+        return
+    print(f"{'chế độ':<10}{'áp dụng':>9}{'trễ p50':>10}{'trễ p95':>10}{'trễ TB':>10}{'chốt sớm':>10}{'trùng nhãn':>12}")
+    for streaming, label in ((False, 'cả chuỗi'), (True, 'luồng')):
+        lat = np.asarray(latencies[streaming])
+        extra = f"{early:>10}{same / kept:>12.0%}" if streaming else f"{'-':>10}{'-':>12}"
+        print(f"{label:<10}{len(lat):>9}{np.percentile(lat, 50):>8.0f}ms{np.percentile(lat, 95):>8.0f}ms"
+              f"{lat.mean():>8.0f}ms{extra}")
+
+    predict_ms, push_ms, finish_ms = lstm_costs(tone_predictor)
+    print(f"LSTM: predict {TONE_FRAMES_COUNT} frame {predict_ms:.2f} ms, push {push_ms:.3f} ms/frame, "
+          f"finish sau 20 frame {finish_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Cache trên đĩa cho các dạng mô hình đã chuyển đổi / tối ưu (ONNX, int8, TFLite, .npz).
+
+Mỗi artifact được đánh khoá bằng SHA-256 của checkpoint nguồn (last.pt,
+lstm_model_final.h5) cộng loại artifact và các tuỳ chọn backend, nên chỉnh sửa
+checkpoint hoặc tuỳ chọn sẽ tự tạo artifact mới thay vì dùng nhầm bản cũ.
+
+    trained_models/.cache/
+        sources.json               # băm của checkpoint theo (kích thước, mtime) để khỏi băm lại
+        <khoá>.onnx / .npz / ...   # artifact
+        <khoá>.json                # tem phiên bản: định dạng cache, nguồn, tuỳ chọn, thời điểm tạo
+
+Ghi nguyên tử (file tạm + os.replace), nên nhiều process (vd. batch_transcribe)
+cùng build một artifact không làm hỏng cache. Khi tổng dung lượng vượt giới
+hạn, artifact lâu không dùng nhất bị xoá trước (mtime được cập nhật mỗi lần dùng).
+
+Ví dụ:
+    python -m src.artifact_cache --list
+    python -m src.artifact_cache --clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from src.config import ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_MB
+
+# Tăng khi đổi cách build / bố cục cache: mọi artifact cũ bị coi là không hợp lệ
+CACHE_FORMAT_VERSION = 1
+
+SOURCES_INDEX = "sources.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atomic_write_json(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ArtifactCache:
+    def __init__(self, root=ARTIFACT_CACHE_DIR, max_bytes=ARTIFACT_CACHE_MAX_MB * 1024 * 1024):
+        """
+        Args:
+            root (str): Thư mục cache.
+            max_bytes (int): Tổng dung lượng tối đa của các artifact; None để không giới hạn.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def source_hash(self, source_path):
+        """SHA-256 của checkpoint, chỉ băm lại khi kích thước hoặc mtime thay đổi."""
+        stat = os.stat(source_path)
+        index_path = os.path.join(self.root, SOURCES_INDEX)
+        index = {}
+        if os.path.isfile(index_path):
+            try:
+                with open(index_path, encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+        abs_path = os.path.abspath(source_path)
+        entry = index.get(abs_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+        sha = file_sha256(source_path)
+        index[abs_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha}
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write_json(index_path, index)
+        return sha
+
+    def key(self, source_path, kind, options=None):
+        """Khoá artifact: băm của (phiên bản cache, loại, tuỳ chọn, SHA-256 checkpoint)."""
+        payload = json.dumps({
+            'format': CACHE_FORMAT_VERSION,
+            'kind': kind,
+            'options': options or {},
+            'source': self.source_hash(source_path),
+        }, sort_keys=True)
+        return f"{kind}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]}"
+
+    def _paths(self, key, suffix):
+        return os.path.join(self.root, key + suffix), os.path.join(self.root, key + '.json')
+
+    def get(self, key, suffix):
+        """Đường dẫn artifact nếu có trong cache và đúng phiên bản, ngược lại None."""
+        path, meta_path = self._paths(key, suffix)
+        if not (os.path.isfile(path) and os.path.isfile(meta_path)):
+            return None
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get('format') != CACHE_FORMAT_VERSION:
+            self.remove(key, suffix)
+            return None
+        os.utime(path)  # Đánh dấu vừa dùng cho việc loại bỏ LRU
+        return path
+
+    def put(self, key, suffix, build, meta=None):
+        """Chạy build(tmp_path) để tạo artifact rồi đưa vào cache một cách nguyên tử.
+
+        Returns:
+            Đường dẫn artifact trong cache.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        path, meta_path = self._paths(key, suffix)
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=key + '.', suffix='.tmp' + suffix)
+        os.close(fd)
+        start = time.perf_counter()
+        try:
+            build(tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        atomic_write_json(meta_path, {
+            'format': CACHE_FORMAT_VERSION,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'build_seconds': round(time.perf_counter() - start, 3),
+            'size': os.path.getsize(path),
+            **(meta or {}),
+        })
+        self.evict(keep=path)
+        return path
+
+    def get_or_build(self, source_path, kind, suffix, build, options=None):
+        """Trả về artifact trong cache, hoặc build + lưu nếu chưa có."""
+        key = self.key(source_path, kind, options)
+        path = self.get(key, suffix)
+        if path is not None:
+            print(f"[INFO] Dùng artifact {kind} trong cache: {path}")
+            return path
+        print(f"[INFO] Chưa có artifact {kind} trong cache, đang tạo từ {source_path}...")
+        meta = {'kind': kind, 'source': os.path.abspath(source_path), 'options': options or {}}
+        path = self.put(key, suffix, build, meta)
+        print(f"[INFO] Đã lưu artifact {kind} vào cache: {path}")
+        return path
+
+    def entries(self):
+        """Danh sách (đường dẫn artifact, kích thước, mtime), cũ nhất trước."""
+        if not os.path.isdir(self.root):
+            return []
+        items = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name == SOURCES_INDEX or name.endswith(('.json', '.tmp')) or '.tmp' in name:
+                continue
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                items.append((path, stat.st_size, stat.st_mtime))
+        return sorted(items, key=lambda item: item[2])
+
+    def remove(self, key, suffix):
+        for path in self._paths(key, suffix):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def evict(self, keep=None):
+        """Xoá artifact ít dùng gần đây nhất tới khi tổng dung lượng không vượt max_bytes."""
+        if self.max_bytes is None:
+            return []
+        items = self.entries()
+        total = sum(size for _, size, _ in items)
+        removed = []
+        for path, size, _ in items:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            key, suffix = os.path.splitext(os.path.basename(path))
+            self.remove(key, suffix)
+            total -= size
+            removed.append(path)
+            print(f"[INFO] Loại artifact khỏi cache: {path}")
+        return removed
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            key, suffix = os.path.splitext(os.path.basename(path))
+            self.remove(key, suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quản lý cache artifact mô hình")
+    parser.add_argument("--root", default=ARTIFACT_CACHE_DIR)
+    parser.add_argument("--list", action="store_true", help="Liệt kê artifact (cũ nhất trước)")
+    parser.add_argument("--clear", action="store_true", help="Xoá toàn bộ artifact")
+    args = parser.parse_args()
+
+    cache = ArtifactCache(args.root)
+    if args.clear:
+        cache.clear()
+        print(f"[INFO] Đã xoá cache: {args.root}")
+    items = cache.entries()
+    for path, size, mtime in items:
+        print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))}  {size / 1024 / 1024:8.1f} MB  {path}")
+    total = sum(size for _, size, _ in items)
+    print(f"[INFO] {len(items)} artifact, {total / 1024 / 1024:.1f} MB / {ARTIFACT_CACHE_MAX_MB} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Chế độ xử lý hàng loạt không giao diện (headless).
+
+Chạy FrameProcessor + TextProcessor trên toàn bộ video trong một thư mục và
+ghi mỗi video ra một file transcript. Các file được chia cho một process pool,
+mỗi worker chỉ tải mô hình một lần.
+
+Ví dụ:
+    python -m src.batch_transcribe videos/ --output transcripts/ --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+
+# Trạng thái riêng của từng worker (mô hình được tải một lần trong initializer)
+_worker = {}
+
+
+def find_videos(input_dir):
+    """Liệt kê các file video trong thư mục (không đệ quy), sắp xếp theo tên."""
+    videos = []
+    for name in sorted(os.listdir(input_dir)):
+        path = os.path.join(input_dir, name)
+        if os.path.isfile(path) and name.lower().endswith(VIDEO_EXTENSIONS):
+            videos.append(path)
+    return videos
+
+
+def init_worker(classifier_path, tone_model_path, num_threads, record_dir=None):
+    """Tải mô hình một lần cho mỗi process worker."""
+    import torch
+    from src.classification import Classifier
+    from src.landmark_classifier import load_cascade
+    from src.tone_predictor import TonePredictor
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    _worker['classifier'] = load_cascade(Classifier(model_path=classifier_path))
+    _worker['tone_predictor'] = TonePredictor(model_path=tone_model_path)
+    _worker['record_dir'] = record_dir
+
+
+def build_frame_processor(classifier, tone_predictor, detector=None, recorder=None, clock=None):
+    """Tạo FrameProcessor mới (trạng thái riêng) dùng chung mô hình đã tải."""
+    from src.model import StabilityDetector
+    from src.text_processor import TextProcessor
+    from src.frame_processor import FrameProcessor
+
+    if detector is None:
+        from src.hand_tracking import handDetector
+        detector = handDetector(maxHands=1)
+    return FrameProcessor(
+        detector=detector,
+        classifier=classifier,
+        tone_predictor=tone_predictor,
+        stability_detector=StabilityDetector(max_frames=12, stability_threshold=0.025),
+        text_processor=TextProcessor(),
+        recorder=recorder,
+        clock=clock or time.time
+    )
+
+
+def video_timestamp(cap, frame_index, fps, previous):
+    """Thời điểm (giây) của frame vừa đọc theo dòng thời gian của video.
+
+    Dùng CAP_PROP_POS_MSEC; backend không hỗ trợ (trả về 0 / không tăng) thì tính
+    frame_index / fps. Kết quả không bao giờ lùi so với previous.
+    """
+    import cv2
+
+    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+    if frame_index and timestamp <= previous:
+        timestamp = frame_index / fps
+    return max(timestamp, previous)
+
+
+def transcribe_video(video_path):
+    """Xử lý một video, trả về (video_path, số frame, thời gian xử lý, transcript, lỗi).
+
+    Video được giải mã nhanh hơn thời gian thực nhiều lần, nên FrameProcessor chạy trên
+    VirtualClock theo thời điểm của từng frame trong video: các cửa sổ dấu thanh và cooldown
+    giống như khi quay trực tiếp.
+    """
+    import cv2
+    from src.replay import VirtualClock
+
+    start = time.perf_counter()
+    frames = 0
+    recorder = None
+    try:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return video_path, 0, 0.0, "", "không mở được video"
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not fps or fps <= 0 or fps > 1000:
+            fps = 30.0
+        clock = VirtualClock(0.0)
+        if _worker.get('record_dir'):
+            from src.session_log import EXTENSION, SessionLogWriter
+
+            name = os.path.splitext(os.path.basename(video_path))[0] + EXTENSION
+            recorder = SessionLogWriter(os.path.join(_worker['record_dir'], name))
+        frame_processor = build_frame_processor(_worker['classifier'], _worker['tone_predictor'],
+                                                recorder=recorder, clock=clock)
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                clock.set(video_timestamp(cap, frames, fps, clock()))
+                frame_processor.process_frame(frame)
+                frames += 1
+        finally:
+            cap.release()
+            if recorder is not None:
+                recorder.close()
+        text_processor = frame_processor.text_processor
+        text_processor.finalize_word()
+        transcript = text_processor.get_full_text().strip()
+        return video_path, frames, time.perf_counter() - start, transcript, None
+    except Exception as e:
+        return video_path, frames, time.perf_counter() - start, "", str(e)
+
+
+def write_transcript(output_dir, video_path, transcript):
+    name = os.path.splitext(os.path.basename(video_path))[0] + ".txt"
+    out_path = os.path.join(output_dir, name)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(transcript)
+    return out_path
+
+
+def run_batch(input_dir, output_dir, workers=None, classifier_path="trained_models/last.pt",
+              tone_model_path="trained_models/lstm_model_final.h5", num_threads=1, record_dir=None):
+    """Xử lý mọi video trong input_dir, trả về thống kê tổng hợp.
+
+    Nếu có record_dir, landmark của mỗi video được ghi ra record_dir/<tên video>.vslr.
+    """
+    videos = find_videos(input_dir)
+    if not videos:
+        print(f"[WARNING] Không tìm thấy video nào trong {input_dir}")
+        return {'videos': 0, 'frames': 0, 'elapsed': 0.0, 'fps': 0.0, 'errors': 0}
+
+    os.makedirs(output_dir, exist_ok=True)
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(videos)))
+    print(f"[INFO] Xử lý {len(videos)} video với {workers} worker")
+
+    total_frames = 0
+    errors = 0
+    start = time.perf_counter()
+    with mp.Pool(workers, initializer=init_worker,
+                 initargs=(classifier_path, tone_model_path, num_threads, record_dir)) as pool:
+        for video_path, frames, elapsed, transcript, error in pool.imap_unordered(transcribe_video, videos):
+            total_frames += frames
+            if error:
+                errors += 1
+                print(f"[ERROR] {video_path}: {error}")
+                continue
+            out_path = write_transcript(output_dir, video_path, transcript)
+            fps = frames / elapsed if elapsed > 0 else 0.0
+            print(f"[INFO] {video_path}: {frames} frame, {fps:.1f} FPS -> {out_path}")
+    total_elapsed = time.perf_counter() - start
+
+    overall_fps = total_frames / total_elapsed if total_elapsed > 0 else 0.0
+    print(f"[INFO] Tổng cộng: {total_frames} frame trong {total_elapsed:.1f}s ({overall_fps:.1f} FPS), {errors} lỗi")
+    return {'videos': len(videos), 'frames': total_frames, 'elapsed': total_elapsed,
+            'fps': overall_fps, 'errors': errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nhận diện ngôn ngữ ký hiệu hàng loạt từ thư mục video")
+    parser.add_argument("input_dir", help="Thư mục chứa video")
+    parser.add_argument("--output", default="transcripts", help="Thư mục ghi transcript")
+    parser.add_argument("--workers", type=int, default=None, help="Số process (mặc định: số CPU)")
+    parser.add_argument("--threads", type=int, default=1, help="Số thread PyTorch cho mỗi worker")
+    parser.add_argument("--classifier", default="trained_models/last.pt")
+    parser.add_argument("--tone-model", default="trained_models/lstm_model_final.h5")
+    parser.add_argument("--record", metavar="DIR", help="Ghi log phiên landmark (.vslr) của mỗi video vào thư mục")
+    args = parser.parse_args()
+
+    run_batch(args.input_dir, args.output, workers=args.workers,
+              classifier_path=args.classifier, tone_model_path=args.tone_model,
+              num_threads=args.threads, record_dir=args.record)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Gom các lời gọi mô hình đồng thời thành batch (micro-batching).
+
+Khi nhiều luồng được xử lý cùng lúc (src.service), mỗi FrameProcessor gọi
+Classifier.predict_tensor với batch 1 ảnh và TonePredictor.predict với 1 chuỗi, nên
+phần lớn khả năng tính toán vector của CPU bị bỏ phí. MicroBatcher đứng giữa
+FrameProcessor và mô hình: các thread gọi gửi yêu cầu vào hàng đợi và nhận một
+Future; thread của batcher gom yêu cầu và chạy một batch khi
+    - đủ max_batch_size yêu cầu, hoặc
+    - yêu cầu cũ nhất đã chờ max_wait_ms (giới hạn độ trễ thêm vào).
+
+BatchedClassifier / BatchedTonePredictor có cùng giao diện với mô hình được bọc nên
+FrameProcessor không cần thay đổi. Chỉ thread của batcher gọi mô hình, nên không cần
+khoá như LockedModel.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from src.config import CLASSIFIER_BATCH_SIZE, CLASSIFIER_BATCH_WAIT_MS, TONE_BATCH_SIZE, TONE_BATCH_WAIT_MS
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, max_batch_size=CLASSIFIER_BATCH_SIZE, max_wait_ms=CLASSIFIER_BATCH_WAIT_MS,
+                 name='batcher'):
+        """
+        Args:
+            run_batch: Hàm danh sách N yêu cầu -> danh sách N kết quả cùng thứ tự.
+            max_batch_size (int): Số yêu cầu tối đa mỗi batch.
+            max_wait_ms (float): Thời gian tối đa yêu cầu cũ nhất chờ gom thêm trước khi chạy.
+            name (str): Tên thread, dùng khi in thống kê.
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size phải >= 1: {max_batch_size}")
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = deque()  # (yêu cầu, Future, thời điểm gửi)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.fill_counts = [0] * (max_batch_size + 1)  # fill_counts[k]: số batch có k yêu cầu
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, request):
+        """Đưa một yêu cầu vào hàng đợi, trả về concurrent.futures.Future của kết quả."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} đã đóng")
+            self._queue.append((request, future, time.perf_counter()))
+            depth = len(self._queue)
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            if depth == 1 or depth >= self.max_batch_size:
+                self._cond.notify()
+        return future
+
+    def __call__(self, request):
+        """Gửi yêu cầu và chờ kết quả (thread gọi bị chặn tới khi batch chứa nó chạy xong)."""
+        return self.submit(request).result()
+
+    def _next_batch(self):
+        """Chờ tới khi đủ batch hoặc hết hạn chờ, lấy ra tối đa max_batch_size yêu cầu."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue or self._closed)
+            if not self._queue:
+                return None
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            futures = [future for _, future, _ in batch]
+            try:
+                results = self.run_batch([request for request, _, _ in batch])
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            self.batches += 1
+            self.items += len(batch)
+            self.fill_counts[len(batch)] += 1
+            self.total_wait += sum(start - t for _, _, t in batch)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def close(self, timeout=None):
+        """Chạy nốt các yêu cầu còn trong hàng đợi rồi dừng thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'queue_depth': self.queue_depth(),
+            'max_queue_depth': self.max_queue_depth,
+            'mean_batch': self.items / self.batches if self.batches else 0.0,
+            'fill_rate': self.items / (self.batches * self.max_batch_size) if self.batches else 0.0,
+            'mean_wait_ms': self.total_wait / self.items * 1000.0 if self.items else 0.0,
+            'fill_counts': {size: n for size, n in enumerate(self.fill_counts) if n}
+        }
+
+
+class BatchedClassifier:
+    """Bọc Classifier / CascadeClassifier: predict_tensor của nhiều thread được gom thành batch.
+
+    predict_landmarks (đường nhanh MLP, rẻ) và các phương thức khác gọi thẳng mô hình.
+    """
+
+    def __init__(self, classifier, max_batch_size=CLASSIFIER_BATCH_SIZE, max_wait_ms=CLASSIFIER_BATCH_WAIT_MS):
+        self.classifier = classifier
+        self.batcher = MicroBatcher(self.run_batch, max_batch_size, max_wait_ms, name='classifier-batcher')
+
+    def run_batch(self, tensors):
+        from src.classification import BatchPrediction
+
+        result = self.classifier.predict_tensor(np.concatenate(tensors))
+        offsets = np.cumsum([0] + [len(t) for t in tensors])
+        return [BatchPrediction(result.logits[a:b]) for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def predict_tensor(self, batch):
+        # Sao chép: CropPreprocessor dùng lại cùng một buffer cho frame sau
+        return self.batcher(np.array(batch, dtype=np.float32))
+
+    def stats(self):
+        stats = getattr(self.classifier, 'stats', None)
+        return {**(stats() if stats is not None else {}), 'batching': self.batcher.stats()}
+
+    def close(self, timeout=None):
+        self.batcher.close(timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.classifier, name)
+
+
+class BatchedTonePredictor:
+    """Bọc TonePredictor: predict(chuỗi keypoints) của nhiều thread được gom thành batch."""
+
+    def __init__(self, tone_predictor, max_batch_size=TONE_BATCH_SIZE, max_wait_ms=TONE_BATCH_WAIT_MS):
+        self.tone_predictor = tone_predictor
+        self.batcher = MicroBatcher(tone_predictor.predict_batch, max_batch_size, max_wait_ms,
+                                    name='tone-batcher')
+
+    def predict(self, keypoints_sequence):
+        return self.batcher(list(keypoints_sequence))
+
+    def start_stream(self):
+        """Luôn None: mỗi phiên dự đoán cả chuỗi qua predict() để được gom batch.
+
+        Một bước ToneStream mỗi frame chỉ tốn vài chục µs; gom các bước đó qua MicroBatcher
+        thì mỗi frame phải chờ batch, còn chạy riêng thì các cử chỉ bỏ qua gom batch.
+        """
+        return None
+
+    def stats(self):
+        return {'batching': self.batcher.stats()}
+
+    def close(self, timeout=None):
+        self.batcher.close(timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.tone_predictor, name)
@@ -0,0 +1,109 @@
+import threading
+import time
+
+
+class LatestFrameBuffer:
+    """Bộ đệm một ô: chỉ giữ frame mới nhất, frame cũ bị ghi đè (latest-frame-wins)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._closed = False
+
+    def put(self, frame, timestamp=None):
+        """Ghi frame mới vào bộ đệm, ghi đè frame chưa được đọc. Bỏ qua frame nếu đã close()."""
+        with self._cond:
+            if self._closed:
+                return
+            self._frame = frame
+            self._timestamp = time.perf_counter() if timestamp is None else timestamp
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, last_seq=0, timeout=None):
+        """Chờ frame có số thứ tự lớn hơn last_seq.
+
+        Returns:
+            (seq, timestamp, frame) hoặc None nếu hết thời gian chờ / bộ đệm đã đóng.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > last_seq or self._closed, timeout):
+                return None
+            if self._seq <= last_seq:
+                return None
+            return self._seq, self._timestamp, self._frame
+
+    def close(self):
+        """Đánh thức mọi luồng đang chờ và không nhận thêm frame."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reset(self):
+        with self._cond:
+            self._frame = None
+            self._timestamp = 0.0
+            self._seq = 0
+            self._closed = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class FrameGrabber(threading.Thread):
+    """Luồng đọc camera liên tục và đẩy frame vào LatestFrameBuffer.
+
+    Mỗi phiên camera nên dùng một LatestFrameBuffer riêng: luồng đọc bị kẹt (vd trong
+    cap.read()) quá timeout của stop() chỉ đóng bộ đệm của chính nó khi thoát.
+    """
+
+    def __init__(self, cap, buffer, retry_delay=0.005):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.buffer = buffer
+        self.retry_delay = retry_delay
+        self.frames_captured = 0
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._release = False
+        self._finished = False
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    time.sleep(self.retry_delay)
+                    continue
+                self.frames_captured += 1
+                self.buffer.put(frame)
+        finally:
+            self.buffer.close()
+            with self._lock:
+                self._finished = True
+                if self._release:
+                    self.cap.release()
+
+    def stop(self, timeout=1.0, release=False):
+        """Dừng luồng đọc, chờ tối đa timeout giây.
+
+        Args:
+            release (bool): Giải phóng cap sau khi luồng đọc thoát. Luồng tự giải phóng khi
+                ra khỏi vòng lặp, nên cap không bị release trong lúc cap.read() còn chạy
+                kể cả khi stop() hết timeout trước.
+
+        Returns:
+            bool: True nếu luồng đã dừng trong timeout.
+        """
+        with self._lock:
+            self._stop_event.set()
+            self._release = release
+            if release and self._finished:
+                # Luồng đã thoát trước đó (vd cap.read() ném lỗi)
+                self.cap.release()
+        if self.is_alive():
+            self.join(timeout)
+        return not self.is_alive()
@@ -4,14 +4,82 @@ import torch
 import torch.nn as nn
 import numpy as np
 from torchvision.models import resnet50
-from src.config import CLASSES
+from src.config import CLASSES, CLASSIFIER_BACKEND, ARTIFACT_CACHE_ENABLED
+from src.preprocessing import image_to_tensor
+
+# Backend suy luận được hỗ trợ và hậu tố file ONNX tương ứng
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+ONNX_SUFFIXES = {'onnx': '.onnx', 'onnx-int8': '.int8.onnx'}
+
+
+def softmax(logits):
+    """Softmax theo hàng cho logits (N, số lớp), trả về float32"""
+    logits = np.asarray(logits, dtype=np.float32)
+    e = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class BatchPrediction:
+    """Kết quả dự đoán cho N ảnh crop.
+
+    Attributes:
+        logits: np.ndarray float32 (N, số lớp)
+        probabilities: np.ndarray float32 (N, số lớp), đã qua softmax
+        indices: np.ndarray int64 (N,), lớp có xác suất cao nhất
+        confidences: np.ndarray float32 (N,), xác suất của lớp đó
+    """
+    __slots__ = ('logits', 'probabilities', 'indices', 'confidences')
+
+    def __init__(self, logits):
+        self.logits = np.asarray(logits, dtype=np.float32).reshape(-1, len(CLASSES))
+        self.probabilities = softmax(self.logits)
+        self.indices = self.probabilities.argmax(axis=1)
+        self.confidences = self.probabilities[np.arange(len(self.indices)), self.indices]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def label(self, i):
+        return CLASSES[self.indices[i]]
+
+
+def default_onnx_path(model_path, backend):
+    """Đường dẫn file ONNX mặc định cạnh checkpoint, vd. last.pt -> last.int8.onnx"""
+    return os.path.splitext(model_path)[0] + ONNX_SUFFIXES[backend]
+
 
 class Classifier:
-    def __init__(self, model_path="trained_models/last.pt"):
+    def __init__(self, model_path="trained_models/last.pt", backend=None, onnx_path=None):
+        """
+        Args:
+            model_path (str): Checkpoint PyTorch (.pt) của ResNet50.
+            backend (str): 'torch', 'onnx' hoặc 'onnx-int8'. Mặc định lấy CLASSIFIER_BACKEND trong config.
+            onnx_path (str): File ONNX cho backend onnx. Mặc định đặt cạnh model_path.
+        """
         self.model_path = model_path
+        self.backend = backend or CLASSIFIER_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend không hợp lệ: {self.backend} (hỗ trợ: {', '.join(BACKENDS)})")
+        self.model = None
+        self.session = None
+
+        if self.backend != 'torch':
+            self.onnx_path = onnx_path or default_onnx_path(model_path, self.backend)
+            if onnx_path is None and not os.path.isfile(self.onnx_path) and ARTIFACT_CACHE_ENABLED:
+                # Không có file xuất tay cạnh checkpoint: lấy từ cache hoặc tự xuất một lần
+                self.onnx_path = self.cached_onnx() or self.onnx_path
+            if self.load_onnx(self.onnx_path):
+                return
+            print(f"[WARNING] Không dùng được backend {self.backend}, chuyển về PyTorch. "
+                  f"Tạo file ONNX bằng: python -m src.onnx_export --model {model_path}")
+            self.backend = 'torch'
+
+        self.load_torch()
+
+    def load_torch(self):
         self.model = resnet50()
         self.model.fc = nn.Linear(self.model.fc.in_features, len(CLASSES))
-        
+
         # Load model trên CPU
         if self.model_path is not None and os.path.isfile(self.model_path):
             checkpoint = torch.load(self.model_path, map_location=torch.device("cpu"))
@@ -24,26 +92,104 @@ class Classifier:
         self.model.to(torch.device("cpu"))
         self.model.eval()
 
+    def cached_onnx(self):
+        """Đường dẫn ONNX (int8 động cho 'onnx-int8') trong ArtifactCache, tự xuất nếu chưa có."""
+        if self.model_path is None or not os.path.isfile(self.model_path):
+            return None
+        try:
+            import onnxruntime
+            from src.artifact_cache import ArtifactCache
+            from src.onnx_export import export_onnx, quantize_dynamic_int8
+        except ImportError as e:
+            print(f"[WARNING] Không tạo được ONNX: {e}")
+            return None
+
+        options = {'opset': 17, 'torch': torch.__version__, 'onnxruntime': onnxruntime.__version__}
+        if self.backend == 'onnx-int8':
+            options['quantize'] = 'dynamic'
+
+        def build(out_path):
+            if self.model is None:
+                self.load_torch()
+            if self.backend == 'onnx':
+                export_onnx(self, out_path, opset=options['opset'])
+                return
+            fp32_path = out_path + ".fp32.onnx"
+            try:
+                export_onnx(self, fp32_path, opset=options['opset'])
+                quantize_dynamic_int8(fp32_path, out_path)
+            finally:
+                for path in (fp32_path, fp32_path + ".data"):  # .data: trọng số ngoài nếu exporter tách ra
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        try:
+            path = ArtifactCache().get_or_build(self.model_path, self.backend, '.onnx', build, options)
+        except Exception as e:
+            print(f"[WARNING] Không tạo được ONNX trong cache: {e}")
+            return None
+        finally:
+            self.model = None  # Không giữ trọng số PyTorch khi chạy bằng ONNX Runtime
+        return path
+
+    def load_onnx(self, onnx_path):
+        """Tạo phiên ONNX Runtime, trả về False nếu thiếu file hoặc thư viện."""
+        if not os.path.isfile(onnx_path):
+            print(f"[WARNING] Không tìm thấy mô hình ONNX tại: {onnx_path}")
+            return False
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            print("[WARNING] Chưa cài onnxruntime (pip install onnxruntime)")
+            return False
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        print(f"[INFO] Đã tải mô hình ký tự ({self.backend}) từ: {onnx_path}")
+        return True
+
+    def preprocess(self, ori_image):
+        """Ảnh BGR uint8 -> tensor float32 (1, 3, 224, 224) trong [0, 1]"""
+        return image_to_tensor(ori_image)
+
+    def preprocess_batch(self, images):
+        """Danh sách ảnh BGR uint8 -> batch float32 (N, 3, 224, 224)"""
+        batch = np.empty((len(images), 3, 224, 224), dtype=np.float32)
+        for i, image in enumerate(images):
+            batch[i] = self.preprocess(image)[0]
+        return batch
+
+    def infer(self, batch):
+        """Chạy mô hình trên batch float32 NCHW, trả về logits dạng np.ndarray (N, số lớp)"""
+        if self.session is not None:
+            return self.session.run(None, {self.input_name: batch})[0]
+        with torch.no_grad():
+            return self.model(torch.from_numpy(batch)).numpy()
+
+    def predict_tensor(self, batch):
+        """Dự đoán từ batch float32 (N, 3, 224, 224) đã tiền xử lý sẵn (vd. từ CropPreprocessor)"""
+        return BatchPrediction(self.infer(batch))
+
+    def predict_batch(self, images):
+        """Dự đoán N ảnh crop trong một lần forward, trả về BatchPrediction"""
+        if len(images) == 0:
+            return BatchPrediction(np.zeros((0, len(CLASSES)), dtype=np.float32))
+        return BatchPrediction(self.infer(self.preprocess_batch(images)))
+
     def prediction(self, ori_image, draw=True):
-        device = torch.device("cpu")
         # Lưu ảnh gốc để vẽ
         image_to_draw = ori_image.copy() if draw else None
-        # Preprocessing
-        image = cv2.resize(ori_image, (224, 224))
-        image = np.transpose(image, (2, 0, 1)) / 255.0
-        image = image[None, :, :, :]
-        image = torch.from_numpy(image).float().to(device)
 
         # Prediction
-        with torch.no_grad():
-            results = self.model(image)
-            probabilities = torch.softmax(results, dim=1).numpy()[0]
-            prediction = np.argmax(probabilities)
-            confidence = probabilities[prediction]
+        result = self.predict_batch([ori_image])
+        results = result.logits
+        prediction = result.indices[0]
+        confidence = result.confidences[0]
 
         if draw and image_to_draw is not None:
-            cv2.putText(image_to_draw, f"{CLASSES[prediction]} ({confidence:.2f})", 
+            cv2.putText(image_to_draw, f"{CLASSES[prediction]} ({confidence:.2f})",
                        (50, 50), cv2.FONT_HERSHEY_COMPLEX, 2, (0, 255, 0), 2)
             return list(results[0]), prediction, image_to_draw, confidence
 
-        return list(results[0]), prediction, ori_image, confidence
\ No newline at end of file
+        return list(results[0]), prediction, ori_image, confidence
@@ -32,6 +32,84 @@ PREDICTION_HISTORY_SIZE = 25
 MIN_CONFIDENCE_THRESHOLD = 0.98
 TONE_CONFIDENCE_THRESHOLD = 0.8
 
+# Kích thước đầu vào của MediaPipe. Hai chế độ thu nhỏ / theo dõi vùng mặc định tắt: chưa có số đo
+# findHands đầu-cuối và độ lệch landmark so với toàn frame trên video thật
+# (python -m benchmarks.bench_detection --video hand.mp4); chỉ bật khi số đo cho thấy có lợi
+DETECTION_RESIZE_ENABLED = False  # Thu nhỏ frame theo DETECTION_INPUT_SIZE khi tìm tay trên toàn frame
+DETECTION_INPUT_SIZE = 640     # Cạnh dài tối đa của frame khi tìm tay trên toàn frame (khi bật thu nhỏ)
+ROI_TRACKING_ENABLED = False   # Sau một lần phát hiện tin cậy chỉ xử lý vùng quanh bbox trước đó
+ROI_WORKING_SIZE = 256         # Cạnh dài tối đa của vùng theo dõi sau khi resize
+ROI_EXPAND = 1.8               # Cạnh vùng theo dõi = cạnh dài bbox x hệ số này
+ROI_MIN_CONFIDENCE = 0.8       # Điểm tin cậy tối thiểu (handedness) để bật theo dõi vùng
+
+# Dùng lại landmark khi khung hình gần như không đổi (bỏ qua MediaPipe). Mặc định tắt: frame dùng lại
+# đưa đúng landmark của keyframe vào StabilityDetector / HandKinematics (năng lượng chuyển động bằng 0,
+# phương sai trượt nhỏ lại) nên thay đổi thời điểm chốt ký tự và đặc trưng chuyển động dấu thanh; chỉ
+# bật khi phát lại phiên ghi thật cho cùng transcript
+FRAME_GATE_ENABLED = False
+FRAME_GATE_THRESHOLD = 2.0     # Sai khác trung bình tối đa (mức xám 0-255) trên ảnh thu nhỏ
+FRAME_GATE_MAX_REUSE = 2       # Số frame dùng lại liên tiếp tối đa trước khi buộc phát hiện lại
+FRAME_GATE_WIDTH = 160         # Chiều rộng ảnh xám thu nhỏ dùng để so sánh
+
+# Backend suy luận cho Classifier: 'torch', 'onnx' hoặc 'onnx-int8'
+CLASSIFIER_BACKEND = 'torch'
+
+# Cache kết quả phân loại theo tư thế tay (bỏ qua ResNet khi tay giữ nguyên ký hiệu)
+POSE_CACHE_ENABLED = True
+POSE_CACHE_SIZE = 32          # Số tư thế tối đa (LRU)
+POSE_CACHE_TTL = 2.0          # Giây; mục cũ hơn sẽ bị loại để ResNet xác nhận lại
+POSE_CACHE_TOLERANCE = 0.03   # Sai khác tối đa theo kích thước bàn tay
+
+# Đường nhanh: MLP phân loại từ landmark, chỉ gọi ResNet50 khi không đủ tin cậy
+LANDMARK_MODEL_PATH = "trained_models/landmark_mlp.npz"  # Không có file thì tắt đường nhanh
+FAST_PATH_CONFIDENCE = 0.98
+FAST_PATH_AMBIGUOUS_CLASSES = []  # Thêm vào danh sách lớp dễ nhầm lưu trong mô hình
+
+# Backend suy luận cho TonePredictor:
+#   'keras'    - model.predict (chậm, nhiều chi phí mỗi lần gọi)
+#   'function' - tf.function đã trace sẵn trên mô hình Keras
+#   'tflite'   - TFLite Interpreter (tạo file bằng python -m src.tflite_export)
+#   'numpy'    - forward pass NumPy, không cần TensorFlow (tạo file bằng python -m src.numpy_lstm)
+TONE_BACKEND = 'function'
+
+# Nhận dấu thanh dạng luồng (chỉ backend 'numpy'): mỗi frame thu thập chạy một bước LSTM, giữ
+# trạng thái ẩn; khi hết cử chỉ chỉ còn các bước đệm (cùng kết quả với chạy cả chuỗi).
+# Chốt sớm: chốt dấu thanh ngay khi đủ tự tin, bỏ qua điều kiện cử chỉ >= 1.2s và dừng thu thập sớm.
+# Cả hai mặc định tắt: ngưỡng chốt sớm mới chỉ được chỉnh trên cử chỉ giả lập (~5% lệch nhãn so với
+# cả chuỗi); chỉ bật khi python -m benchmarks.bench_tone_stream <log .vslr/.npz> trên phiên ghi thật
+# cho thấy ngưỡng phù hợp
+TONE_STREAMING_ENABLED = False
+TONE_EARLY_COMMIT_ENABLED = False  # Chỉ có tác dụng khi TONE_STREAMING_ENABLED
+TONE_EARLY_COMMIT_MARGIN = 0.19    # Chốt sớm khi độ tin cậy >= TONE_CONFIDENCE_THRESHOLD + margin (0.99);
+                                   # margin nhỏ hơn chốt sớm hơn nhưng hay lệch nhãn so với cả chuỗi
+TONE_EARLY_COMMIT_MIN_FRAMES = 8   # ... sau ít nhất chừng này frame đã thu thập
+TONE_EARLY_COMMIT_STABLE_STEPS = 3 # ... và cùng một nhãn ở chừng này bước liên tiếp
+
+# Cache artifact đã chuyển đổi (ONNX, int8, TFLite, .npz) theo băm của checkpoint nguồn
+ARTIFACT_CACHE_ENABLED = True
+ARTIFACT_CACHE_DIR = "trained_models/.cache"
+ARTIFACT_CACHE_MAX_MB = 1024  # Vượt quá thì xoá artifact ít dùng gần đây nhất
+
+# Dịch vụ suy luận nhiều phiên (python -m src.service)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_MAX_SESSIONS = 64
+SERVICE_QUEUE_SIZE = 4         # Số frame chờ tối đa mỗi phiên
+SERVICE_BACKPRESSURE = 'drop'  # 'drop': bỏ frame cũ nhất khi đầy, 'block': ngừng đọc socket tới khi có chỗ
+SERVICE_SESSION_TIMEOUT = 30.0 # Giây không nhận được gì thì đóng phiên
+
+# Gom lời gọi mô hình của nhiều phiên thành batch (src.batching), 1 để tắt
+CLASSIFIER_BATCH_SIZE = 8
+CLASSIFIER_BATCH_WAIT_MS = 4.0  # Yêu cầu cũ nhất chờ tối đa chừng này trước khi chạy batch chưa đầy
+TONE_BATCH_SIZE = 8
+TONE_BATCH_WAIT_MS = 2.0
+
+# Ghi phiên landmark (src.session_log) để phát lại / benchmark không cần camera
+SESSION_LOG_CHUNK_FRAMES = 256  # Số frame đệm trong bộ nhớ trước khi ghi một khối ra file
+SESSION_LOG_SCALE = 8192        # Landmark lưu int16 = round(giá trị * scale): bước 1.2e-4, phạm vi +-4
+SESSION_LOG_COMPRESS = True     # Nén zlib từng khối (delta theo thời gian); False để đọc mmap không giải nén
+SESSION_LOG_CROP_SIZE = 64      # Cạnh ảnh crop thu nhỏ lưu lại khi chốt ký tự, 0 để không lưu
+
 # Labels for tone recognition
 TONE_LABELS = ['huyen', 'sac', 'hoi', 'nga', 'nang']
 
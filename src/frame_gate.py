@@ -0,0 +1,97 @@
+"""Bỏ qua phát hiện tay khi khung hình gần như không đổi.
+
+Khi người dùng giữ yên một ký hiệu, các frame liên tiếp gần như giống hệt nhau
+nhưng MediaPipe vẫn chạy đầy đủ ở mỗi frame. StaticSceneGate so ảnh xám thu nhỏ
+(lấy mẫu nearest + làm mượt 3x3 để bớt nhiễu cảm biến, ~0.1 ms ở 1080p) của frame
+hiện tại với frame gần nhất đã thực sự chạy phát hiện (keyframe):
+    - keyframe có tay: so vùng quanh bbox của từng bàn tay, lấy sai khác lớn nhất (thay
+      đổi ở nền không tính, một bàn tay di chuyển là đủ để chạy phát hiện lại)
+    - keyframe không có tay: so toàn ảnh
+Nếu sai khác trung bình dưới ngưỡng thì dùng lại landmark của keyframe. Số frame
+dùng lại liên tiếp bị giới hạn bởi max_reuse để landmark không bị cũ.
+"""
+import cv2
+
+from src.config import FRAME_GATE_THRESHOLD, FRAME_GATE_MAX_REUSE, FRAME_GATE_WIDTH
+from src.hand_frame import square_region
+
+
+class StaticSceneGate:
+    def __init__(self, threshold=FRAME_GATE_THRESHOLD, max_reuse=FRAME_GATE_MAX_REUSE, width=FRAME_GATE_WIDTH,
+                 roi_expand=1.5):
+        """
+        Args:
+            threshold (float): Sai khác tuyệt đối trung bình (mức xám 0-255) tối đa để coi là không đổi.
+            max_reuse (int): Số frame dùng lại liên tiếp tối đa trước khi buộc chạy phát hiện.
+            width (int): Chiều rộng ảnh xám thu nhỏ dùng để so sánh.
+            roi_expand (float): Hệ số mở rộng bbox khi so theo vùng bàn tay.
+        """
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.width = width
+        self.roi_expand = roi_expand
+        self.keyframe = None   # ảnh thu nhỏ của frame đã chạy phát hiện gần nhất
+        self.regions = []      # các vùng so sánh (x1, y1, x2, y2) trên ảnh thu nhỏ, rỗng để so toàn ảnh
+        self.hands = []        # kết quả phát hiện của keyframe
+        self._pending = None   # ảnh thu nhỏ của frame vừa kiểm tra, thành keyframe nếu phải phát hiện lại
+        self.streak = 0
+        self.reused = 0
+        self.detected = 0
+        self.last_diff = None
+
+    def thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, round(h * self.width / w)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_NEAREST)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.blur(gray, (3, 3))
+
+    def difference(self, thumb):
+        """Sai khác tuyệt đối trung bình so với keyframe (lớn nhất trên các vùng bàn tay nếu có)."""
+        if self.keyframe is None or self.keyframe.shape != thumb.shape:
+            return None
+        if self.regions:
+            return max(float(cv2.absdiff(thumb[y1:y2, x1:x2], self.keyframe[y1:y2, x1:x2]).mean())
+                       for x1, y1, x2, y2 in self.regions)
+        return float(cv2.absdiff(thumb, self.keyframe).mean())
+
+    def should_reuse(self, frame):
+        """True nếu có thể dùng lại self.hands cho frame này thay vì chạy phát hiện."""
+        thumb = self.thumbnail(frame)
+        self.last_diff = self.difference(thumb)
+        if self.last_diff is not None and self.last_diff < self.threshold and self.streak < self.max_reuse:
+            self.streak += 1
+            self.reused += 1
+            return True
+        self._pending = thumb
+        return False
+
+    def update(self, hands, shape):
+        """Ghi nhận kết quả phát hiện của frame vừa kiểm tra làm keyframe mới."""
+        self.keyframe = self._pending
+        self._pending = None
+        self.hands = hands
+        self.streak = 0
+        self.detected += 1
+        self.regions = []
+        if hands and self.keyframe is not None:
+            scale = self.keyframe.shape[1] / shape[1]
+            for hand in hands:
+                x, y, w, h = hand.bbox
+                bbox = (int(x * scale), int(y * scale), max(1, int(w * scale)), max(1, int(h * scale)))
+                self.regions.append(square_region(bbox, self.keyframe.shape, self.roi_expand, min_side=4))
+
+    def reset(self):
+        self.keyframe = None
+        self.regions = []
+        self.hands = []
+        self._pending = None
+        self.streak = 0
+
+    def stats(self):
+        total = self.reused + self.detected
+        return {
+            'reused': self.reused,
+            'detected': self.detected,
+            'reuse_rate': self.reused / total if total else 0.0
+        }
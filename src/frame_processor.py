@@ -1,157 +1,203 @@
-import cv2
-import numpy as np
-import torch
 import math
 import time
 from collections import deque
-from src.config import IMAGE_SIZE, TONE_LABELS, PREDICTION_HISTORY_SIZE, MIN_CONFIDENCE_THRESHOLD, TONE_CONFIDENCE_THRESHOLD, TONE_FRAMES_COUNT
+from src.config import CLASSES, TONE_LABELS, PREDICTION_HISTORY_SIZE, MIN_CONFIDENCE_THRESHOLD, TONE_CONFIDENCE_THRESHOLD, TONE_FRAMES_COUNT
+from src.config import POSE_CACHE_ENABLED, POSE_CACHE_SIZE, POSE_CACHE_TTL, POSE_CACHE_TOLERANCE
+from src.config import FRAME_GATE_ENABLED
+from src.config import TONE_STREAMING_ENABLED, TONE_EARLY_COMMIT_ENABLED, TONE_EARLY_COMMIT_MARGIN, TONE_EARLY_COMMIT_MIN_FRAMES, TONE_EARLY_COMMIT_STABLE_STEPS
 from src.model import StabilityDetector
+from src.profiler import StageProfiler
+from src.preprocessing import CropPreprocessor
+from src.pose_cache import PoseCache
+from src.kinematics import HandKinematics
+from src.frame_gate import StaticSceneGate
 
 class FrameProcessor:
-    def __init__(self, detector, classifier, tone_predictor, stability_detector, text_processor):
+    def __init__(self, detector, classifier, tone_predictor, stability_detector, text_processor, profiler=None,
+                 pose_cache=None, frame_gate=None, recorder=None, clock=time.time,
+                 tone_streaming=TONE_STREAMING_ENABLED, tone_early_commit=TONE_EARLY_COMMIT_ENABLED):
         self.detector = detector
         self.classifier = classifier
         self.tone_predictor = tone_predictor
         self.stability_detector = stability_detector
         self.text_processor = text_processor
+        # Nguồn thời gian (giây) của mọi cooldown / cửa sổ thời gian; khi phát lại log dùng
+        # VirtualClock (src.replay) để thời gian là timestamp đã ghi thay vì đồng hồ thật
+        self.clock = clock
         
-        self.last_detection_time = time.time()
+        self.last_detection_time = clock()
         self.hand_detected_time = None
         self.recognition_started = False
         self.prediction = deque(maxlen=PREDICTION_HISTORY_SIZE)
         self.tone_collection = False
         self.tone_frames = []
+        # Nhận dấu thanh dạng luồng: ToneStream của cử chỉ đang thu thập (None nếu tắt / backend không hỗ trợ)
+        self.tone_streaming = tone_streaming
+        self.tone_early_commit = tone_early_commit  # Chốt dấu thanh trước khi hết cử chỉ (TONE_EARLY_COMMIT_*)
+        self.tone_stream = None
+        # Dấu thanh dự đoán gần nhất của phiên này (để hiển thị); không đọc từ TonePredictor
+        # vì TonePredictor có thể dùng chung giữa nhiều phiên
+        self.tone_prediction = None
+        self.tone_confidence = 0.0
         self.tone_start_time = None
         self.after_tone_cooldown = 0
-        self.hand_positions = deque(maxlen=10)
         self.movement_threshold = 0.03  # Giảm để nhạy hơn với chuyển động dấu thanh
         self.static_timeout = 0.3
         self.tone_motion_detected_time = None  # Thời điểm phát hiện chuyển động để chờ 0.2s
         self.after_tone_stable_cooldown = 0    # Cooldown sau khi nhận diện dấu thanh
         self.tone_just_processed = False  # Không cho nhận lại dấu thanh liên tục
-        self.motion_history = deque(maxlen=15)  # Lưu keypoints các frame gần nhất
-        self.motion_energy_history = deque(maxlen=15)
         self.motion_threshold = 0.03  # Ngưỡng biến thiên (tùy chỉnh)
         self.motion_count_required = 7  # Số frame liên tiếp để xác định bắt đầu/kết thúc
-        self.gesture_active = False
-        self.gesture_start_frame = None
-        self.gesture_end_frame = None
+        # Quãng đường của 10 vị trí gần nhất + năng lượng chuyển động (15 frame), cập nhật O(1) mỗi frame
+        self.kinematics = HandKinematics(position_window=10, motion_threshold=self.motion_threshold,
+                                         motion_count_required=self.motion_count_required, motion_history=15)
+        # Crop + letterbox + chuẩn hoá trong một bước, dùng bộ đệm cấp phát sẵn
+        self.preprocessor = CropPreprocessor()
+        # Cache kết quả phân loại theo tư thế tay (None để tắt)
+        if pose_cache is None and POSE_CACHE_ENABLED:
+            pose_cache = PoseCache(max_size=POSE_CACHE_SIZE, ttl=POSE_CACHE_TTL, tolerance=POSE_CACHE_TOLERANCE,
+                                   clock=clock)
+        self.pose_cache = pose_cache
+        # Dùng lại landmark của frame trước khi khung hình gần như không đổi (None để tắt)
+        if frame_gate is None and FRAME_GATE_ENABLED:
+            frame_gate = StaticSceneGate()
+        self.frame_gate = frame_gate
+        # Đo thời gian từng giai đoạn (mặc định tắt)
+        self.profiler = profiler if profiler is not None else StageProfiler()
+        # Ghi landmark từng frame + crop lúc chốt ký tự ra log phiên (SessionLogWriter, None để tắt)
+        self.recorder = recorder
 
-    def get_bounding_box(self, landmarks, shape):
-        if not landmarks:
-            return None
-        h, w, _ = shape
-        xs = [lm.x for lm in landmarks]
-        ys = [lm.y for lm in landmarks]
-        x_min, x_max = min(xs) * w, max(xs) * w
-        y_min, y_max = min(ys) * h, max(ys) * h
-        return int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min)
-
-    def prepare_image_for_classification(self, image, bbox):
-        if bbox is None:
-            return None
-        x, y, w, h = bbox
-        h_img, w_img, _ = image.shape
-        x1, y1 = max(0, x - 20), max(0, y - 20)
-        x2, y2 = min(w_img, x + w + 20), min(h_img, y + h + 20)
-        imgCrop = image[y1:y2, x1:x2]
-        if imgCrop.size == 0:
-            return None
-        imgWhite = np.ones((IMAGE_SIZE, IMAGE_SIZE, 3), np.uint8) * 255
-        aspectRatio = h / w
-        if aspectRatio > 1:
-            k = IMAGE_SIZE / h
-            wCal = int(round(k * w))
-            imgResize = cv2.resize(imgCrop, (wCal, IMAGE_SIZE))
-            imgResize = imgResize[:, :IMAGE_SIZE]
-            wGap = (IMAGE_SIZE - imgResize.shape[1]) // 2
-            imgWhite[:, wGap:wGap + imgResize.shape[1]] = imgResize
-        else:
-            k = IMAGE_SIZE / w
-            hCal = int(round(k * h))
-            imgResize = cv2.resize(imgCrop, (IMAGE_SIZE, hCal))
-            imgResize = imgResize[:IMAGE_SIZE, :]
-            hGap = (IMAGE_SIZE - imgResize.shape[0]) // 2
-            imgWhite[hGap:hGap + imgResize.shape[0], :] = imgResize
-        return imgWhite
+    @property
+    def gesture_active(self):
+        return self.kinematics.motion.active
 
     def is_hand_moving(self, threshold=None):
-        if len(self.hand_positions) < 2:
-            return False
-        arr = np.array(self.hand_positions)
-        diffs = np.diff(arr, axis=0)
-        total_move = np.sum(np.linalg.norm(diffs, axis=1))
-        return total_move > (threshold if threshold is not None else self.movement_threshold)
+        return self.kinematics.is_moving(threshold if threshold is not None else self.movement_threshold)
 
     def detect_tone_action(self, keypoints):
         if self.tone_collection:
             return False
         self.tone_collection = True
         self.tone_frames = []
-        self.tone_start_time = time.time() + 0.2  # Bắt đầu thu thập sau 0.2s
+        start_stream = getattr(self.tone_predictor, 'start_stream', None) if self.tone_streaming else None
+        self.tone_stream = start_stream() if start_stream is not None else None
+        self.tone_start_time = self.clock() + 0.2  # Bắt đầu thu thập sau 0.2s
         self.tone_collecting = False
         self.tone_first_kpts = keypoints
         return True
 
+    def add_tone_frame(self, kpts):
+        """Thêm frame vào chuỗi dấu thanh; ở chế độ luồng chạy luôn một bước LSTM cho frame đó."""
+        self.tone_frames.append(kpts)
+        if self.tone_stream is not None:
+            with self.profiler.stage('tone'):
+                self.tone_stream.push(kpts)
+
+    def tone_ready_early(self):
+        """Dự đoán luồng đã đủ tự tin để chốt dấu thanh trước khi hết cử chỉ."""
+        stream = self.tone_stream
+        return (self.tone_early_commit and stream is not None and stream.frames >= TONE_EARLY_COMMIT_MIN_FRAMES
+                and stream.stable_steps >= TONE_EARLY_COMMIT_STABLE_STEPS
+                and stream.confidence >= TONE_CONFIDENCE_THRESHOLD + TONE_EARLY_COMMIT_MARGIN)
+
     def finalize_tone_recognition(self):
         frames_needed = TONE_FRAMES_COUNT
-        duration = time.time() - self.tone_start_time if self.tone_start_time else 0
-        # Chỉ nhận diện nếu tổng thời gian động >= 1.2s
+        duration = self.clock() - self.tone_start_time if self.tone_start_time else 0
+        early = self.tone_ready_early()
+        # Chỉ nhận diện nếu tổng thời gian động >= 1.2s (trừ khi chốt sớm với độ tin cậy cao)
         if (len(self.tone_frames) >= frames_needed or duration >= 1.5or self.tone_collecting is False):
-            if duration < 1.2:
+            if duration < 1.2 and not early:
                 print(f"[INFO] Động tác quá ngắn ({duration:.2f}s), bỏ qua nhận diện dấu thanh.")
                 self.reset_tone_state()
-                self.after_tone_stable_cooldown = time.time() + 0.5
-                self.hand_positions.clear()
+                self.after_tone_stable_cooldown = self.clock() + 0.5
+                self.kinematics.clear_positions()
                 return
             try:
-                while len(self.tone_frames) < frames_needed:
-                    self.tone_frames.append(self.tone_frames[-1])
-                tone, confidence = self.tone_predictor.predict(self.tone_frames[:frames_needed])
+                stream = self.tone_stream
+                if early:
+                    tone, confidence = stream.label, stream.confidence
+                    print(f"[INFO] Chốt sớm dấu thanh sau {stream.frames} frame ({duration:.2f}s)")
+                elif stream is not None and stream.frames == len(self.tone_frames):
+                    # Các frame đã chạy qua LSTM khi thu thập: chỉ còn các bước đệm
+                    with self.profiler.stage('tone'):
+                        tone, confidence = stream.finish()
+                else:
+                    while len(self.tone_frames) < frames_needed:
+                        self.tone_frames.append(self.tone_frames[-1])
+                    with self.profiler.stage('tone'):
+                        tone, confidence = self.tone_predictor.predict(self.tone_frames[:frames_needed])
+                self.tone_prediction, self.tone_confidence = tone, confidence
                 if tone and confidence >= TONE_CONFIDENCE_THRESHOLD:
                     self.text_processor.apply_tone_to_word(tone)
                     print(f"[INFO] Dấu thanh được áp dụng: {tone}, confidence: {confidence:.2f}")
                     self.tone_just_processed = True  # Chỉ chặn nhận diện lại khi thành công
                     self.reset_tone_state()
-                    self.after_tone_stable_cooldown = time.time() + 0.7  # Tăng cooldown để ổn định
-                    self.hand_positions.clear()
+                    self.after_tone_stable_cooldown = self.clock() + 0.7  # Tăng cooldown để ổn định
+                    self.kinematics.clear_positions()
                 else:
                     print(f"[INFO] Độ tin cậy thấp: {confidence:.2f}, cho phép nhận diện lại")
                     # Không đặt tone_just_processed = True, cho phép nhận diện lại
                     self.reset_tone_state()
-                    self.after_tone_stable_cooldown = time.time() + 0.3  # Cooldown ngắn hơn
-                    self.hand_positions.clear()
+                    self.after_tone_stable_cooldown = self.clock() + 0.3  # Cooldown ngắn hơn
+                    self.kinematics.clear_positions()
             except Exception as e:
                 print(f"[ERROR] Lỗi khi chạy mô hình LSTM: {e}")
                 # Khi có lỗi, cũng cho phép nhận diện lại
                 self.reset_tone_state()
-                self.after_tone_cooldown = time.time() + 0.3
-                self.hand_positions.clear()
+                self.after_tone_cooldown = self.clock() + 0.3
+                self.kinematics.clear_positions()
         # Nếu chưa đủ điều kiện thì tiếp tục thu thập
 
     def reset_tone_state(self):
         self.tone_collection = False
         self.tone_frames = []
+        self.tone_stream = None
         self.tone_start_time = None
         self.last_tone_frame_time = None
         self.stability_detector.reset()
-        self.after_tone_cooldown = time.time() + 1
+        self.after_tone_cooldown = self.clock() + 1
+
+    def classify_hand(self, image, hand):
+        """Phân loại ký tự của bàn tay (HandFrame), trả về BatchPrediction hoặc None.
 
-    def process_character_recognition(self, processed_image):
+        Nếu tư thế gần như không đổi so với một tư thế đã phân loại, dùng lại kết quả cache
+        thay vì crop và chạy lại ResNet. Nếu classifier có đường nhanh từ landmark
+        (CascadeClassifier) và đường nhanh đủ tự tin thì cũng bỏ qua ResNet.
+        """
+        if self.pose_cache is not None:
+            result = self.pose_cache.get(hand)
+            if result is not None:
+                return result
+        predict_landmarks = getattr(self.classifier, 'predict_landmarks', None)
+        if predict_landmarks is not None:
+            with self.profiler.stage('fast_classify'):
+                result = predict_landmarks(hand)
+            if result is not None:
+                return result
+        with self.profiler.stage('crop'):
+            input_tensor = self.preprocessor(image, hand.bbox)
+        if input_tensor is None:
+            return None
+        with self.profiler.stage('classify'):
+            result = self.classifier.predict_tensor(input_tensor)
+        if self.pose_cache is not None:
+            self.pose_cache.put(hand, result)
+        return result
+
+    def process_character_recognition(self, result):
         try:
-            results, index, _, confidence = self.classifier.prediction(processed_image, draw=False)
-            self.prediction.append(index.item())
-            probabilities = torch.softmax(torch.tensor(results), dim=0).numpy()
+            index = int(result.indices[0])
+            confidence = float(result.confidences[0])
+            self.prediction.append(index)
             recent_predictions = list(self.prediction)[-PREDICTION_HISTORY_SIZE:]
             most_common = self.text_processor.most_common_value(recent_predictions)
-            if most_common == index.item() and confidence > MIN_CONFIDENCE_THRESHOLD:
-                from src.config import CLASSES
+            if most_common == index and confidence > MIN_CONFIDENCE_THRESHOLD:
                 raw_character = CLASSES[index]
                 if self.text_processor.process_character(raw_character):
-                    self.last_detection_time = time.time()
+                    self.last_detection_time = self.clock()
                     self.tone_just_processed = False  # Cho phép nhận dấu thanh mới sau khi có ký tự mới
                     # Đặt cooldown ngắn để có thời gian cho dấu thanh
-                    self.after_tone_cooldown = time.time() + 0.3
+                    self.after_tone_cooldown = self.clock() + 0.3
                     return True
         except Exception as e:
             print(f"[ERROR] Lỗi trong process_character_recognition: {e}")
@@ -160,55 +206,48 @@ class FrameProcessor:
     def reset_hand_state(self):
         self.stability_detector.reset()
         self.reset_tone_state()
-        self.hand_positions.clear()
+        self.kinematics.clear_positions()
         self.hand_detected_time = None
         self.recognition_started = False
         self.text_processor.just_processed_character = False
 
-    def compute_motion_energy(self, kpts):
-        if len(self.motion_history) == 0:
-            return 0.0
-        prev_kpts = self.motion_history[-1]
-        # Tính tổng khoảng cách Euclidean giữa các keypoints
-        diffs = np.linalg.norm(kpts - prev_kpts, axis=1)
-        return np.mean(diffs)
-
     def update_motion_state(self, kpts):
-        self.motion_history.append(kpts)
-        if len(self.motion_history) < 2:
-            self.motion_energy_history.append(0.0)
-            return
-
-        energy = self.compute_motion_energy(kpts)
-        self.motion_energy_history.append(energy)
-
-        # Kiểm tra liên tiếp vượt/ngưỡng
-        above = [e > self.motion_threshold for e in list(self.motion_energy_history)[-self.motion_count_required:]]
-        below = [e < self.motion_threshold for e in list(self.motion_energy_history)[-self.motion_count_required:]]
-
-        if not self.gesture_active and all(above) and len(above) == self.motion_count_required:
-            self.gesture_active = True
-            self.gesture_start_frame = len(self.motion_history)
+        event = self.kinematics.update_motion(kpts)
+        if event == 'start':
             print("[INFO] Gesture START detected")
-        elif self.gesture_active and all(below) and len(below) == self.motion_count_required:
-            self.gesture_active = False
-            self.gesture_end_frame = len(self.motion_history)
+        elif event == 'end':
             print("[INFO] Gesture END detected")
 
+    def detect_hands(self, frame):
+        """findHands của detector, hoặc landmark của frame trước nếu khung hình gần như không đổi."""
+        gate = self.frame_gate
+        if gate is not None and gate.should_reuse(frame):
+            draw_hands = getattr(self.detector, 'draw_hands', None)
+            if draw_hands is not None:
+                draw_hands(frame, gate.hands)
+            return gate.hands, frame
+        hands, image = self.detector.findHands(frame)
+        if gate is not None:
+            gate.update(hands, frame.shape)
+        return hands, image
+
     def process_frame(self, frame, no_hand_threshold=1):
+        self.profiler.begin_frame()
+        with self.profiler.stage('frame'):
+            return self._process_frame(frame, no_hand_threshold)
+
+    def _process_frame(self, frame, no_hand_threshold):
         try:
-            current_time = time.time()
-            hands, image = self.detector.findHands(frame)
+            current_time = self.clock()
+            with self.profiler.stage('detect'):
+                hands, image = self.detect_hands(frame)
+            if self.recorder is not None:
+                self.recorder.record(current_time, hands, frame.shape)
             frame_out = frame.copy()
             if current_time < self.after_tone_stable_cooldown:
                 if hands:
-                    hand = hands[0]
-                    if 'landmark' in hand:
-                        # Sử dụng cùng logic với phần chính để tính vị trí đại diện
-                        pinky_xy = (hand['landmark'][20].x, hand['landmark'][20].y)
-                        index_xy = (hand['landmark'][8].x, hand['landmark'][8].y)
-                        avg_xy = ((pinky_xy[0] + index_xy[0]) / 2, (pinky_xy[1] + index_xy[1]) / 2)
-                        self.hand_positions.append(avg_xy)
+                    # Cùng điểm đại diện (trung bình ngón út và ngón trỏ) với phần chính
+                    self.kinematics.add_position(hands[0].center)
                 return frame_out
             if hands:
                 hand = hands[0]
@@ -218,22 +257,14 @@ class FrameProcessor:
                 time_elapsed = current_time - self.hand_detected_time
                 if not self.recognition_started and time_elapsed >= 0.3:
                     self.recognition_started = True
-                if 'landmark' in hand and self.recognition_started:
-                    kpts = np.array([[lm.x, lm.y, lm.z] for lm in hand['landmark']])
-                    if len(kpts) != 21:
-                        print(f"[WARNING] Số lượng landmarks không đúng: {len(kpts)} thay vì 21")
-                        kpts = np.pad(kpts, ((0, max(0, 21 - len(kpts))), (0, 0)), mode='constant')[:21]
+                if self.recognition_started:
+                    kpts = hand.points  # (21, 3) float32, đã chuyển một lần trong detector
                     # --- Thêm cập nhật motion energy ---
                     self.update_motion_state(kpts)
                     # --- Kết thúc thêm ---
-                    self.stability_detector.add_keypoints(kpts.flatten())
-                    wrist = hand['landmark'][0]
-                    # Sử dụng vị trí ngón út (20) và ngón trỏ (8) để phát hiện chuyển động dấu thanh
-                    pinky_xy = (hand['landmark'][20].x, hand['landmark'][20].y)
-                    index_xy = (hand['landmark'][8].x, hand['landmark'][8].y)
-                    # Tính trung bình vị trí 2 ngón để có 1 điểm đại diện ổn định
-                    avg_xy = ((pinky_xy[0] + index_xy[0]) / 2, (pinky_xy[1] + index_xy[1]) / 2)
-                    self.hand_positions.append(avg_xy)
+                    self.stability_detector.add_keypoints(kpts.ravel())
+                    # Trung bình vị trí ngón út (20) và ngón trỏ (8): 1 điểm đại diện ổn định để phát hiện chuyển động dấu thanh
+                    self.kinematics.add_position(hand.center)
                     hand_is_moving = self.is_hand_moving()
                     can_detect_tone = not self.tone_collection and not self.text_processor.just_processed_character and current_time >= self.after_tone_cooldown and not self.tone_just_processed
                     if can_detect_tone and hand_is_moving:
@@ -248,28 +279,30 @@ class FrameProcessor:
                         # Bắt đầu thu thập sau 0.2s kể từ khi phát hiện động
                         if not self.tone_collecting and current_time >= self.tone_start_time:
                             self.tone_collecting = True
-                            self.tone_frames.append(self.tone_first_kpts)
+                            self.add_tone_frame(self.tone_first_kpts)
                             self.last_tone_frame_time = current_time
                         if self.tone_collecting:
                             # Nếu còn động thì tiếp tục thu thập, nếu tĩnh thì dừng
                             interval = 1.5/ TONE_FRAMES_COUNT
                             if hand_is_moving and len(self.tone_frames) < TONE_FRAMES_COUNT and (current_time - self.last_tone_frame_time) >= interval:
-                                self.tone_frames.append(kpts)
+                                self.add_tone_frame(kpts)
                                 self.last_tone_frame_time = current_time
                             elif not hand_is_moving:
                                 self.tone_collecting = False  # Dừng thu thập nếu tay tĩnh
                                 print(f"[INFO] Tay tĩnh, dừng thu thập frame cho dấu thanh")
-                            # Kết thúc khi đủ 30 frame, hết 1.2s hoặc tay tĩnh
-                            if len(self.tone_frames) >= TONE_FRAMES_COUNT or (current_time - self.tone_start_time) >= 1.5or not self.tone_collecting:
+                            # Kết thúc khi đủ 30 frame, hết 1.2s, tay tĩnh hoặc dự đoán luồng đã đủ tự tin
+                            if len(self.tone_frames) >= TONE_FRAMES_COUNT or (current_time - self.tone_start_time) >= 1.5or not self.tone_collecting or self.tone_ready_early():
                                 self.tone_collecting = False
                                 self.finalize_tone_recognition()
                     else:
-                        if time.time() >= self.after_tone_cooldown and self.stability_detector.is_stable() and not self.tone_collection:
-                            bbox = self.get_bounding_box(hand['landmark'], image.shape)
-                            processed_image = self.prepare_image_for_classification(image, bbox)
-                            if processed_image is not None:
-                                if self.process_character_recognition(processed_image):
+                        if self.clock() >= self.after_tone_cooldown and self.stability_detector.is_stable() and not self.tone_collection:
+                            result = self.classify_hand(image, hand)
+                            if result is not None:
+                                if self.process_character_recognition(result):
                                     self.text_processor.just_processed_character = True
+                                    if self.recorder is not None:
+                                        self.recorder.record_crop(current_time, image, hand.bbox,
+                                                                  CLASSES[int(result.indices[0])])
                                 else:
                                     self.text_processor.just_processed_character = False
             else:
@@ -0,0 +1,131 @@
+"""Bản ghi gọn cho một bàn tay phát hiện được trong một frame.
+
+Landmark của MediaPipe (protobuf) chỉ được duyệt một lần để chuyển thành mảng
+float32 liên tục (21, 3). Các đại lượng dẫn xuất mà nhiều bước trong pipeline
+cùng cần (bbox theo pixel, điểm đại diện ngón út / ngón trỏ, vector đặc trưng
+chuẩn hoá cho MLP landmark, chữ ký tư thế cho PoseCache) được tính khi dùng lần
+đầu và lưu lại, thay vì mỗi nơi tự duyệt lại danh sách landmark.
+"""
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+# Ngón út và ngón trỏ: trung bình hai điểm này là vị trí đại diện để phát hiện chuyển động dấu thanh
+PINKY_TIP = 20
+INDEX_TIP = 8
+
+
+def landmark_features(kpts, aspect=1.0):
+    """(21, 3) landmark -> vector 63 chiều: tương đối cổ tay, chia cho khoảng cách xa nhất tới cổ tay.
+
+    x (và z, cùng thang với x) của MediaPipe chia theo chiều rộng ảnh còn y chia theo chiều cao,
+    nên x, z được nhân với aspect = rộng / cao trước khi chuẩn hoá để đặc trưng không phụ thuộc
+    tỉ lệ khung hình (ảnh huấn luyện vuông, camera 16:9 / 4:3).
+    Nhận cả batch (N, 21, 3) -> (N, 63); aspect là số hoặc mảng (N,).
+    """
+    pts = np.asarray(kpts, dtype=np.float32)
+    single = pts.ndim == 2
+    pts = pts.reshape(-1, NUM_LANDMARKS, 3)
+    aspect = np.asarray(aspect, dtype=np.float32).reshape(-1, 1)
+    pts = pts - pts[:, :1]
+    pts[..., 0] *= aspect
+    pts[..., 2] *= aspect
+    scale = np.sqrt((pts[..., :2] ** 2).sum(axis=2).max(axis=1))
+    pts = pts / np.maximum(scale, 1e-6)[:, None, None]
+    feats = pts.reshape(len(pts), -1)
+    return feats[0] if single else feats
+
+
+def pose_signature(kpts):
+    """Chữ ký tư thế: toạ độ x, y tương đối cổ tay, chia cho khoảng cách xa nhất tới cổ tay."""
+    pts = np.asarray(kpts, dtype=np.float32).reshape(-1, 3)[:, :2]
+    pts = pts - pts[0]
+    scale = float(np.sqrt((pts * pts).sum(axis=1).max()))
+    return pts / max(scale, 1e-6)
+
+
+def square_region(bbox, shape, expand, min_side=32):
+    """Vùng vuông (x1, y1, x2, y2) cạnh max(w, h) * expand quanh tâm bbox, dịch vào trong biên ảnh."""
+    h, w = shape[:2]
+    x, y, bw, bh = bbox
+    side = min(max(int(max(bw, bh) * expand), min_side), w, h)
+    cx, cy = x + bw // 2, y + bh // 2
+    x1 = min(max(cx - side // 2, 0), w - side)
+    y1 = min(max(cy - side // 2, 0), h - side)
+    return x1, y1, x1 + side, y1 + side
+
+
+class HandFrame:
+    """Một bàn tay trong một frame: landmark (21, 3) float32 + các đại lượng dẫn xuất lưu lazily.
+
+    points là toạ độ chuẩn hoá [0, 1] của MediaPipe (x, y theo chiều rộng / cao ảnh, z tương đối).
+    Không sửa points sau khi tạo: các giá trị đã lưu sẽ không được tính lại.
+    """
+    __slots__ = ('points', 'image_shape', '_bbox', '_center', '_features', '_signature')
+
+    def __init__(self, points, image_shape):
+        """
+        Args:
+            points: mảng (21, 3) toạ độ landmark.
+            image_shape: shape của frame (h, w, ...) mà landmark được chuẩn hoá theo.
+        """
+        points = np.ascontiguousarray(points, dtype=np.float32)
+        if points.shape != (NUM_LANDMARKS, 3):
+            print(f"[WARNING] Số lượng landmarks không đúng: {len(points)} thay vì {NUM_LANDMARKS}")
+            points = points.reshape(-1, 3)
+            points = np.pad(points, ((0, max(0, NUM_LANDMARKS - len(points))), (0, 0)), mode='constant')[:NUM_LANDMARKS]
+        self.points = points
+        self.image_shape = tuple(image_shape[:2])
+        self._bbox = None
+        self._center = None
+        self._features = None
+        self._signature = None
+
+    @classmethod
+    def from_landmarks(cls, landmarks, image_shape):
+        """Từ danh sách landmark kiểu MediaPipe (có thuộc tính x, y, z)."""
+        points = np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+        return cls(points, image_shape)
+
+    @property
+    def bbox(self):
+        """(x, y, w, h) theo pixel của frame, bao quanh 21 landmark."""
+        if self._bbox is None:
+            h, w = self.image_shape
+            x_min, y_min = self.points[:, :2].min(axis=0)
+            x_max, y_max = self.points[:, :2].max(axis=0)
+            x_min, x_max = float(x_min) * w, float(x_max) * w
+            y_min, y_max = float(y_min) * h, float(y_max) * h
+            self._bbox = (int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min))
+        return self._bbox
+
+    @property
+    def center(self):
+        """Điểm đại diện (x, y): trung bình vị trí đầu ngón út và đầu ngón trỏ."""
+        if self._center is None:
+            pinky, index = self.points[PINKY_TIP], self.points[INDEX_TIP]
+            self._center = ((float(pinky[0]) + float(index[0])) / 2, (float(pinky[1]) + float(index[1])) / 2)
+        return self._center
+
+    @property
+    def aspect(self):
+        """Tỉ lệ rộng / cao của frame mà landmark được chuẩn hoá theo."""
+        h, w = self.image_shape
+        return w / h if h else 1.0
+
+    @property
+    def features(self):
+        """Vector 63 chiều chuẩn hoá theo cổ tay / kích thước bàn tay (đầu vào MLP landmark)."""
+        if self._features is None:
+            self._features = landmark_features(self.points, self.aspect)
+        return self._features
+
+    @property
+    def signature(self):
+        """Chữ ký tư thế (21, 2) dùng làm khoá của PoseCache."""
+        if self._signature is None:
+            self._signature = pose_signature(self.points)
+        return self._signature
+
+    def __repr__(self):
+        return f"HandFrame(bbox={self.bbox}, center=({self.center[0]:.3f}, {self.center[1]:.3f}))"
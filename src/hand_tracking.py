@@ -1,62 +1,165 @@
 import cv2
 import mediapipe as mp
+import numpy as np
 import time
 
+from src.config import DETECTION_RESIZE_ENABLED, DETECTION_INPUT_SIZE, ROI_TRACKING_ENABLED, ROI_WORKING_SIZE, ROI_EXPAND, ROI_MIN_CONFIDENCE
+from src.hand_frame import HandFrame, square_region
+
 
 class handDetector():
-    def __init__(self, mode=False, maxHands=2, detectionCon=0.5, trackCon=0.5):
+    """Phát hiện tay bằng MediaPipe, trả về danh sách HandFrame theo toạ độ của frame gốc.
+
+    Tìm trên toàn frame: frame được thu nhỏ để cạnh dài không quá detection_size (None: giữ nguyên).
+    Theo dõi vùng (roi_tracking, chỉ khi maxHands=1): sau một lần phát hiện có điểm tin cậy
+    >= roi_min_confidence, frame kế tiếp chỉ xử lý vùng vuông quanh bbox trước đó (mở rộng
+    roi_expand lần, resize về cạnh dài roi_size). Landmark được quy đổi về toạ độ frame gốc.
+    Khi không thấy tay trong vùng, tìm lại trên toàn frame ngay trong frame đó.
+    """
+
+    def __init__(self, mode=False, maxHands=2, detectionCon=0.5, trackCon=0.5,
+                 detection_size=DETECTION_INPUT_SIZE if DETECTION_RESIZE_ENABLED else None,
+                 roi_tracking=ROI_TRACKING_ENABLED,
+                 roi_size=ROI_WORKING_SIZE, roi_expand=ROI_EXPAND, roi_min_confidence=ROI_MIN_CONFIDENCE):
         self.mode = mode
         self.maxHands = maxHands
         self.detectionCon = detectionCon
         self.trackCon = trackCon
+        self.detection_size = detection_size
+        self.roi_tracking = roi_tracking and maxHands == 1
+        self.roi_size = roi_size
+        self.roi_expand = roi_expand
+        self.roi_min_confidence = roi_min_confidence
 
         self.mpHands = mp.solutions.hands
-        self.hands = self.mpHands.Hands(
+        self.hands = self.create_hands()
+        # Bộ theo dõi riêng cho vùng crop để trạng thái tracking nội bộ của MediaPipe
+        # (theo toạ độ chuẩn hoá của ảnh đầu vào) không lẫn giữa frame đầy đủ và vùng crop
+        self.roi_hands = self.create_hands() if self.roi_tracking else None
+        self.mpDraw = mp.solutions.drawing_utils
+        self.results = None  # Lưu trữ kết quả từ Mediapipe
+        self.last_hands = []
+        self.roi = None  # (x1, y1, x2, y2) vùng sẽ xử lý ở frame sau, None để tìm trên toàn frame
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.roi_lost = 0
+
+    def create_hands(self):
+        return self.mpHands.Hands(
             static_image_mode=self.mode,
             max_num_hands=self.maxHands,
             min_detection_confidence=self.detectionCon,
             min_tracking_confidence=self.trackCon
         )
-        self.mpDraw = mp.solutions.drawing_utils
-        self.results = None  # Lưu trữ kết quả từ Mediapipe
-
-    def findHands(self, img, draw=True):
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.hands.process(imgRGB)
-        hands = []  # Danh sách chứa thông tin tay
 
+    @staticmethod
+    def hand_scores(results):
+        """Điểm tin cậy (handedness) của từng bàn tay trong kết quả MediaPipe."""
+        if not results.multi_handedness:
+            return [1.0] * len(results.multi_hand_landmarks or [])
+        return [h.classification[0].score for h in results.multi_handedness]
+
+    def find_full(self, img, draw):
+        """Tìm tay trên toàn frame (đã thu nhỏ theo detection_size)."""
+        h, w = img.shape[:2]
+        src = img
+        if self.detection_size and max(h, w) > self.detection_size:
+            scale = self.detection_size / max(h, w)
+            # Landmark là toạ độ chuẩn hoá nên không cần quy đổi khi thu nhỏ đều hai chiều
+            src = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_LINEAR)
+        self.results = self.hands.process(cv2.cvtColor(src, cv2.COLOR_BGR2RGB))
+        self.full_frames += 1
+        hands = []  # Danh sách HandFrame, mỗi bàn tay một bản ghi
         if self.results.multi_hand_landmarks:
             for handLms in self.results.multi_hand_landmarks:
-                # Lấy bounding box và landmarks của bàn tay
-                xList, yList = [], []
-                h, w, _ = img.shape
-                for lm in handLms.landmark:
-                    xList.append(int(lm.x * w))
-                    yList.append(int(lm.y * h))
-
-                bbox = (min(xList), min(yList), max(xList) - min(xList), max(yList) - min(yList))
-                hands.append({
-                    "bbox": bbox,
-                    "landmark": handLms.landmark  # Lưu danh sách các điểm mốc
-                })
-
+                # Chuyển landmark sang mảng (21, 3) một lần; bbox / điểm đại diện tính từ mảng khi cần
+                hands.append(HandFrame.from_landmarks(handLms.landmark, img.shape))
                 if draw:
                     self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
+        return hands
+
+    def find_in_roi(self, img, draw):
+        """Tìm tay trong vùng self.roi, landmark quy đổi về toạ độ frame gốc."""
+        h, w = img.shape[:2]
+        x1, y1, x2, y2 = self.roi
+        crop = img[y1:y2, x1:x2]  # view, không sao chép
+        cw, ch = x2 - x1, y2 - y1
+        src = crop
+        if max(cw, ch) > self.roi_size:
+            scale = self.roi_size / max(cw, ch)
+            src = cv2.resize(crop, (max(1, round(cw * scale)), max(1, round(ch * scale))), interpolation=cv2.INTER_LINEAR)
+        self.results = self.roi_hands.process(cv2.cvtColor(src, cv2.COLOR_BGR2RGB))
+        self.roi_frames += 1
+        hands = []
+        if self.results.multi_hand_landmarks:
+            for handLms in self.results.multi_hand_landmarks:
+                pts = np.array([(lm.x, lm.y, lm.z) for lm in handLms.landmark], dtype=np.float32)
+                # Chuẩn hoá theo vùng crop -> chuẩn hoá theo frame gốc (z cùng tỉ lệ với x)
+                pts[:, 0] = (x1 + pts[:, 0] * cw) / w
+                pts[:, 1] = (y1 + pts[:, 1] * ch) / h
+                pts[:, 2] *= cw / w
+                hands.append(HandFrame(pts, img.shape))
+                if draw:
+                    # Vẽ lên view của vùng crop: toạ độ chuẩn hoá theo crop khớp đúng vị trí trong frame
+                    self.mpDraw.draw_landmarks(crop, handLms, self.mpHands.HAND_CONNECTIONS)
+        return hands
+
+    def next_roi(self, hands, scores, shape):
+        """Vùng vuông quanh bbox của bàn tay tin cậy, cắt theo biên ảnh; None nếu không theo dõi."""
+        if not self.roi_tracking or len(hands) != 1 or scores[0] < self.roi_min_confidence:
+            return None
+        return square_region(hands[0].bbox, shape, self.roi_expand)
 
+    def findHands(self, img, draw=True):
+        hands = []
+        if self.roi is not None:
+            hands = self.find_in_roi(img, draw)
+            if not hands:
+                # Mất dấu trong vùng: tìm lại trên toàn frame ngay trong frame này
+                self.roi_lost += 1
+                self.roi = None
+        if not hands:
+            hands = self.find_full(img, draw)
+            self.roi = self.next_roi(hands, self.hand_scores(self.results), img.shape) if hands else None
+            if self.roi is not None:
+                # Bắt đầu theo dõi mới: bỏ trạng thái tracking cũ của bộ theo dõi vùng
+                reset = getattr(self.roi_hands, 'reset', None)
+                if reset is not None:
+                    reset()
+        else:
+            self.roi = self.next_roi(hands, self.hand_scores(self.results), img.shape)
+        self.last_hands = hands
         return hands, img
 
+    def draw_hands(self, img, hands):
+        """Vẽ landmark của các HandFrame đã có (vd. khi dùng lại kết quả frame trước)."""
+        h, w = img.shape[:2]
+        for hand in hands:
+            pts = [(int(x * w), int(y * h)) for x, y, _ in hand.points]
+            for a, b in self.mpHands.HAND_CONNECTIONS:
+                cv2.line(img, pts[a], pts[b], (224, 224, 224), 2)
+            for pt in pts:
+                cv2.circle(img, pt, 2, (0, 0, 255), 2)
+
+    def stats(self):
+        total = self.roi_frames + self.full_frames
+        return {
+            'roi_frames': self.roi_frames,
+            'full_frames': self.full_frames,
+            'roi_lost': self.roi_lost,
+            'roi_rate': self.roi_frames / total if total else 0.0
+        }
+
     def findPosition(self, img, handNo=0, draw=True):
         """Trả về danh sách các điểm mốc của tay được chỉ định"""
         lmList = []
-        if self.results and self.results.multi_hand_landmarks:
-            if len(self.results.multi_hand_landmarks) > handNo:
-                handLms = self.results.multi_hand_landmarks[handNo]
-                h, w, _ = img.shape
-                for id, lm in enumerate(handLms.landmark):
-                    cx, cy = int(lm.x * w), int(lm.y * h)
-                    lmList.append([id, cx, cy])
-                    if draw:
-                        cv2.circle(img, (cx, cy), 5, (255, 0, 0), cv2.FILLED)
+        if len(self.last_hands) > handNo:
+            h, w, _ = img.shape
+            for id, (x, y, _) in enumerate(self.last_hands[handNo].points):
+                cx, cy = int(x * w), int(y * h)
+                lmList.append([id, cx, cy])
+                if draw:
+                    cv2.circle(img, (cx, cy), 5, (255, 0, 0), cv2.FILLED)
         return lmList
 
 
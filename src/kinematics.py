@@ -0,0 +1,204 @@
+"""Thống kê chuyển động của bàn tay cập nhật tăng dần, chi phí cố định mỗi frame.
+
+Thay cho việc dựng lại mảng từ deque ở mỗi frame:
+    SlidingVariance - phương sai trượt (Welford thêm/bớt) cho StabilityDetector.is_stable
+    PathLength      - tổng quãng đường của điểm đại diện trong cửa sổ, cho is_hand_moving
+    MotionEnergy    - đếm số frame liên tiếp trên/dưới ngưỡng năng lượng, cho update_motion_state
+HandKinematics gom PathLength và MotionEnergy làm trạng thái chuyển động của FrameProcessor.
+
+Quyết định (ổn định / đang chuyển động / bắt đầu-kết thúc cử chỉ) giống với cách tính
+cũ; tổng trượt được tính lại chính xác mỗi vòng ring buffer để sai số làm tròn không tích luỹ.
+Kiểm tra bằng: python -m benchmarks.bench_kinematics
+"""
+import math
+
+import numpy as np
+
+
+class SlidingVariance:
+    """Trung bình và phương sai (ddof=0, như np.var) theo từng chiều của window vector gần nhất."""
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = None  # (window, dim), cấp phát khi biết số chiều ở lần thêm đầu tiên
+        self.mean = None
+        self.m2 = None
+        self._delta = None
+        self.count = 0
+        self.head = 0
+
+    def _allocate(self, dim):
+        self.buffer = np.zeros((self.window, dim), dtype=np.float64)
+        self.mean = np.zeros(dim, dtype=np.float64)
+        self.m2 = np.zeros(dim, dtype=np.float64)
+        self._delta = np.empty(dim, dtype=np.float64)
+        self._scratch = np.empty(dim, dtype=np.float64)
+
+    def add(self, x):
+        x = np.asarray(x, dtype=np.float64).reshape(-1)
+        if self.buffer is None or self.buffer.shape[1] != x.size:
+            self._allocate(x.size)
+            self.count = 0
+            self.head = 0
+        delta, scratch = self._delta, self._scratch
+        if self.count < self.window:
+            # Welford thêm phần tử
+            self.count += 1
+            np.subtract(x, self.mean, out=delta)
+            self.mean += delta / self.count
+            np.subtract(x, self.mean, out=scratch)
+            self.m2 += delta * scratch
+        else:
+            # Thay phần tử cũ nhất: mean' = mean + (x - old) / n,
+            # M2' = M2 + (x - old) * (x - mean' + old - mean)
+            old = self.buffer[self.head]
+            np.subtract(x, old, out=delta)
+            np.add(x, old, out=scratch)
+            scratch -= self.mean
+            self.mean += delta / self.count
+            scratch -= self.mean
+            self.m2 += delta * scratch
+        self.buffer[self.head] = x
+        self.head = (self.head + 1) % self.window
+        if self.head == 0 and self.count == self.window:
+            self._recompute()
+
+    def _recompute(self):
+        """Tính lại chính xác từ ring buffer mỗi vòng (chi phí chia đều: O(số chiều) mỗi frame)."""
+        data = self.buffer[:self.count]
+        self.mean[:] = data.mean(axis=0)
+        self.m2[:] = ((data - self.mean) ** 2).sum(axis=0)
+
+    def variance(self):
+        if self.count == 0:
+            return None
+        return np.maximum(self.m2, 0.0) / self.count
+
+    def mean_variance(self):
+        """Trung bình phương sai các chiều (np.mean(np.var(arr, axis=0)))."""
+        if self.count == 0:
+            return 0.0
+        return max(float(self.m2.sum()), 0.0) / (self.count * self.m2.size)
+
+    def __len__(self):
+        return self.count
+
+    def reset(self):
+        self.count = 0
+        self.head = 0
+        if self.mean is not None:
+            self.mean.fill(0.0)
+            self.m2.fill(0.0)
+
+
+class PathLength:
+    """Tổng độ dài các đoạn nối window vị trí 2D gần nhất (như sum(norm(diff(positions))))."""
+
+    def __init__(self, window=10):
+        self.window = window
+        self.segments = np.zeros(max(window - 1, 1), dtype=np.float64)  # ring buffer độ dài đoạn
+        self.num_segments = 0
+        self.head = 0
+        self.total = 0.0
+        self.last = None
+        self.count = 0
+
+    def add(self, xy):
+        x, y = float(xy[0]), float(xy[1])
+        if self.last is not None and self.window > 1:
+            dx, dy = x - self.last[0], y - self.last[1]
+            segment = math.sqrt(dx * dx + dy * dy)
+            capacity = len(self.segments)
+            if self.num_segments == capacity:
+                self.total -= self.segments[self.head]
+            else:
+                self.num_segments += 1
+            self.segments[self.head] = segment
+            self.total += segment
+            self.head = (self.head + 1) % capacity
+            if self.head == 0:
+                self.total = float(self.segments[:self.num_segments].sum())
+        self.last = (x, y)
+        self.count = min(self.count + 1, self.window)
+
+    @property
+    def length(self):
+        return self.total if self.count >= 2 else 0.0
+
+    def exceeds(self, threshold):
+        return self.count >= 2 and self.total > threshold
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.num_segments = 0
+        self.head = 0
+        self.total = 0.0
+        self.last = None
+        self.count = 0
+
+
+class MotionEnergy:
+    """Năng lượng chuyển động (trung bình dịch chuyển của 21 landmark giữa hai frame) và bộ
+    đếm số frame liên tiếp trên / dưới ngưỡng để xác định bắt đầu / kết thúc cử chỉ."""
+
+    def __init__(self, threshold=0.03, count_required=7, history=15):
+        if count_required > history:
+            raise ValueError("count_required phải nhỏ hơn hoặc bằng history")
+        self.threshold = threshold
+        self.count_required = count_required
+        self.history = history
+        self.prev = None
+        self.frames = 0  # Số frame trong lịch sử (tối đa history)
+        self.energy = 0.0
+        self.above_run = 0
+        self.below_run = 0
+        self.active = False
+        self.start_frame = None
+        self.end_frame = None
+
+    def update(self, kpts):
+        """Cập nhật với keypoints (21, 3) của frame mới; trả về 'start', 'end' hoặc None."""
+        kpts = np.asarray(kpts, dtype=np.float64)
+        first = self.prev is None
+        if first:
+            self.prev = kpts.copy()
+            self.energy = 0.0
+        else:
+            self.energy = float(np.mean(np.linalg.norm(kpts - self.prev, axis=1)))
+            np.copyto(self.prev, kpts)
+        self.frames = min(self.frames + 1, self.history)
+        self.above_run = self.above_run + 1 if self.energy > self.threshold else 0
+        self.below_run = self.below_run + 1 if self.energy < self.threshold else 0
+        if first:
+            return None
+        if not self.active and self.above_run >= self.count_required:
+            self.active = True
+            self.start_frame = self.frames
+            return 'start'
+        if self.active and self.below_run >= self.count_required:
+            self.active = False
+            self.end_frame = self.frames
+            return 'end'
+        return None
+
+
+class HandKinematics:
+    """Trạng thái chuyển động của một bàn tay trong FrameProcessor."""
+
+    def __init__(self, position_window=10, motion_threshold=0.03, motion_count_required=7, motion_history=15):
+        self.path = PathLength(position_window)
+        self.motion = MotionEnergy(motion_threshold, motion_count_required, motion_history)
+
+    def add_position(self, xy):
+        self.path.add(xy)
+
+    def clear_positions(self):
+        self.path.clear()
+
+    def is_moving(self, threshold):
+        return self.path.exceeds(threshold)
+
+    def update_motion(self, kpts):
+        return self.motion.update(kpts)
@@ -0,0 +1,111 @@
+"""Phân loại ký tự nhanh chỉ từ 21 landmark, xếp tầng trước ResNet50.
+
+LandmarkClassifier là một MLP nhỏ chạy bằng NumPy trên landmark đã chuẩn hoá
+(trọng số từ file .npz do src.train_landmark_classifier tạo ra).
+CascadeClassifier bọc LandmarkClassifier và Classifier ảnh: đường nhanh trả kết
+quả khi đủ tự tin và lớp dự đoán không nằm trong danh sách dễ nhầm, ngược lại
+FrameProcessor mới crop ảnh và gọi ResNet50.
+"""
+import os
+
+import numpy as np
+
+from src.classification import BatchPrediction
+from src.config import CLASSES, LANDMARK_MODEL_PATH, FAST_PATH_CONFIDENCE, FAST_PATH_AMBIGUOUS_CLASSES
+from src.hand_frame import HandFrame, landmark_features
+
+# Phiên bản đặc trưng của landmark_features; 2: x, z nhân tỉ lệ rộng / cao của frame.
+# Mô hình huấn luyện với phiên bản khác không được dùng (load_cascade quay về ResNet50).
+FEATURE_VERSION = 2
+
+
+class LandmarkClassifier:
+    """MLP (ReLU) suy luận bằng NumPy, trọng số W0, b0, W1, b1, ... trong file .npz."""
+
+    def __init__(self, model_path=LANDMARK_MODEL_PATH):
+        self.model_path = model_path
+        data = np.load(model_path, allow_pickle=False)
+        num_layers = int(data['num_layers'])
+        self.weights = [data[f'W{i}'].astype(np.float32) for i in range(num_layers)]
+        self.biases = [data[f'b{i}'].astype(np.float32) for i in range(num_layers)]
+        self.classes = [str(c) for c in data['classes']]
+        self.ambiguous = set(str(c) for c in data['ambiguous']) if 'ambiguous' in data else set()
+        if self.classes != list(CLASSES):
+            raise ValueError(f"Lớp của mô hình landmark không khớp CLASSES: {self.classes}")
+        version = int(data['feature_version']) if 'feature_version' in data else 1
+        if version != FEATURE_VERSION:
+            raise ValueError(f"Đặc trưng phiên bản {version}, cần {FEATURE_VERSION} "
+                             f"(huấn luyện lại bằng python -m src.train_landmark_classifier)")
+        print(f"[INFO] Đã tải mô hình landmark từ: {model_path}")
+
+    def logits(self, kpts, aspect=1.0):
+        # HandFrame đã lưu sẵn đặc trưng chuẩn hoá (theo tỉ lệ frame của nó), không cần tính lại
+        feats = kpts.features if isinstance(kpts, HandFrame) else landmark_features(kpts, aspect)
+        x = feats.reshape(-1, self.weights[0].shape[0])
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            x = x @ w + b
+            if i < last:
+                np.maximum(x, 0, out=x)
+        return x
+
+    def predict(self, kpts, aspect=1.0):
+        """Dự đoán cho một HandFrame, một (21, 3) hoặc batch (N, 21, 3) landmark, trả về BatchPrediction.
+
+        aspect (rộng / cao của frame, số hoặc mảng (N,)) chỉ dùng cho landmark dạng mảng.
+        """
+        return BatchPrediction(self.logits(kpts, aspect))
+
+
+class CascadeClassifier:
+    """Giao diện như Classifier, thêm predict_landmarks() cho đường nhanh.
+
+    FrameProcessor gọi predict_landmarks(hand) trước; nếu trả về None thì mới crop ảnh
+    và gọi predict_tensor() của Classifier ảnh.
+    """
+
+    def __init__(self, fast, classifier, confidence_threshold=FAST_PATH_CONFIDENCE, ambiguous_classes=None):
+        self.fast = fast
+        self.classifier = classifier
+        self.confidence_threshold = confidence_threshold
+        ambiguous = set(FAST_PATH_AMBIGUOUS_CLASSES if ambiguous_classes is None else ambiguous_classes)
+        self.ambiguous = ambiguous | fast.ambiguous
+        self.fast_accepted = 0
+        self.fallbacks = 0
+
+    def predict_landmarks(self, hand):
+        """Kết quả đường nhanh cho HandFrame nếu đủ tin cậy và không phải lớp dễ nhầm, ngược lại None."""
+        result = self.fast.predict(hand)
+        if result.confidences[0] >= self.confidence_threshold and result.label(0) not in self.ambiguous:
+            self.fast_accepted += 1
+            return result
+        self.fallbacks += 1
+        return None
+
+    def predict_tensor(self, batch):
+        return self.classifier.predict_tensor(batch)
+
+    def predict_batch(self, images):
+        return self.classifier.predict_batch(images)
+
+    def prediction(self, ori_image, draw=True):
+        return self.classifier.prediction(ori_image, draw=draw)
+
+    def stats(self):
+        total = self.fast_accepted + self.fallbacks
+        return {
+            'fast_path': self.fast_accepted,
+            'resnet': self.fallbacks,
+            'avoided_rate': self.fast_accepted / total if total else 0.0
+        }
+
+
+def load_cascade(classifier, model_path=LANDMARK_MODEL_PATH):
+    """Bọc classifier bằng CascadeClassifier nếu có mô hình landmark, ngược lại trả về classifier."""
+    if model_path is None or not os.path.isfile(model_path):
+        return classifier
+    try:
+        return CascadeClassifier(LandmarkClassifier(model_path), classifier)
+    except (KeyError, ValueError) as e:
+        print(f"[WARNING] Không dùng được mô hình landmark {model_path}: {e}")
+        return classifier
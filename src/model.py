@@ -1,5 +1,4 @@
-import numpy as np
-from collections import deque
+from src.kinematics import SlidingVariance
 
 
 # Stability detector for steady hand detection
@@ -7,18 +6,16 @@ class StabilityDetector:
     def __init__(self, max_frames=30, stability_threshold=0.02):
         self.max_frames = max_frames
         self.stability_threshold = stability_threshold
-        self.keypoints_history = deque(maxlen=max_frames)
-    
+        # Phương sai trượt cập nhật tăng dần thay cho np.var trên cả lịch sử mỗi frame
+        self.keypoints_window = SlidingVariance(max_frames)
+
     def add_keypoints(self, keypoints):
-        self.keypoints_history.append(keypoints)
-    
+        self.keypoints_window.add(keypoints)
+
     def is_stable(self):
-        if len(self.keypoints_history) < self.max_frames:
+        if len(self.keypoints_window) < self.max_frames:
             return False
-        arr = np.array(self.keypoints_history)
-        var = np.var(arr, axis=0)
-        return np.mean(var) < self.stability_threshold
-    
-    def reset(self):
-        self.keypoints_history.clear()
+        return self.keypoints_window.mean_variance() < self.stability_threshold
 
+    def reset(self):
+        self.keypoints_window.reset()
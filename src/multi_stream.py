@@ -0,0 +1,467 @@
+"""Nhiều camera / video trên một máy: mỗi nguồn chạy trong một process worker riêng.
+
+VideoThread của ứng dụng chỉ đọc cv2.VideoCapture(0) với một FrameProcessor, mọi thứ
+chung một process (một GIL). StreamSupervisor tải Classifier / TonePredictor một lần
+trong process chính rồi fork mỗi nguồn một worker: trọng số mô hình nằm ở các trang bộ
+nhớ không bị ghi nên được các worker dùng chung copy-on-write (không tải lại, không
+nhân bản RAM). Nền tảng không có fork (Windows, macOS mặc định spawn) thì mỗi worker tự
+tải mô hình.
+
+Mỗi worker đọc nguồn, chạy phát hiện tay + FrameProcessor (trạng thái riêng) và gửi về
+supervisor qua multiprocessing.Queue:
+    {'type': 'result', ...}  khi văn bản / từ / trạng thái thay đổi
+    {'type': 'stats', ...}   mỗi giây: FPS, ms/frame, bộ nhớ riêng / dùng chung
+    {'type': 'done', ...}    khi nguồn hết hoặc bị dừng (kèm lỗi nếu có)
+Supervisor chuyển các thông điệp cho sink (hàm sink(message)): ConsoleSink, JsonlSink,
+hoặc một hàm phát tín hiệu Qt để giao diện hiển thị.
+
+Nguồn: số nguyên (chỉ số camera), đường dẫn video, log landmark .npz / .vslr hoặc 'synthetic'
+(phát lại landmark bằng ReplayDetector, không cần camera / MediaPipe). Với
+capture_process=True, camera / video được đọc trong một process riêng và chuyển frame
+cho worker qua SharedFrameRing (shared memory, không pickle frame).
+
+Ví dụ:
+    python -m src.multi_stream 0 1 --sink console
+    python -m src.multi_stream cam1.mp4 cam2.mp4 --sink jsonl:results.jsonl --fps 30
+    python -m src.multi_stream 0 1 --capture-process
+    python -m src.multi_stream synthetic --scaling 1,2,4,8 --duration 10
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+# Mô hình dùng chung, gán trước khi fork để worker kế thừa (copy-on-write)
+_shared = {}
+
+
+def memory_usage():
+    """(MB riêng, MB dùng chung) của process hiện tại theo /proc/self/smaps_rollup, None nếu không đọc được."""
+    kb = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    kb[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        return None
+    private = kb.get('Private_Clean', 0) + kb.get('Private_Dirty', 0)
+    shared = kb.get('Shared_Clean', 0) + kb.get('Shared_Dirty', 0)
+    return private / 1024.0, shared / 1024.0
+
+
+def parse_source(source):
+    """'0' -> 0 (camera), các giá trị khác giữ nguyên."""
+    source = str(source)
+    return int(source) if source.isdigit() else source
+
+
+def stream_names(sources):
+    """Tên hiển thị của từng luồng, thêm #chỉ số khi một nguồn xuất hiện nhiều lần."""
+    sources = [str(s) for s in sources]
+    return [s if sources.count(s) == 1 else f"{s}#{i}" for i, s in enumerate(sources)]
+
+
+def open_source(source, width=None, height=None, ring=None):
+    """Trả về (detector, read_frame, release) cho một nguồn.
+
+    read_frame() trả về frame BGR hoặc None khi nguồn hết. Nếu có ring, frame được đọc
+    từ SharedFrameRing do process đọc camera ghi vào. Với log landmark / 'synthetic',
+    read_frame.clock là VirtualClock được đặt về timestamp đã ghi của frame sắp xử lý
+    (lần lặp sau cộng thêm độ dài log), để FrameProcessor chạy theo thời gian của log.
+    Frame nền của nguồn phát lại có kích thước frame lúc ghi (frame_shape của log) trừ khi
+    truyền width, height.
+    """
+    import numpy as np
+
+    if ring is not None:
+        from src.hand_tracking import handDetector
+        from src.shm_ring import RingReader
+
+        return handDetector(maxHands=1), RingReader(ring), lambda: None
+
+    from src.replay import is_landmark_log
+
+    if source == 'synthetic' or is_landmark_log(source):
+        from src.replay import (DEFAULT_FRAME_SHAPE, ReplayDetector, VirtualClock, load_landmark_log,
+                                synthetic_landmark_log)
+
+        if source == 'synthetic':
+            landmarks, present, timestamps = synthetic_landmark_log(600)
+            frame_shape = DEFAULT_FRAME_SHAPE
+        else:
+            landmarks, present, timestamps, frame_shape = load_landmark_log(source)
+        if not len(present):
+            raise ValueError(f"{source} không có frame nào")
+        if width and height:
+            frame_shape = (height, width, 3)
+        detector = ReplayDetector(landmarks, present, loop=True, frame_shape=frame_shape)
+        background = np.random.default_rng(0).integers(0, 255, size=frame_shape, dtype=np.uint8)
+        clock = VirtualClock(timestamps[0])
+        # Độ dài một lần lặp: từ frame đầu tới frame cuối + một khoảng giữa hai frame
+        step = float(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 1.0 / 30.0
+        period = float(timestamps[-1] - timestamps[0]) + step
+        index = 0
+
+        def read_frame():
+            # Mỗi lần gọi ứng với đúng một findHands của ReplayDetector (cùng chỉ số frame)
+            nonlocal index
+            loop, i = divmod(index, len(timestamps))
+            clock.set(timestamps[i] + loop * period)
+            index += 1
+            # Sao chép mỗi frame như khi đọc từ camera thật
+            return background.copy()
+
+        read_frame.clock = clock
+        return detector, read_frame, lambda: None
+
+    import cv2
+    from src.hand_tracking import handDetector
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise ValueError(f"Không mở được nguồn {source}")
+
+    def read_frame():
+        ret, frame = cap.read()
+        return frame if ret else None
+
+    return handDetector(maxHands=1), read_frame, cap.release
+
+
+def stream_worker(stream_id, source, results, stop_event, options, ring=None):
+    """Vòng lặp của một process worker: đọc nguồn, xử lý từng frame, gửi kết quả / thống kê."""
+    frames = 0
+    busy = 0.0
+    error = None
+    read_frame = None
+    start = time.perf_counter()
+    try:
+        import torch
+        from src.batch_transcribe import build_frame_processor
+        from src.replay import ReplayDetector
+
+        torch.set_num_threads(options.get('threads') or 1)
+        if not _shared:
+            # Không fork được (spawn): tự tải mô hình trong worker
+            _shared.update(zip(('classifier', 'tone_predictor'), load_models()))
+        detector, read_frame, release = open_source(source, options.get('width'), options.get('height'),
+                                                    ring)
+        frame_processor = build_frame_processor(_shared['classifier'], _shared['tone_predictor'], detector,
+                                                clock=getattr(read_frame, 'clock', None))
+        if isinstance(detector, ReplayDetector):
+            # Phát lại landmark trên nền tĩnh: cổng dùng lại landmark sẽ luôn bỏ qua frame
+            frame_processor.frame_gate = None
+        # Có ring thì process đọc camera đã giữ nhịp
+        interval = 1.0 / options['fps'] if options.get('fps') and ring is None else 0.0
+        max_frames = options.get('max_frames')
+        last = None
+        # FPS tính từ frame đầu tiên, không gồm thời gian mở nguồn / tạo detector
+        start = window_start = time.perf_counter()
+        window_frames, window_busy = 0, 0.0
+        try:
+            while not stop_event.is_set() and (not max_frames or frames < max_frames):
+                frame = read_frame()
+                if frame is None:
+                    break
+                t0 = time.perf_counter()
+                frame_processor.process_frame(frame)
+                elapsed = time.perf_counter() - t0
+                busy += elapsed
+                window_busy += elapsed
+                frames += 1
+                window_frames += 1
+
+                text = frame_processor.text_processor
+                current = (text.get_display_text() or "", text.current_word,
+                           "tone" if frame_processor.tone_collection else "char")
+                if current != last:
+                    last = current
+                    results.put({'type': 'result', 'stream': stream_id, 'frame': frames, 'ts': time.time(),
+                                 'text': current[0], 'word': current[1], 'status': current[2]})
+
+                now = time.perf_counter()
+                if now - window_start >= 1.0:
+                    memory = memory_usage()
+                    results.put({'type': 'stats', 'stream': stream_id, 'frames': frames,
+                                 'fps': window_frames / (now - window_start),
+                                 'busy_ms': window_busy / window_frames * 1000.0,
+                                 'dropped': getattr(read_frame, 'dropped', 0),
+                                 'private_mb': memory[0] if memory else None,
+                                 'shared_mb': memory[1] if memory else None})
+                    window_start, window_frames, window_busy = now, 0, 0.0
+                if interval:
+                    # Giữ nhịp như camera thật khi đọc từ file
+                    time.sleep(max(0.0, start + frames * interval - time.perf_counter()))
+        finally:
+            release()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    results.put({'type': 'done', 'stream': stream_id, 'frames': frames, 'elapsed': elapsed,
+                 'fps': frames / elapsed if elapsed > 0 else 0.0,
+                 'busy_ms': busy / frames * 1000.0 if frames else 0.0,
+                 'dropped': getattr(read_frame, 'dropped', 0), 'error': error})
+
+
+def load_models(threads=None):
+    """Tải Classifier (+ cascade landmark) và TonePredictor, không warm-up.
+
+    Không chạy suy luận trong process chính trước khi fork: thread pool OpenMP của
+    PyTorch đã khởi tạo có thể treo ở process con.
+    """
+    from src.classification import Classifier
+    from src.landmark_classifier import load_cascade
+    from src.tone_predictor import TonePredictor
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return load_cascade(Classifier()), TonePredictor()
+
+
+class ConsoleSink:
+    """In văn bản của từng luồng khi thay đổi và FPS định kỳ."""
+
+    def __init__(self, names):
+        self.names = names
+
+    def __call__(self, message):
+        name = self.names[message['stream']]
+        if message['type'] == 'result':
+            print(f"[{name}] {message['text']!r} (từ: {message['word']!r}, {message['status']})")
+        elif message['type'] == 'stats':
+            print(f"[INFO] [{name}] {message['fps']:.1f} FPS, {message['busy_ms']:.1f} ms/frame")
+
+
+class JsonlSink:
+    """Ghi mọi thông điệp ra file JSON Lines (mỗi dòng một thông điệp)."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def __call__(self, message):
+        self.file.write(json.dumps(message, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class StreamSupervisor:
+    def __init__(self, sources, sink=None, classifier=None, tone_predictor=None, threads=1,
+                 fps=None, max_frames=None, width=None, height=None, start_method=None,
+                 capture_process=False, ring_slots=4):
+        """
+        Args:
+            sources: Danh sách nguồn (chỉ số camera, đường dẫn video, log .npz / .vslr, 'synthetic').
+            sink: Hàm sink(message) nhận kết quả / thống kê của mọi luồng (chạy trên thread gọi run()).
+            classifier, tone_predictor: Mô hình đã tải để worker dùng chung; None để worker tự tải.
+            threads (int): Số thread PyTorch mỗi worker.
+            fps (float): Giới hạn FPS mỗi luồng khi đọc file (None: nhanh nhất có thể).
+            max_frames (int): Dừng mỗi luồng sau chừng này frame (None: tới khi nguồn hết / bị dừng).
+            width, height (int): Kích thước frame giả cho nguồn phát lại landmark (None: theo log).
+            start_method (str): 'fork' / 'spawn'. Mặc định fork nếu nền tảng hỗ trợ.
+            capture_process (bool): Đọc camera / video trong process riêng, chuyển frame qua SharedFrameRing.
+            ring_slots (int): Số ô frame của mỗi SharedFrameRing.
+        """
+        self.sources = [parse_source(s) for s in sources]
+        self.names = stream_names(sources)
+        self.sink = sink
+        self.models = (classifier, tone_predictor)
+        self.options = {'threads': threads, 'fps': fps, 'max_frames': max_frames, 'width': width, 'height': height}
+        if start_method is None:
+            start_method = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+        self.start_method = start_method
+        self.context = mp.get_context(start_method)
+        self.results = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.capture_process = capture_process
+        self.ring_slots = ring_slots
+        self.workers = []
+        self.capturers = []
+        self.rings = []
+        self.streams = {}
+
+    def start(self):
+        classifier, tone_predictor = self.models
+        if self.start_method == 'fork' and classifier is not None:
+            _shared['classifier'] = classifier
+            _shared['tone_predictor'] = tone_predictor
+        for stream_id, source in enumerate(self.sources):
+            self.streams[stream_id] = {'source': self.names[stream_id], 'frames': 0, 'fps': 0.0,
+                                       'busy_ms': 0.0, 'dropped': 0, 'private_mb': None, 'shared_mb': None,
+                                       'done': False, 'error': None}
+            ring = self.start_capture(source) if self.capture_process else None
+            worker = self.context.Process(target=stream_worker, name=f"stream-{stream_id}",
+                                          args=(stream_id, source, self.results, self.stop_event, self.options, ring),
+                                          daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        print(f"[INFO] Đã khởi động {len(self.workers)} worker ({self.start_method})")
+
+    def start_capture(self, source):
+        """Tạo SharedFrameRing + process đọc camera / video cho nguồn, None với nguồn phát lại landmark."""
+        from src.replay import is_landmark_log
+        from src.shm_ring import SharedFrameRing, capture_to_ring, probe_source
+
+        if source == 'synthetic' or is_landmark_log(source):
+            return None
+        shape = probe_source(source)
+        if shape is None:
+            print(f"[ERROR] Không đọc được frame từ {source}, worker sẽ tự mở nguồn")
+            return None
+        ring = SharedFrameRing.create(shape, self.ring_slots, self.context)
+        capturer = self.context.Process(target=capture_to_ring, name=f"capture-{source}",
+                                        args=(source, ring, self.stop_event, self.options['fps']), daemon=True)
+        capturer.start()
+        self.rings.append(ring)
+        self.capturers.append(capturer)
+        return ring
+
+    def handle(self, message):
+        stream = self.streams[message['stream']]
+        if message['type'] == 'stats':
+            stream.update({k: message[k] for k in ('frames', 'fps', 'busy_ms', 'dropped', 'private_mb', 'shared_mb')})
+        elif message['type'] == 'done':
+            stream.update(done=True, frames=message['frames'], error=message['error'], busy_ms=message['busy_ms'],
+                          dropped=message['dropped'], mean_fps=message['fps'], elapsed=message['elapsed'])
+            if message['error']:
+                print(f"[ERROR] Luồng {stream['source']}: {message['error']}")
+        if self.sink is not None:
+            self.sink(message)
+
+    def run(self, duration=None):
+        """Chuyển thông điệp cho sink tới khi mọi luồng kết thúc hoặc hết duration giây."""
+        if not self.workers:
+            self.start()
+        deadline = time.perf_counter() + duration if duration else None
+        try:
+            while not all(s['done'] for s in self.streams.values()):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                try:
+                    self.handle(self.results.get(timeout=0.2))
+                except queue.Empty:
+                    for stream_id, worker in enumerate(self.workers):
+                        if not worker.is_alive() and not self.streams[stream_id]['done']:
+                            # Worker chết không kịp gửi 'done' (vd. bị kill)
+                            self.streams[stream_id].update(done=True, error=f"exit code {worker.exitcode}")
+                            print(f"[ERROR] Worker {self.names[stream_id]} dừng đột ngột ({worker.exitcode})")
+        except KeyboardInterrupt:
+            print("[INFO] Dừng theo yêu cầu")
+        finally:
+            self.stop()
+        return self.summary()
+
+    def stop(self, timeout=5.0):
+        """Báo worker dừng, nhận nốt thông điệp 'done' rồi join (kill nếu quá hạn)."""
+        self.stop_event.set()
+        for ring in self.rings:
+            ring.close()  # đánh thức worker đang chờ frame
+        deadline = time.perf_counter() + timeout
+        while not all(s['done'] for s in self.streams.values()) and time.perf_counter() < deadline:
+            try:
+                self.handle(self.results.get(timeout=0.1))
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in self.workers):
+                    break
+        for process in self.workers + self.capturers:
+            process.join(max(0.0, deadline - time.perf_counter()))
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for ring in self.rings:
+            ring.dispose()
+        self.rings = []
+
+    def summary(self):
+        streams = list(self.streams.values())
+        return {
+            'streams': streams,
+            'total_fps': sum(s.get('mean_fps', s['fps']) for s in streams),
+            'errors': sum(1 for s in streams if s['error']),
+        }
+
+
+def print_summary(summary):
+    print(f"{'luồng':<24}{'frame':>8}{'bỏ':>6}{'FPS':>8}{'ms/frame':>10}{'RAM riêng':>11}{'dùng chung':>12}")
+    for s in summary['streams']:
+        private = f"{s['private_mb']:.0f} MB" if s['private_mb'] is not None else "-"
+        shared = f"{s['shared_mb']:.0f} MB" if s['shared_mb'] is not None else "-"
+        print(f"{s['source'][:23]:<24}{s['frames']:>8}{s['dropped']:>6}{s.get('mean_fps', s['fps']):>8.1f}{s['busy_ms']:>10.1f}"
+              f"{private:>11}{shared:>12}")
+    print(f"[INFO] Tổng: {summary['total_fps']:.1f} FPS, {summary['errors']} lỗi")
+
+
+def run_scaling(source, levels, duration, classifier, tone_predictor, **options):
+    """Chạy cùng một nguồn với 1..N worker, in đường cong mở rộng theo số CPU."""
+    print(f"[INFO] {os.cpu_count()} CPU, mỗi mức chạy {duration:.0f}s")
+    rows = []
+    for count in levels:
+        supervisor = StreamSupervisor([source] * count, classifier=classifier, tone_predictor=tone_predictor,
+                                      **options)
+        summary = supervisor.run(duration)
+        per_stream = [s.get('mean_fps', s['fps']) for s in summary['streams']]
+        rows.append((count, summary['total_fps'], min(per_stream), summary['errors']))
+    base = rows[0][1] / rows[0][0] if rows and rows[0][1] else 0.0
+    print(f"{'luồng':>6}{'tổng FPS':>10}{'FPS thấp nhất':>15}{'tăng tốc':>10}{'hiệu suất':>11}{'lỗi':>6}")
+    for count, total, lowest, errors in rows:
+        speedup = total / base if base else 0.0
+        print(f"{count:>6}{total:>10.1f}{lowest:>15.1f}{speedup:>9.2f}x{speedup / count:>11.0%}{errors:>6}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nhận diện trên nhiều camera / video, mỗi nguồn một process")
+    parser.add_argument("sources", nargs='+', help="Chỉ số camera, đường dẫn video, log landmark .npz / .vslr hoặc 'synthetic'")
+    parser.add_argument("--sink", default="console", help="'console', 'jsonl:<file>' hoặc 'none'")
+    parser.add_argument("--fps", type=float, default=None, help="Giới hạn FPS mỗi luồng khi đọc file")
+    parser.add_argument("--duration", type=float, default=None, help="Số giây chạy (mặc định: tới khi nguồn hết)")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=1, help="Số thread PyTorch mỗi worker")
+    parser.add_argument("--start-method", choices=('fork', 'spawn'), default=None)
+    parser.add_argument("--capture-process", action="store_true",
+                        help="Đọc camera / video trong process riêng, chuyển frame qua shared memory")
+    parser.add_argument("--scaling", help="Đo mở rộng: chạy nguồn đầu tiên với các số worker, vd. 1,2,4,8")
+    args = parser.parse_args()
+
+    start_method = args.start_method or ('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+    classifier = tone_predictor = None
+    if start_method == 'fork':
+        start = time.perf_counter()
+        classifier, tone_predictor = load_models()
+        print(f"[INFO] Tải mô hình dùng chung: {time.perf_counter() - start:.1f}s")
+    options = dict(threads=args.threads, fps=args.fps, max_frames=args.max_frames, start_method=start_method,
+                   capture_process=args.capture_process)
+
+    if args.scaling:
+        levels = [int(n) for n in args.scaling.split(',') if n.strip()]
+        run_scaling(args.sources[0], levels, args.duration or 10.0, classifier, tone_predictor, **options)
+        return
+
+    sink = None
+    if args.sink == 'console':
+        sink = ConsoleSink(stream_names(args.sources))
+    elif args.sink.startswith('jsonl:'):
+        sink = JsonlSink(args.sink.split(':', 1)[1])
+    elif args.sink != 'none':
+        parser.error(f"sink không hợp lệ: {args.sink}")
+    supervisor = StreamSupervisor(args.sources, sink=sink, classifier=classifier, tone_predictor=tone_predictor,
+                                  **options)
+    try:
+        print_summary(supervisor.run(args.duration))
+    finally:
+        if hasattr(sink, 'close'):
+            sink.close()
+    sys.exit(1 if any(s['error'] for s in supervisor.streams.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
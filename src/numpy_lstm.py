@@ -0,0 +1,283 @@
+"""Suy luận mô hình LSTM thanh điệu chỉ bằng NumPy (không cần TensorFlow lúc chạy).
+
+Trích trọng số các lớp LSTM / Dense (và hàm kích hoạt) từ file h5 của Keras ra một
+file .npz gọn, kèm danh sách nhãn dạng chuỗi thay cho label encoder pickle của sklearn.
+NumpyLSTM chạy lại forward pass của mô hình Sequential đó (Dropout bị bỏ qua khi suy luận).
+
+Ví dụ:
+    python -m src.numpy_lstm --model trained_models/lstm_model_final.h5 --check
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+SUPPORTED_LAYERS = ('LSTM', 'Dense')
+SKIPPED_LAYERS = ('InputLayer', 'Dropout')
+
+
+def sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def hard_sigmoid(x):
+    # Keras 3: relu6(x + 3) / 6
+    return np.clip(x / 6.0 + 0.5, 0.0, 1.0)
+
+
+def softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': sigmoid,
+    'hard_sigmoid': hard_sigmoid,
+    'softmax': softmax,
+}
+
+
+def default_npz_path(model_path):
+    """File .npz mặc định cạnh mô hình h5, vd. lstm_model_final.h5 -> lstm_model_final.npz"""
+    return os.path.splitext(model_path)[0] + ".npz"
+
+
+def default_encoder_path(model_path):
+    return model_path.replace("_final.h5", "_label_encoder.pkl")
+
+
+def _layer_configs(model_config):
+    config = model_config['config']
+    # Keras 2 cũ lưu Sequential dưới dạng list lớp, các phiên bản sau là dict có 'layers'
+    return config['layers'] if isinstance(config, dict) else config
+
+
+def extract_weights(h5_path):
+    """Đọc cấu hình và trọng số các lớp LSTM / Dense từ file h5.
+
+    Returns:
+        list dict {'type', 'activation', 'recurrent_activation', 'return_sequences', 'weights'}
+        theo đúng thứ tự lớp; 'weights' là [kernel, (recurrent_kernel,) bias].
+    """
+    import h5py
+
+    layers = []
+    with h5py.File(h5_path, 'r') as f:
+        model_config = f.attrs['model_config']
+        if isinstance(model_config, bytes):
+            model_config = model_config.decode('utf-8')
+        model_config = json.loads(model_config)
+        if model_config['class_name'] != 'Sequential':
+            raise ValueError(f"Chỉ hỗ trợ mô hình Sequential, nhận: {model_config['class_name']}")
+        weights_group = f['model_weights']
+
+        for layer in _layer_configs(model_config):
+            class_name, config = layer['class_name'], layer['config']
+            if class_name in SKIPPED_LAYERS:
+                continue
+            if class_name not in SUPPORTED_LAYERS:
+                raise ValueError(f"Lớp chưa hỗ trợ: {class_name} ({config.get('name')})")
+            group = weights_group[config['name']]
+            # weight_names giữ đúng thứ tự kernel, recurrent_kernel, bias (cả Keras 2 và 3)
+            names = [n.decode('utf-8') if isinstance(n, bytes) else n for n in group.attrs['weight_names']]
+            weights = [np.asarray(group[name], dtype=np.float32) for name in names]
+            if not config.get('use_bias', True):
+                units = weights[0].shape[1]
+                weights.append(np.zeros(units, dtype=np.float32))
+            layers.append({
+                'type': class_name.lower(),
+                'activation': config.get('activation', 'linear'),
+                'recurrent_activation': config.get('recurrent_activation', ''),
+                'return_sequences': bool(config.get('return_sequences', False)),
+                'weights': weights,
+            })
+    return layers
+
+
+def load_encoder_classes(encoder_path):
+    """Danh sách nhãn từ label encoder pickle (chỉ cần sklearn ở bước trích xuất)."""
+    with open(encoder_path, "rb") as f:
+        return [str(c) for c in pickle.load(f).classes_]
+
+
+def save_npz(path, layers, classes):
+    arrays = {
+        'num_layers': np.array(len(layers)),
+        'types': np.array([layer['type'] for layer in layers]),
+        'activations': np.array([layer['activation'] for layer in layers]),
+        'recurrent_activations': np.array([layer['recurrent_activation'] for layer in layers]),
+        'return_sequences': np.array([layer['return_sequences'] for layer in layers]),
+        'classes': np.array(classes, dtype=str),
+    }
+    for i, layer in enumerate(layers):
+        arrays[f'W{i}'] = layer['weights'][0]
+        arrays[f'b{i}'] = layer['weights'][-1]
+        if layer['type'] == 'lstm':
+            arrays[f'U{i}'] = layer['weights'][1]
+    np.savez(path, **arrays)
+    print(f"[INFO] Đã lưu mô hình LSTM (NumPy) vào: {path}")
+    return path
+
+
+def load_classes(npz_path):
+    """Chỉ đọc danh sách nhãn từ file .npz (np.load đọc từng khoá khi cần)."""
+    with np.load(npz_path, allow_pickle=False) as data:
+        return [str(c) for c in data['classes']]
+
+
+class NumpyLSTM:
+    """Forward pass của Sequential [LSTM..., Dense...] bằng NumPy float32.
+
+    Thứ tự cổng trong kernel của Keras: input, forget, cell, output.
+    """
+
+    def __init__(self, npz_path):
+        self.npz_path = npz_path
+        with np.load(npz_path, allow_pickle=False) as data:
+            num_layers = int(data['num_layers'])
+            self.classes = [str(c) for c in data['classes']]
+            self.layers = []
+            for i in range(num_layers):
+                self.layers.append({
+                    'type': str(data['types'][i]),
+                    'activation': ACTIVATIONS[str(data['activations'][i])],
+                    'recurrent_activation': ACTIVATIONS.get(str(data['recurrent_activations'][i])),
+                    'return_sequences': bool(data['return_sequences'][i]),
+                    'W': data[f'W{i}'].astype(np.float32),
+                    'U': data[f'U{i}'].astype(np.float32) if f'U{i}' in data else None,
+                    'b': data[f'b{i}'].astype(np.float32),
+                })
+        self.input_features = self.layers[0]['W'].shape[0]
+        # Chạy từng bước (step) được khi các lớp LSTM đứng trước mọi lớp Dense
+        types = [layer['type'] for layer in self.layers]
+        self.streamable = 'lstm' in types and types == sorted(types, key=lambda t: t != 'lstm')
+
+    @staticmethod
+    def cell(xw_t, h, c, layer):
+        """Một bước LSTM: xw_t = x_t @ W + b (N, 4 * units), trả về (h, c) mới."""
+        act, rec_act = layer['activation'], layer['recurrent_activation']
+        units = layer['U'].shape[0]
+        z = xw_t + h @ layer['U']
+        i = rec_act(z[:, :units])
+        f = rec_act(z[:, units:2 * units])
+        g = act(z[:, 2 * units:3 * units])
+        o = rec_act(z[:, 3 * units:])
+        c = f * c + i * g
+        return o * act(c), c
+
+    @classmethod
+    def lstm(cls, x, layer):
+        """x (N, T, F) -> (N, T, units) nếu return_sequences, ngược lại (N, units)."""
+        W, U, b = layer['W'], layer['U'], layer['b']
+        n, steps, _ = x.shape
+        units = U.shape[0]
+        # Phần phụ thuộc đầu vào của mọi bước tính một lần bằng một phép nhân ma trận lớn
+        xw = (x.reshape(n * steps, -1) @ W + b).reshape(n, steps, 4 * units)
+        h = np.zeros((n, units), dtype=np.float32)
+        c = np.zeros((n, units), dtype=np.float32)
+        outputs = np.empty((n, steps, units), dtype=np.float32) if layer['return_sequences'] else None
+        for t in range(steps):
+            h, c = cls.cell(xw[:, t], h, c, layer)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+    def head(self, x):
+        """Các lớp Dense sau LSTM cuối: (N, units) -> xác suất (N, số lớp)."""
+        for layer in self.layers:
+            if layer['type'] == 'dense':
+                x = layer['activation'](x @ layer['W'] + layer['b'])
+        return x
+
+    def predict(self, X):
+        """X (N, T, F) -> xác suất (N, số lớp)."""
+        x = np.asarray(X, dtype=np.float32)
+        for layer in self.layers:
+            if layer['type'] == 'lstm':
+                x = self.lstm(x, layer)
+            else:
+                x = layer['activation'](x @ layer['W'] + layer['b'])
+        return x
+
+    __call__ = predict
+
+    def initial_state(self):
+        """Trạng thái (h, c) bằng 0 của từng lớp LSTM cho một chuỗi."""
+        return [(np.zeros((1, layer['U'].shape[0]), dtype=np.float32),
+                 np.zeros((1, layer['U'].shape[0]), dtype=np.float32))
+                for layer in self.layers if layer['type'] == 'lstm']
+
+    def step(self, x_t, state):
+        """Đưa một frame x_t (F,) qua mọi lớp LSTM, cập nhật state tại chỗ, trả về h của lớp cuối (1, units).
+
+        Gọi step lần lượt với T frame rồi head(h) cho cùng kết quả với predict trên chuỗi T frame đó.
+        """
+        x = np.asarray(x_t, dtype=np.float32).reshape(1, -1)
+        lstm_layers = (layer for layer in self.layers if layer['type'] == 'lstm')
+        for k, layer in enumerate(lstm_layers):
+            h, c = self.cell(x @ layer['W'] + layer['b'], *state[k], layer)
+            state[k] = (h, c)
+            x = h
+        return x
+
+
+def check_against_keras(h5_path, npz_path, count=50, seed=0):
+    """So sánh NumpyLSTM với Keras trên chuỗi ngẫu nhiên, in sai khác và độ trễ."""
+    import tensorflow as tf
+
+    keras_model = tf.keras.models.load_model(h5_path, compile=False)
+    engine = NumpyLSTM(npz_path)
+    rng = np.random.default_rng(seed)
+    steps = keras_model.input_shape[1]
+    X = rng.uniform(0, 1, size=(count, steps, engine.input_features)).astype(np.float32)
+
+    expected = keras_model(X, training=False).numpy()
+    actual = engine.predict(X)
+    diff = np.abs(expected - actual)
+    agreement = np.mean(expected.argmax(1) == actual.argmax(1))
+
+    latencies = []
+    for x in X:
+        t0 = time.perf_counter()
+        engine.predict(x[None])
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    print(f"[INFO] Sai khác so với Keras: max {diff.max():.2e}, mean {diff.mean():.2e}, "
+          f"top-1 trùng {agreement * 100:.1f}%")
+    print(f"[INFO] NumPy p50 {np.percentile(latencies, 50):.2f} ms, p95 {np.percentile(latencies, 95):.2f} ms")
+    return float(diff.max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trích trọng số LSTM từ h5 ra .npz cho suy luận NumPy")
+    parser.add_argument("--model", default="trained_models/lstm_model_final.h5")
+    parser.add_argument("--encoder", help="Label encoder pickle (mặc định đặt cạnh mô hình)")
+    parser.add_argument("--output", help="File .npz (mặc định đặt cạnh mô hình h5)")
+    parser.add_argument("--check", action="store_true", help="So sánh với Keras (cần TensorFlow)")
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    encoder_path = args.encoder or default_encoder_path(args.model)
+    output = args.output or default_npz_path(args.model)
+    layers = extract_weights(args.model)
+    classes = load_encoder_classes(encoder_path)
+    if len(classes) != layers[-1]['weights'][0].shape[1]:
+        raise ValueError(f"Số nhãn ({len(classes)}) không khớp số đầu ra của mô hình")
+    for layer in layers:
+        shapes = ', '.join(str(w.shape) for w in layer['weights'])
+        print(f"    {layer['type']:<6}{layer['activation']:<10}{shapes}")
+    save_npz(output, layers, classes)
+
+    if args.check:
+        max_diff = check_against_keras(args.model, output)
+        if max_diff > args.tolerance:
+            raise SystemExit(f"[ERROR] Sai khác {max_diff:.2e} vượt ngưỡng {args.tolerance:.0e}")
+
+
+if __name__ == "__main__":
+    main()
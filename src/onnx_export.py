@@ -0,0 +1,194 @@
+"""Xuất Classifier ResNet50 sang ONNX và lượng tử hoá int8.
+
+Các bước:
+    1. Xuất trained_models/last.pt -> trained_models/last.onnx (batch động).
+    2. Lượng tử hoá int8 -> trained_models/last.int8.onnx
+         - dynamic: không cần dữ liệu hiệu chỉnh
+         - static : hiệu chỉnh bằng các ảnh crop đã ghi (thư mục ảnh hoặc .npz có khoá 'crops')
+    3. So sánh độ trễ và mức độ trùng khớp dự đoán với PyTorch.
+
+Ví dụ:
+    python -m src.onnx_export --model trained_models/last.pt --quantize static --calibration crops/
+"""
+import argparse
+import inspect
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.classification import Classifier, default_onnx_path, softmax
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def load_crops(path, limit=None):
+    """Đọc ảnh crop (BGR uint8) từ thư mục ảnh hoặc file .npz (khoá 'crops')."""
+    if path.endswith('.npz'):
+        crops = list(np.load(path)['crops'])
+    else:
+        crops = []
+        for name in sorted(os.listdir(path)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                img = cv2.imread(os.path.join(path, name))
+                if img is not None:
+                    crops.append(img)
+    return crops[:limit] if limit else crops
+
+
+def export_onnx(classifier, onnx_path, opset=17):
+    """Xuất mô hình PyTorch của classifier sang ONNX với trục batch động."""
+    import torch
+
+    dummy = torch.zeros(1, 3, 224, 224, dtype=torch.float32)
+    kwargs = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        # torch >= 2.9 mặc định dùng exporter dynamo; đồ thị của nó làm shape inference
+        # của bộ lượng tử hoá onnxruntime báo lỗi, nên giữ exporter TorchScript
+        kwargs['dynamo'] = False
+    torch.onnx.export(
+        classifier.model, dummy, onnx_path,
+        input_names=['input'], output_names=['logits'],
+        dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=opset,
+        **kwargs
+    )
+    print(f"[INFO] Đã xuất ONNX: {onnx_path}")
+    return onnx_path
+
+
+def quantize_dynamic_int8(onnx_path, out_path):
+    """Lượng tử hoá động: trọng số int8, activation lượng tử hoá lúc chạy."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(onnx_path, out_path, weight_type=QuantType.QInt8)
+    print(f"[INFO] Đã lượng tử hoá (dynamic) int8: {out_path}")
+    return out_path
+
+
+def make_calibration_reader(classifier, crops, input_name='input'):
+    """Tạo CalibrationDataReader của onnxruntime từ danh sách ảnh crop."""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class CropCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self._iter = iter([{input_name: classifier.preprocess(c)} for c in crops])
+
+        def get_next(self):
+            return next(self._iter, None)
+
+    return CropCalibrationReader()
+
+
+def quantize_static_int8(classifier, onnx_path, out_path, crops, per_channel=True):
+    """Lượng tử hoá tĩnh (QDQ) với dải activation hiệu chỉnh từ ảnh crop đã ghi."""
+    from onnxruntime.quantization import quantize_static, QuantFormat, QuantType, CalibrationMethod
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if not crops:
+        raise ValueError("Lượng tử hoá static cần dữ liệu hiệu chỉnh (--calibration)")
+    # Tối ưu đồ thị + suy luận shape trước khi lượng tử hoá (khuyến nghị của onnxruntime)
+    prep_path = os.path.splitext(out_path)[0] + ".prep.onnx"
+    quant_pre_process(onnx_path, prep_path)
+    quantize_static(
+        prep_path, out_path, make_calibration_reader(classifier, crops),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+    os.remove(prep_path)
+    print(f"[INFO] Đã lượng tử hoá (static, {len(crops)} ảnh hiệu chỉnh) int8: {out_path}")
+    return out_path
+
+
+def compare_backends(reference, candidates, crops, warmup=3):
+    """So sánh độ trễ và mức trùng khớp của các backend với PyTorch.
+
+    Args:
+        reference: Classifier backend 'torch'.
+        candidates: dict {tên: Classifier}.
+        crops: danh sách ảnh crop BGR.
+
+    Returns:
+        dict {tên backend: {'p50_ms', 'p95_ms', 'top1_agreement', 'max_prob_diff', 'mean_prob_diff'}}
+    """
+    batches = [reference.preprocess(c) for c in crops]
+
+    def run(classifier):
+        for b in batches[:warmup]:
+            classifier.infer(b)
+        latencies, probs = [], []
+        for b in batches:
+            t0 = time.perf_counter()
+            logits = classifier.infer(b)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            probs.append(softmax(logits)[0])
+        return np.array(latencies), np.array(probs)
+
+    ref_lat, ref_probs = run(reference)
+    report = {'torch': {'p50_ms': float(np.percentile(ref_lat, 50)),
+                        'p95_ms': float(np.percentile(ref_lat, 95)),
+                        'top1_agreement': 1.0, 'max_prob_diff': 0.0, 'mean_prob_diff': 0.0}}
+    for name, classifier in candidates.items():
+        lat, probs = run(classifier)
+        diff = np.abs(probs - ref_probs)
+        report[name] = {
+            'p50_ms': float(np.percentile(lat, 50)),
+            'p95_ms': float(np.percentile(lat, 95)),
+            'top1_agreement': float(np.mean(probs.argmax(1) == ref_probs.argmax(1))),
+            'max_prob_diff': float(diff.max()),
+            'mean_prob_diff': float(diff.mean())
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{'backend':<12}{'p50 ms':>9}{'p95 ms':>9}{'top-1':>9}{'max Δp':>9}{'mean Δp':>10}")
+    for name, r in report.items():
+        print(f"{name:<12}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['top1_agreement'] * 100:>8.1f}%"
+              f"{r['max_prob_diff']:>9.4f}{r['mean_prob_diff']:>10.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Xuất Classifier sang ONNX / int8 và so sánh với PyTorch")
+    parser.add_argument("--model", default="trained_models/last.pt")
+    parser.add_argument("--quantize", choices=['none', 'dynamic', 'static'], default='dynamic')
+    parser.add_argument("--calibration", help="Thư mục ảnh crop hoặc .npz dùng để hiệu chỉnh / đánh giá")
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--report", help="Ghi báo cáo so sánh ra file JSON")
+    args = parser.parse_args()
+
+    reference = Classifier(model_path=args.model, backend='torch')
+    onnx_path = export_onnx(reference, default_onnx_path(args.model, 'onnx'), opset=args.opset)
+
+    crops = load_crops(args.calibration, args.calibration_size) if args.calibration else []
+    if args.quantize != 'none':
+        int8_path = default_onnx_path(args.model, 'onnx-int8')
+        if args.quantize == 'static':
+            quantize_static_int8(reference, onnx_path, int8_path, crops)
+        else:
+            quantize_dynamic_int8(onnx_path, int8_path)
+
+    if not crops:
+        print("[WARNING] Không có ảnh crop, dùng ảnh ngẫu nhiên: chỉ số trùng khớp không có ý nghĩa")
+        rng = np.random.default_rng(0)
+        crops = [rng.integers(0, 255, size=(300, 300, 3), dtype=np.uint8) for _ in range(50)]
+
+    candidates = {'onnx': Classifier(model_path=args.model, backend='onnx')}
+    if args.quantize != 'none':
+        candidates['onnx-int8'] = Classifier(model_path=args.model, backend='onnx-int8')
+    report = compare_backends(reference, candidates, crops)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Đã ghi báo cáo vào: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
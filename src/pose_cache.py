@@ -0,0 +1,88 @@
+"""Cache kết quả phân loại ký tự theo tư thế bàn tay.
+
+Khi tay giữ nguyên một ký hiệu, ResNet50 vẫn bị gọi ở mọi frame cho tới khi
+phiếu bầu PREDICTION_HISTORY_SIZE ổn định. PoseCache lưu kết quả theo chữ ký
+tư thế (21 landmark đã chuẩn hoá theo cổ tay và kích thước bàn tay) để tư thế
+gần như giống hệt dùng lại vector xác suất cũ thay vì chạy lại mạng.
+"""
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.hand_frame import HandFrame, pose_signature
+
+
+class PoseCache:
+    def __init__(self, max_size=32, ttl=2.0, tolerance=0.03, clock=time.monotonic):
+        """
+        Args:
+            max_size (int): Số tư thế tối đa, vượt quá thì loại mục ít dùng nhất (LRU).
+            ttl (float): Tuổi thọ (giây) của mỗi mục tính từ lúc lưu; None để tắt.
+            tolerance (float): Sai khác tối đa (theo kích thước bàn tay) để coi hai tư thế là một.
+            clock: Hàm trả về thời gian hiện tại (giây).
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (signature, value, thời điểm lưu)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def signature(hand):
+        """Chữ ký tư thế của HandFrame (đã lưu sẵn) hoặc mảng landmark (21, 3)."""
+        if isinstance(hand, HandFrame):
+            return hand.signature
+        return pose_signature(hand)
+
+    def _key(self, sig):
+        return np.round(sig / self.tolerance).astype(np.int32).tobytes()
+
+    def _expire(self, now):
+        if self.ttl is None:
+            return
+        expired = [k for k, (_, _, t) in self.entries.items() if now - t > self.ttl]
+        for k in expired:
+            del self.entries[k]
+            self.evictions += 1
+
+    def get(self, hand):
+        """Trả về kết quả đã lưu của tư thế gần giống hand, hoặc None."""
+        self._expire(self.clock())
+        sig = self.signature(hand)
+        key = self._key(sig)
+        if key not in self.entries:
+            # Tư thế nằm sát biên lượng tử hoá: so trực tiếp với các chữ ký đã lưu
+            key = next((k for k, (s, _, _) in self.entries.items()
+                        if np.abs(s - sig).max() <= self.tolerance), None)
+        if key is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return self.entries[key][1]
+
+    def put(self, hand, value):
+        sig = self.signature(hand)
+        key = self._key(sig)
+        self.entries[key] = (sig, value, self.clock())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
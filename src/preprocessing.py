@@ -0,0 +1,102 @@
+"""Tiền xử lý ảnh tay cho Classifier.
+
+Đường cũ: crop -> resize vào nền trắng IMAGE_SIZE x IMAGE_SIZE -> resize 224 ->
+transpose -> chia 255 (float64) -> ép float32, tức hai lần nội suy và nhiều mảng tạm.
+
+CropPreprocessor resize một lần từ vùng bbox trong frame camera thẳng vào nền
+trắng 224x224 cấp phát sẵn (cùng tỉ lệ và vị trí letterbox của đường cũ), rồi
+chuẩn hoá vào tensor float32 NCHW cấp phát sẵn.
+
+Kết quả không trùng từng pixel với đường cũ: bên trong vùng nội dung sai khác nhỏ
+(trung bình ~0.002, p99 ~0.008 trên thang [0, 1]), nhưng ở mép nội dung / nền trắng
+đường cũ nội suy lần hai trộn mép với nền trắng và biên được làm tròn trên lưới 300
+rồi 224, nên các pixel trong khoảng 2 px quanh mép lệch tới ~0.56 (~0.5% pixel lệch
+quá 0.05; python -m benchmarks.bench_preprocess).
+"""
+import cv2
+import numpy as np
+
+from src.config import IMAGE_SIZE
+
+CLASSIFIER_INPUT_SIZE = 224
+
+
+def image_to_tensor(image, size=CLASSIFIER_INPUT_SIZE):
+    """Ảnh BGR uint8 bất kỳ -> tensor float32 (1, 3, size, size) trong [0, 1] (đường cũ)."""
+    image = cv2.resize(image, (size, size))
+    image = np.transpose(image, (2, 0, 1)) / 255.0
+    return image[None, :, :, :].astype(np.float32)
+
+
+class CropPreprocessor:
+    def __init__(self, size=CLASSIFIER_INPUT_SIZE, canvas_size=IMAGE_SIZE, padding=20):
+        """
+        Args:
+            size (int): Kích thước đầu vào của Classifier.
+            canvas_size (int): Kích thước nền trắng của đường cũ, dùng để giữ nguyên hình học letterbox.
+            padding (int): Số pixel mở rộng quanh bbox.
+        """
+        self.size = size
+        self.canvas_size = canvas_size
+        self.padding = padding
+        self._scale = size / canvas_size
+        self._canvas = np.empty((size, size, 3), dtype=np.uint8)
+        self._tensor = np.empty((1, 3, size, size), dtype=np.float32)
+        self._inv255 = np.float32(255.0)
+
+    def crop_region(self, bbox, shape):
+        """Vùng crop (x1, y1, x2, y2) đã mở rộng padding và cắt theo biên ảnh, hoặc None."""
+        if bbox is None:
+            return None
+        x, y, w, h = bbox
+        if w <= 0 or h <= 0:
+            return None
+        h_img, w_img = shape[:2]
+        x1, y1 = max(0, x - self.padding), max(0, y - self.padding)
+        x2, y2 = min(w_img, x + w + self.padding), min(h_img, y + h + self.padding)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def letterbox(self, image, bbox, out=None):
+        """Crop + letterbox vào nền trắng size x size (uint8 BGR) bằng một lần nội suy.
+
+        Kết quả ghi vào bộ đệm dùng chung (hoặc out) và bị ghi đè ở lần gọi sau.
+        """
+        region = self.crop_region(bbox, image.shape)
+        if region is None:
+            return None
+        x1, y1, x2, y2 = region
+        crop = image[y1:y2, x1:x2]  # view, không sao chép
+        _, _, w, h = bbox
+
+        # Tỉ lệ / vị trí letterbox của đường cũ trên nền canvas_size, quy đổi thẳng
+        # sang kích thước size để chỉ nội suy một lần (mép nội dung có thể lệch một pixel)
+        c = self.canvas_size
+        if h / w > 1:
+            content_w, content_h = min(c / h * w, c), c
+        else:
+            content_w, content_h = c, min(c / w * h, c)
+        content_w = max(1, min(self.size, int(round(content_w * self._scale))))
+        content_h = max(1, min(self.size, int(round(content_h * self._scale))))
+        gap_x, gap_y = (self.size - content_w) // 2, (self.size - content_h) // 2
+
+        dst = self._canvas if out is None else out
+        dst.fill(255)
+        # Resize thẳng vào vùng nội dung của nền trắng (view, không cấp phát mảng mới)
+        cv2.resize(crop, (content_w, content_h),
+                   dst=dst[gap_y:gap_y + content_h, gap_x:gap_x + content_w],
+                   interpolation=cv2.INTER_LINEAR)
+        return dst
+
+    def __call__(self, image, bbox, out=None):
+        """Frame BGR + bbox -> tensor float32 (1, 3, size, size) trong [0, 1], hoặc None.
+
+        Tensor trả về là bộ đệm dùng chung (hoặc out) và bị ghi đè ở lần gọi sau.
+        """
+        canvas = self.letterbox(image, bbox)
+        if canvas is None:
+            return None
+        tensor = self._tensor if out is None else out
+        np.divide(canvas.transpose(2, 0, 1), self._inv255, out=tensor[0])
+        return tensor
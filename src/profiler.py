@@ -0,0 +1,135 @@
+"""Đo thời gian từng giai đoạn xử lý frame.
+
+StageProfiler ghi thời gian của các giai đoạn (detect, crop, classify, tone, ...)
+theo frame id, giữ cửa sổ trượt để tính percentile / histogram và có thể xuất
+trace-event JSON để mở bằng chrome://tracing hoặc Perfetto.
+
+Khi tắt (enabled=False), stage() trả về một context manager rỗng dùng chung nên
+chi phí chỉ là một lần gọi hàm.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class StageProfiler:
+    def __init__(self, enabled=False, window=300, trace=False, max_trace_events=200000):
+        """
+        Args:
+            enabled (bool): Bật đo thời gian.
+            window (int): Số mẫu gần nhất giữ lại cho mỗi giai đoạn.
+            trace (bool): Ghi lại sự kiện để xuất trace-event JSON.
+            max_trace_events (int): Giới hạn số sự kiện trace giữ trong bộ nhớ.
+        """
+        self.enabled = enabled
+        self.window = window
+        self.trace = trace
+        self.frame_id = 0
+        self.samples = {}
+        self.trace_events = deque(maxlen=max_trace_events)
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def begin_frame(self):
+        """Tăng frame id; gọi một lần ở đầu mỗi frame."""
+        self.frame_id += 1
+        return self.frame_id
+
+    def stage(self, name):
+        """Context manager đo một giai đoạn: `with profiler.stage('detect'): ...`"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, start, end):
+        duration = end - start
+        with self._lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(duration)
+            if self.trace:
+                self.trace_events.append({
+                    'name': name,
+                    'ph': 'X',
+                    'ts': (start - self._origin) * 1e6,
+                    'dur': duration * 1e6,
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                    'args': {'frame': self.frame_id}
+                })
+
+    def summary(self):
+        """Trả về {giai đoạn: {'count', 'last_ms', 'mean_ms', 'p50_ms', 'p95_ms'}} trên cửa sổ trượt."""
+        with self._lock:
+            snapshot = {name: np.array(s) for name, s in self.samples.items() if s}
+        result = {}
+        for name, arr in snapshot.items():
+            ms = arr * 1000.0
+            result[name] = {
+                'count': int(ms.size),
+                'last_ms': float(ms[-1]),
+                'mean_ms': float(ms.mean()),
+                'p50_ms': float(np.percentile(ms, 50)),
+                'p95_ms': float(np.percentile(ms, 95))
+            }
+        return result
+
+    def histogram(self, name, bins=10, max_ms=None):
+        """Histogram (counts, edges_ms) của giai đoạn trên cửa sổ trượt."""
+        with self._lock:
+            samples = self.samples.get(name)
+            arr = np.array(samples) * 1000.0 if samples else np.zeros(0)
+        if arr.size == 0:
+            return np.zeros(bins, dtype=int), np.zeros(bins + 1)
+        upper = max_ms if max_ms is not None else max(float(arr.max()), 1e-3)
+        return np.histogram(arr, bins=bins, range=(0.0, upper))
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.trace_events.clear()
+        self.frame_id = 0
+
+    def export_trace(self, path):
+        """Ghi các sự kiện đã thu thập ra file trace-event JSON."""
+        with self._lock:
+            events = list(self.trace_events)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        print(f"[INFO] Đã xuất {len(events)} sự kiện trace vào: {path}")
+        return path
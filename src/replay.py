@@ -0,0 +1,199 @@
+"""Phát lại landmark đã ghi thay cho bộ phát hiện tay MediaPipe.
+
+ReplayDetector có cùng giao diện findHands() với handDetector nên có thể thay
+thế trực tiếp trong FrameProcessor để chạy benchmark / kiểm thử trên máy không
+có camera. VirtualClock thay đồng hồ của FrameProcessor bằng timestamp đã ghi
+của từng frame, nên phát lại nhanh hết mức CPU cho phép vẫn giữ nguyên mọi
+cooldown / cửa sổ thời gian như lúc chạy thật. Log lưu kèm frame_shape của camera lúc
+ghi: HandFrame phát lại dùng đúng tỉ lệ rộng / cao đó nên đặc trưng MLP landmark giống hệt.
+
+Ví dụ:
+    python -m src.replay session.vslr              # nhanh nhất có thể, thời gian ảo
+    python -m src.replay session.vslr --realtime   # giữ nhịp thật, đồng hồ thật
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.hand_frame import HandFrame
+
+# Log cũ không lưu frame_shape: coi như frame camera mặc định của app (640x480)
+DEFAULT_FRAME_SHAPE = (480, 640, 3)
+
+
+def save_landmark_log(path, landmarks, present, timestamps=None, frame_shape=None):
+    """Lưu log landmark ra file .npz.
+
+    Args:
+        landmarks: mảng (N, 21, 3) toạ độ chuẩn hoá của MediaPipe.
+        present: mảng bool (N,) - frame có tay hay không.
+        timestamps: mảng (N,) thời điểm (giây) của từng frame, tuỳ chọn.
+        frame_shape: shape (h, w, c) của frame lúc ghi, tuỳ chọn.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    present = np.asarray(present, dtype=bool)
+    if timestamps is None:
+        timestamps = np.arange(len(present), dtype=np.float64) / 30.0
+    arrays = {}
+    if frame_shape is not None:
+        arrays['frame_shape'] = np.asarray(frame_shape, dtype=np.int64)
+    np.savez_compressed(path, landmarks=landmarks, present=present,
+                        timestamps=np.asarray(timestamps, dtype=np.float64), **arrays)
+
+
+def is_landmark_log(path):
+    """Nguồn là log landmark: .npz (save_landmark_log) hoặc log phiên .vslr (src.session_log)."""
+    return str(path).endswith(('.npz', '.vslr'))
+
+
+def load_landmark_log(path):
+    """Đọc log landmark (.npz hoặc .vslr), trả về (landmarks, present, timestamps, frame_shape).
+
+    frame_shape là shape (h, w, c) của frame lúc ghi; log không lưu thì dùng DEFAULT_FRAME_SHAPE.
+    """
+    if str(path).endswith('.vslr'):
+        from src.session_log import SessionLog
+
+        with SessionLog(path) as log:
+            landmarks, present, timestamps = log.to_arrays()
+            frame_shape = log.frame_shape
+    else:
+        data = np.load(path)
+        landmarks = data['landmarks'].astype(np.float32)
+        present = data['present'].astype(bool)
+        if 'timestamps' in data:
+            timestamps = data['timestamps'].astype(np.float64)
+        else:
+            timestamps = np.arange(len(present), dtype=np.float64) / 30.0
+        frame_shape = tuple(int(v) for v in data['frame_shape']) if 'frame_shape' in data else None
+    if frame_shape is None:
+        print(f"[WARNING] {path} không lưu kích thước frame, coi là "
+              f"{DEFAULT_FRAME_SHAPE[1]}x{DEFAULT_FRAME_SHAPE[0]}")
+        frame_shape = DEFAULT_FRAME_SHAPE
+    return landmarks, present, timestamps, frame_shape
+
+
+def synthetic_landmark_log(num_frames=300, seed=0):
+    """Sinh chuỗi landmark giả lập (bàn tay trôi chậm, có đoạn giữ yên và đoạn mất tay)."""
+    rng = np.random.default_rng(seed)
+    base = np.stack([
+        0.5 + 0.08 * np.cos(np.linspace(0, 2 * np.pi, 21, endpoint=False)),
+        0.5 + 0.12 * np.sin(np.linspace(0, 2 * np.pi, 21, endpoint=False)),
+        np.zeros(21)
+    ], axis=1).astype(np.float32)
+    drift = np.cumsum(rng.normal(0, 0.004, size=(num_frames, 1, 3)), axis=0).astype(np.float32)
+    drift[..., 2] = 0
+    jitter = rng.normal(0, 0.002, size=(num_frames, 21, 3)).astype(np.float32)
+    landmarks = np.clip(base[None] + drift + jitter, 0.0, 1.0)
+    present = np.ones(num_frames, dtype=bool)
+    # Cứ mỗi 100 frame có 10 frame không thấy tay
+    present[(np.arange(num_frames) % 100) >= 90] = False
+    timestamps = np.arange(num_frames, dtype=np.float64) / 30.0
+    return landmarks, present, timestamps
+
+
+class VirtualClock:
+    """Đồng hồ ảo cho FrameProcessor(clock=...): trả về thời điểm được đặt bằng set()."""
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def set(self, timestamp):
+        self.now = float(timestamp)
+
+    def __call__(self):
+        return self.now
+
+
+class ReplayDetector:
+    """Thay thế handDetector: mỗi lần gọi findHands() trả về landmark của frame kế tiếp.
+
+    Với frame_shape (shape frame lúc ghi), HandFrame luôn được chuẩn hoá theo shape này thay vì
+    frame đưa vào findHands, nên nên phát lại trên frame cùng kích thước (bbox theo pixel khớp).
+    """
+
+    def __init__(self, landmarks, present, loop=True, frame_shape=None):
+        self.landmarks = np.asarray(landmarks, dtype=np.float32)
+        self.present = np.asarray(present, dtype=bool)
+        self.loop = loop
+        self.frame_shape = tuple(frame_shape) if frame_shape is not None else None
+        self.index = 0
+
+    @classmethod
+    def from_file(cls, path, loop=True):
+        landmarks, present, _, frame_shape = load_landmark_log(path)
+        return cls(landmarks, present, loop=loop, frame_shape=frame_shape)
+
+    def __len__(self):
+        return len(self.present)
+
+    def reset(self):
+        self.index = 0
+
+    def findHands(self, img, draw=True):
+        if self.index >= len(self.present):
+            if not self.loop:
+                return [], img
+            self.index = 0
+        i = self.index
+        self.index += 1
+        if not self.present[i]:
+            return [], img
+
+        return [HandFrame(self.landmarks[i], self.frame_shape or img.shape)], img
+
+
+def replay_session(frame_processor, present, timestamps, clock=None, frame_shape=DEFAULT_FRAME_SHAPE):
+    """Chạy FrameProcessor (detector là ReplayDetector) qua toàn bộ log, trả về (transcript, giây).
+
+    Với clock là VirtualClock, mỗi frame đặt đồng hồ về timestamp đã ghi rồi xử lý ngay;
+    clock None thì ngủ tới đúng nhịp đã ghi (đồng hồ thật, như lúc chạy trực tiếp).
+    """
+    frame = np.zeros(frame_shape, dtype=np.uint8)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    start = time.perf_counter()
+    for i in range(len(present)):
+        if clock is not None:
+            clock.set(timestamps[i])
+        else:
+            time.sleep(max(0.0, start + timestamps[i] - timestamps[0] - time.perf_counter()))
+        frame_processor.process_frame(frame)
+    elapsed = time.perf_counter() - start
+    text_processor = frame_processor.text_processor
+    text_processor.finalize_word()
+    return text_processor.get_full_text().strip(), elapsed
+
+
+def main():
+    from src.batch_transcribe import build_frame_processor
+    from src.startup import load_classifier, load_tone_predictor
+
+    parser = argparse.ArgumentParser(description="Phát lại log landmark (.npz / .vslr) qua FrameProcessor")
+    parser.add_argument("path", help="Log landmark .npz hoặc log phiên .vslr")
+    parser.add_argument("--realtime", action="store_true", help="Giữ nhịp đã ghi và dùng đồng hồ thật")
+    parser.add_argument("--width", type=int, help="Ghi đè kích thước frame lúc ghi (mặc định: lấy từ log)")
+    parser.add_argument("--height", type=int)
+    args = parser.parse_args()
+
+    landmarks, present, timestamps, frame_shape = load_landmark_log(args.path)
+    if args.width and args.height:
+        frame_shape = (args.height, args.width, 3)
+    if not len(present):
+        print(f"[ERROR] {args.path} không có frame nào")
+        return
+    clock = None if args.realtime else VirtualClock(timestamps[0])
+    frame_processor = build_frame_processor(load_classifier(), load_tone_predictor(),
+                                            ReplayDetector(landmarks, present, loop=False, frame_shape=frame_shape),
+                                            clock=clock)
+    # Landmark đã ghi là kết quả sau bước dùng lại landmark; frame trống không mang thông tin
+    frame_processor.frame_gate = None
+    transcript, elapsed = replay_session(frame_processor, present, timestamps, clock, frame_shape)
+    duration = float(timestamps[-1] - timestamps[0])
+    print(f"[INFO] {len(present)} frame, {duration:.1f}s đã ghi, phát lại trong {elapsed:.2f}s "
+          f"({duration / max(elapsed, 1e-9):.1f}x thời gian thực)")
+    print(transcript)
+
+
+if __name__ == "__main__":
+    main()
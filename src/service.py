@@ -0,0 +1,442 @@
+"""Dịch vụ suy luận cục bộ nhiều phiên, không giao diện (asyncio, TCP).
+
+Mỗi client mở một phiên và gửi luồng frame (JPEG / BGR thô) hoặc luồng landmark.
+Mỗi phiên có FrameProcessor / TextProcessor / StabilityDetector riêng; Classifier
+và TonePredictor được tải một lần và dùng chung cho mọi phiên. Frame của một phiên
+được xử lý tuần tự theo thứ tự gửi, các phiên chạy song song trên thread pool. Lời
+gọi mô hình của các phiên chạy cùng lúc được gom thành batch (src.batching).
+
+Giao thức: mỗi thông điệp là header 8 byte (độ dài JSON, độ dài payload, big-endian)
++ JSON + payload nhị phân.
+    client -> server
+        {"type": "hello", "mode": "landmarks" | "frames", "width": 640, "height": 480}
+        {"type": "landmarks", "ts": ..., "present": true}   payload: 21x3 float32
+        {"type": "frame", "ts": ..., "encoding": "jpeg"}     payload: ảnh JPEG
+        {"type": "frame", "ts": ..., "encoding": "raw", "shape": [h, w, 3]}   payload: BGR uint8
+        {"type": "stats"} / {"type": "close"}
+    server -> client
+        {"type": "session", "id": ...} / {"type": "error", "message": ...}
+        {"type": "result", "seq": ..., "ts": ..., "text": ..., "word": ..., "status": ..., "dropped": ...}
+
+Phiên "landmarks" không có ảnh nên ký tự chỉ được nhận bằng đường nhanh MLP landmark
+(cần LANDMARK_MODEL_PATH). Phiên "frames" tạo handDetector (MediaPipe) riêng vì trạng
+thái tracking của MediaPipe gắn với từng luồng video.
+
+Backpressure mỗi phiên: hàng đợi tối đa queue_size frame; 'drop' bỏ frame cũ nhất
+(client thời gian thực chỉ cần frame mới), 'block' ngừng đọc socket tới khi có chỗ
+(TCP tự làm chậm client). Phiên không gửi gì trong session_timeout giây bị đóng.
+
+Ví dụ:
+    python -m src.service --port 8765 --workers 4
+    python -m src.service_client --sessions 1,4,16 --duration 10
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.config import SERVICE_HOST, SERVICE_PORT, SERVICE_MAX_SESSIONS, SERVICE_QUEUE_SIZE
+from src.config import SERVICE_BACKPRESSURE, SERVICE_SESSION_TIMEOUT
+from src.config import CLASSIFIER_BATCH_SIZE, CLASSIFIER_BATCH_WAIT_MS, TONE_BATCH_SIZE, TONE_BATCH_WAIT_MS
+
+HEADER = struct.Struct('>II')
+MAX_HEADER_BYTES = 64 * 1024
+MAX_PAYLOAD_BYTES = 16 * 1024 * 1024
+SESSION_MODES = ('landmarks', 'frames')
+BACKPRESSURE_MODES = ('drop', 'block')
+LANDMARK_BYTES = 21 * 3 * 4
+
+
+def encode_message(header, payload=b''):
+    data = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    return HEADER.pack(len(data), len(payload)) + data + payload
+
+
+async def read_message(reader):
+    """Đọc một thông điệp, trả về (header dict, payload bytes). Ném IncompleteReadError khi hết luồng."""
+    header_len, payload_len = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if header_len > MAX_HEADER_BYTES or payload_len > MAX_PAYLOAD_BYTES:
+        raise ValueError(f"Thông điệp quá lớn ({header_len} + {payload_len} byte)")
+    header = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b''
+    return header, payload
+
+
+class LockedModel:
+    """Bọc mô hình dùng chung để predict() chạy tuần tự giữa các thread.
+
+    Dùng cho TonePredictor: TFLite Interpreter không an toàn khi gọi đồng thời, và
+    dấu thanh chỉ được dự đoán một lần mỗi cử chỉ nên khoá gần như không tốn gì.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+
+    def predict(self, *args, **kwargs):
+        with self.lock:
+            return self.model.predict(*args, **kwargs)
+
+    def start_stream(self):
+        """ToneStream của mô hình, không cần khoá: stream chỉ có ở backend 'numpy' (NumpyLSTM
+        chỉ đọc trọng số, trạng thái (h, c) nằm trong từng stream) và không ghi vào mô hình dùng chung."""
+        start_stream = getattr(self.model, 'start_stream', None)
+        return start_stream() if start_stream is not None else None
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class LandmarkFeed:
+    """Thay handDetector cho phiên landmark: findHands() trả về bàn tay client vừa gửi."""
+
+    def __init__(self):
+        self.hands = []
+
+    def findHands(self, img, draw=True):
+        return self.hands, img
+
+
+class Session:
+    def __init__(self, session_id, mode, frame_processor, width, height, queue_size, backpressure):
+        self.id = session_id
+        self.mode = mode
+        self.frame_processor = frame_processor
+        self.shape = (height, width, 3)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.backpressure = backpressure
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.busy_time = 0.0
+        self.started = time.monotonic()
+        self._blank = np.empty((0, 0, 3), dtype=np.uint8)
+
+    async def submit(self, item):
+        """Đưa frame vào hàng đợi theo chính sách backpressure."""
+        self.received += 1
+        if self.backpressure == 'block':
+            await self.queue.put(item)
+            return
+        while self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+    def decode(self, header, payload):
+        """Frame BGR cho FrameProcessor (phiên landmark: ảnh rỗng, bàn tay đặt vào LandmarkFeed)."""
+        if self.mode == 'landmarks':
+            from src.hand_frame import HandFrame
+
+            hands = []
+            if header.get('present', True) and len(payload) == LANDMARK_BYTES:
+                hands = [HandFrame(np.frombuffer(payload, dtype=np.float32).reshape(21, 3), self.shape)]
+            self.frame_processor.detector.hands = hands
+            return self._blank
+        import cv2
+
+        if header.get('encoding', 'jpeg') == 'raw':
+            # bytearray: mảng ghi được (vẽ landmark / cổng frame gọi hàm vẽ của cv2 lên frame);
+            # np.frombuffer trên bytes cho mảng chỉ đọc và cv2 sẽ báo lỗi
+            return np.frombuffer(bytearray(payload), dtype=np.uint8).reshape(header['shape'])
+        frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Không giải mã được ảnh")
+        return frame
+
+    def process(self, header, payload):
+        """Chạy trên thread pool: giải mã + process_frame, trả về thông điệp kết quả."""
+        start = time.perf_counter()
+        frame = self.decode(header, payload)
+        fp = self.frame_processor
+        fp.process_frame(frame)
+        self.busy_time += time.perf_counter() - start
+        self.processed += 1
+        text = fp.text_processor
+        return {
+            'type': 'result',
+            'seq': header.get('seq'),
+            'ts': header.get('ts'),
+            'text': text.get_display_text() or "",
+            'word': text.current_word,
+            'status': "tone" if fp.tone_collection else "char",
+            'dropped': self.dropped,
+            'queue': self.queue.qsize(),
+        }
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            'mode': self.mode,
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'fps': self.processed / elapsed if elapsed > 0 else 0.0,
+            'busy_ms': self.busy_time / self.processed * 1000 if self.processed else 0.0,
+        }
+
+
+class InferenceService:
+    def __init__(self, classifier, tone_predictor, max_sessions=SERVICE_MAX_SESSIONS,
+                 queue_size=SERVICE_QUEUE_SIZE, backpressure=SERVICE_BACKPRESSURE,
+                 session_timeout=SERVICE_SESSION_TIMEOUT, workers=None,
+                 batch_size=CLASSIFIER_BATCH_SIZE, batch_wait_ms=CLASSIFIER_BATCH_WAIT_MS,
+                 tone_batch_size=TONE_BATCH_SIZE, tone_batch_wait_ms=TONE_BATCH_WAIT_MS):
+        """
+        Args:
+            classifier: Classifier / CascadeClassifier dùng chung.
+            tone_predictor: TonePredictor dùng chung (gom batch, hoặc bọc LockedModel khi tắt batch).
+            max_sessions (int): Số phiên đồng thời tối đa, vượt quá thì từ chối.
+            queue_size (int): Số frame chờ tối đa mỗi phiên.
+            backpressure (str): 'drop' hoặc 'block'.
+            session_timeout (float): Giây không nhận được thông điệp thì đóng phiên.
+            workers (int): Số thread xử lý frame (mặc định: số CPU).
+            batch_size (int): Số ảnh crop tối đa mỗi batch ResNet, 1 để tắt gom batch.
+            batch_wait_ms (float): Thời gian tối đa một ảnh crop chờ gom batch.
+            tone_batch_size (int): Số chuỗi tối đa mỗi batch LSTM, 1 để tắt gom batch.
+            tone_batch_wait_ms (float): Thời gian tối đa một chuỗi chờ gom batch.
+        """
+        if backpressure not in BACKPRESSURE_MODES:
+            raise ValueError(f"backpressure không hợp lệ: {backpressure} (hỗ trợ: {', '.join(BACKPRESSURE_MODES)})")
+        from src.batching import BatchedClassifier, BatchedTonePredictor
+
+        self.batched = []
+        if batch_size > 1 and classifier is not None:
+            classifier = BatchedClassifier(classifier, batch_size, batch_wait_ms)
+            self.batched.append(classifier)
+        if tone_predictor is not None:
+            if tone_batch_size > 1:
+                tone_predictor = BatchedTonePredictor(tone_predictor, tone_batch_size, tone_batch_wait_ms)
+                self.batched.append(tone_predictor)
+            else:
+                tone_predictor = LockedModel(tone_predictor)
+        self.classifier = classifier
+        self.tone_predictor = tone_predictor
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.backpressure = backpressure
+        self.session_timeout = session_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                           thread_name_prefix='session-worker')
+        self.sessions = {}
+        self.opening = 0
+        self.closed_sessions = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self._ids = itertools.count(1)
+        self.server = None
+
+    def create_frame_processor(self, mode):
+        from src.frame_processor import FrameProcessor
+        from src.model import StabilityDetector
+        from src.text_processor import TextProcessor
+
+        if mode == 'frames':
+            from src.hand_tracking import handDetector
+            detector = handDetector(maxHands=1)
+        else:
+            detector = LandmarkFeed()
+        frame_processor = FrameProcessor(
+            detector=detector,
+            classifier=self.classifier,
+            tone_predictor=self.tone_predictor,
+            stability_detector=StabilityDetector(max_frames=12, stability_threshold=0.025),
+            text_processor=TextProcessor()
+        )
+        if mode == 'landmarks':
+            # Không có ảnh để so sánh: tắt cổng dùng lại landmark
+            frame_processor.frame_gate = None
+        return frame_processor
+
+    async def open_session(self, hello):
+        mode = hello.get('mode', 'landmarks')
+        if mode not in SESSION_MODES:
+            raise ValueError(f"mode không hợp lệ: {mode} (hỗ trợ: {', '.join(SESSION_MODES)})")
+        if len(self.sessions) + self.opening >= self.max_sessions:
+            self.rejected += 1
+            raise ValueError(f"Đã đủ {self.max_sessions} phiên")
+        loop = asyncio.get_running_loop()
+        # Giữ chỗ trước khi chờ để các phiên mở đồng thời không vượt max_sessions
+        self.opening += 1
+        try:
+            # Tạo handDetector (MediaPipe) tốn vài trăm ms: chạy ngoài event loop
+            frame_processor = await loop.run_in_executor(self.executor, self.create_frame_processor, mode)
+        except ImportError as e:
+            raise ValueError(f"Không tạo được phiên {mode}: {e}")
+        finally:
+            self.opening -= 1
+        session = Session(next(self._ids), mode, frame_processor, int(hello.get('width', 640)),
+                          int(hello.get('height', 480)), self.queue_size, self.backpressure)
+        self.sessions[session.id] = session
+        return session
+
+    async def run_session(self, session, writer):
+        """Lấy frame từ hàng đợi của phiên, xử lý tuần tự trên thread pool và gửi kết quả."""
+        loop = asyncio.get_running_loop()
+        while True:
+            header, payload = await session.queue.get()
+            try:
+                result = await loop.run_in_executor(self.executor, session.process, header, payload)
+            except Exception as e:
+                result = {'type': 'error', 'seq': header.get('seq'), 'message': str(e)}
+            finally:
+                session.queue.task_done()
+            writer.write(encode_message(result))
+            await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        session = worker = None
+        reason = "client đóng"
+        try:
+            hello, _ = await asyncio.wait_for(read_message(reader), self.session_timeout)
+            if hello.get('type') != 'hello':
+                raise ValueError("Thông điệp đầu tiên phải là hello")
+            session = await self.open_session(hello)
+            writer.write(encode_message({'type': 'session', 'id': session.id, 'mode': session.mode,
+                                         'queue_size': self.queue_size, 'backpressure': self.backpressure}))
+            await writer.drain()
+            print(f"[INFO] Phiên {session.id} ({session.mode}) mở từ {peer}, {len(self.sessions)} phiên")
+            worker = asyncio.create_task(self.run_session(session, writer))
+            while True:
+                try:
+                    header, payload = await asyncio.wait_for(read_message(reader), self.session_timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    reason = f"quá {self.session_timeout:.0f}s không nhận được dữ liệu"
+                    break
+                kind = header.get('type')
+                if kind in ('landmarks', 'frame'):
+                    await session.submit((header, payload))
+                elif kind == 'stats':
+                    writer.write(encode_message({'type': 'stats', 'session': session.stats(), 'service': self.stats()}))
+                    await writer.drain()
+                elif kind == 'close':
+                    break
+                if worker.done():
+                    # Lỗi khi gửi kết quả (client mất kết nối)
+                    worker.result()
+        except asyncio.IncompleteReadError:
+            reason = "mất kết nối"
+        except asyncio.TimeoutError:
+            reason = "không nhận được hello"
+        except (ValueError, KeyError, ConnectionError) as e:
+            reason = str(e)
+            if not writer.is_closing():
+                writer.write(encode_message({'type': 'error', 'message': reason}))
+        finally:
+            if worker is not None:
+                if reason == "client đóng" and not worker.done():
+                    # Xử lý nốt các frame đã nhận trước khi đóng
+                    try:
+                        await asyncio.wait_for(session.queue.join(), self.session_timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                worker.cancel()
+                await asyncio.gather(worker, return_exceptions=True)
+            if session is not None:
+                self.sessions.pop(session.id, None)
+                self.closed_sessions += 1
+                stats = session.stats()
+                print(f"[INFO] Phiên {session.id} đóng ({reason}): {stats['processed']} frame, "
+                      f"bỏ {stats['dropped']}, {stats['busy_ms']:.1f} ms/frame")
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def stats(self):
+        sessions = [s.stats() for s in self.sessions.values()]
+        return {
+            'sessions': len(sessions),
+            'closed': self.closed_sessions,
+            'timeouts': self.timeouts,
+            'rejected': self.rejected,
+            'fps': sum(s['fps'] for s in sessions),
+            'queued': sum(s.queue.qsize() for s in self.sessions.values()),
+            'dropped': sum(s['dropped'] for s in sessions),
+            'batching': {model.batcher.name: model.batcher.stats() for model in self.batched},
+        }
+
+    async def log_stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            if self.sessions:
+                stats = self.stats()
+                print(f"[INFO] {stats['sessions']} phiên, {stats['fps']:.1f} frame/s, "
+                      f"{stats['queued']} frame chờ, đã bỏ {stats['dropped']}")
+                for name, batching in stats['batching'].items():
+                    if batching['batches']:
+                        print(f"[INFO]     {name}: {batching['batches']} batch, trung bình {batching['mean_batch']:.1f} "
+                              f"({batching['fill_rate']:.0%} đầy), chờ {batching['mean_wait_ms']:.1f} ms, "
+                              f"hàng đợi {batching['queue_depth']} (tối đa {batching['max_queue_depth']})")
+
+    async def serve(self, host=SERVICE_HOST, port=SERVICE_PORT, stats_interval=10.0):
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in self.server.sockets)
+        print(f"[INFO] Dịch vụ suy luận đang nghe tại {addresses}")
+        logger = asyncio.create_task(self.log_stats(stats_interval)) if stats_interval else None
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            if logger is not None:
+                logger.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            for model in self.batched:
+                model.close(timeout=1.0)
+
+
+def load_shared_models(threads=None):
+    """Tải Classifier (+ cascade landmark) và TonePredictor một lần cho mọi phiên."""
+    from src.startup import import_heavy_modules, load_classifier, load_tone_predictor
+
+    import_heavy_modules()
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return load_classifier(), load_tone_predictor()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dịch vụ suy luận nhiều phiên dùng chung mô hình")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--max-sessions", type=int, default=SERVICE_MAX_SESSIONS)
+    parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE)
+    parser.add_argument("--backpressure", choices=BACKPRESSURE_MODES, default=SERVICE_BACKPRESSURE)
+    parser.add_argument("--timeout", type=float, default=SERVICE_SESSION_TIMEOUT, help="Giây chờ tối đa giữa hai thông điệp")
+    parser.add_argument("--workers", type=int, default=None, help="Số thread xử lý frame (mặc định: số CPU)")
+    parser.add_argument("--threads", type=int, default=None, help="Số thread PyTorch")
+    parser.add_argument("--batch-size", type=int, default=CLASSIFIER_BATCH_SIZE,
+                        help="Số ảnh crop tối đa mỗi batch ResNet (1: tắt gom batch)")
+    parser.add_argument("--batch-wait-ms", type=float, default=CLASSIFIER_BATCH_WAIT_MS)
+    parser.add_argument("--tone-batch-size", type=int, default=TONE_BATCH_SIZE,
+                        help="Số chuỗi tối đa mỗi batch LSTM (1: tắt gom batch)")
+    parser.add_argument("--tone-batch-wait-ms", type=float, default=TONE_BATCH_WAIT_MS)
+    parser.add_argument("--stats-interval", type=float, default=10.0)
+    args = parser.parse_args()
+
+    classifier, tone_predictor = load_shared_models(args.threads)
+    service = InferenceService(classifier, tone_predictor, max_sessions=args.max_sessions,
+                               queue_size=args.queue_size, backpressure=args.backpressure,
+                               session_timeout=args.timeout, workers=args.workers,
+                               batch_size=args.batch_size, batch_wait_ms=args.batch_wait_ms,
+                               tone_batch_size=args.tone_batch_size, tone_batch_wait_ms=args.tone_batch_wait_ms)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.stats_interval))
+    except KeyboardInterrupt:
+        print("[INFO] Dừng dịch vụ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Client tạo tải cho src.service: mở N phiên đồng thời, gửi landmark / frame với FPS cố định.
+
+Mỗi phiên gửi theo nhịp --fps và đọc kết quả song song. Độ trễ tính từ lúc gửi tới
+lúc nhận kết quả của đúng frame đó (server trả lại ts); frame bị server bỏ do
+backpressure được đếm qua số kết quả không nhận được. Với danh sách số phiên
+(--sessions 1,4,16) mỗi mức được chạy lần lượt để xem dịch vụ mở rộng tới đâu.
+
+Ví dụ:
+    python -m src.service_client --sessions 1,4,16,64 --fps 30 --duration 10
+    python -m src.service_client --mode frames --video hand.mp4 --sessions 4
+    python -m src.service_client --mode frames --encoding raw --sessions 4
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from src.config import SERVICE_HOST, SERVICE_PORT
+from src.replay import DEFAULT_FRAME_SHAPE, load_landmark_log, synthetic_landmark_log
+from src.service import encode_message, read_message
+
+
+def load_payloads(mode, landmarks_path=None, video_path=None, num_frames=300, quality=80, encoding='jpeg'):
+    """Danh sách (header, payload) để gửi vòng lặp, và (width, height) của nguồn.
+
+    Với mode 'landmarks', (width, height) lấy từ frame_shape của log (log giả lập: 640x480).
+    Với mode 'frames', encoding 'jpeg' nén từng frame, 'raw' gửi nguyên BGR uint8 kèm shape.
+    """
+    if mode == 'landmarks':
+        if landmarks_path:
+            landmarks, present, _, frame_shape = load_landmark_log(landmarks_path)
+        else:
+            landmarks, present, _ = synthetic_landmark_log(num_frames)
+            frame_shape = DEFAULT_FRAME_SHAPE
+        items = [({'type': 'landmarks', 'present': bool(p)}, pts.astype(np.float32).tobytes() if p else b'')
+                 for pts, p in zip(landmarks, present)]
+        return items, (frame_shape[1], frame_shape[0])
+
+    import cv2
+
+    cap = cv2.VideoCapture(video_path) if video_path else None
+    items = []
+    size = (640, 480)
+    rng = np.random.default_rng(0)
+    while len(items) < num_frames:
+        if cap is not None:
+            ok, frame = cap.read()
+            if not ok:
+                break
+        else:
+            frame = rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+        size = (frame.shape[1], frame.shape[0])
+        if encoding == 'raw':
+            items.append(({'type': 'frame', 'encoding': 'raw', 'shape': list(frame.shape)},
+                          np.ascontiguousarray(frame).tobytes()))
+            continue
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        items.append(({'type': 'frame', 'encoding': 'jpeg'}, jpeg.tobytes()))
+    if cap is not None:
+        cap.release()
+    return items, size
+
+
+async def run_client(host, port, mode, items, size, fps, duration):
+    """Một phiên: gửi items theo nhịp fps trong duration giây, trả về thống kê."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode_message({'type': 'hello', 'mode': mode, 'width': size[0], 'height': size[1]}))
+    await writer.drain()
+    reply, _ = await read_message(reader)
+    if reply.get('type') != 'session':
+        writer.close()
+        return {'error': reply.get('message', str(reply))}
+
+    sent_at = {}
+    latencies = []
+    errors = 0
+
+    async def receive():
+        nonlocal errors
+        while True:
+            try:
+                message, _ = await read_message(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            if message.get('type') == 'result':
+                t = sent_at.pop(message.get('seq'), None)
+                if t is not None:
+                    latencies.append(time.perf_counter() - t)
+            elif message.get('type') == 'error':
+                errors += 1
+
+    receiver = asyncio.create_task(receive())
+    interval = 1.0 / fps if fps > 0 else 0.0
+    start = time.perf_counter()
+    seq = 0
+    while time.perf_counter() - start < duration:
+        header, payload = items[seq % len(items)]
+        sent_at[seq] = time.perf_counter()
+        writer.write(encode_message({**header, 'seq': seq, 'ts': sent_at[seq]}, payload))
+        await writer.drain()
+        seq += 1
+        next_time = start + seq * interval
+        await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+    writer.write(encode_message({'type': 'close'}))
+    await writer.drain()
+    try:
+        await asyncio.wait_for(receiver, timeout=10.0)
+    except asyncio.TimeoutError:
+        receiver.cancel()
+    writer.close()
+    return {'sent': seq, 'received': len(latencies), 'latencies': latencies, 'errors': errors,
+            'elapsed': time.perf_counter() - start}
+
+
+async def run_level(host, port, mode, items, size, sessions, fps, duration):
+    results = await asyncio.gather(*(run_client(host, port, mode, items, size, fps, duration)
+                                     for _ in range(sessions)), return_exceptions=True)
+    failed = [r for r in results if isinstance(r, BaseException) or 'error' in r]
+    ok = [r for r in results if not isinstance(r, BaseException) and 'error' not in r]
+    for r in failed[:3]:
+        print(f"[WARNING] Phiên lỗi: {r if isinstance(r, BaseException) else r['error']}")
+    sent = sum(r['sent'] for r in ok)
+    received = sum(r['received'] for r in ok)
+    elapsed = max((r['elapsed'] for r in ok), default=0.0)
+    lat_ms = np.array([l for r in ok for l in r['latencies']]) * 1000.0
+    return {
+        'sessions': sessions,
+        'failed': len(failed),
+        'sent_fps': sent / elapsed if elapsed else 0.0,
+        'done_fps': received / elapsed if elapsed else 0.0,
+        'drop_rate': 1.0 - received / sent if sent else 0.0,
+        'p50_ms': float(np.percentile(lat_ms, 50)) if lat_ms.size else float('nan'),
+        'p95_ms': float(np.percentile(lat_ms, 95)) if lat_ms.size else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo tải cho dịch vụ suy luận nhiều phiên")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--mode", choices=('landmarks', 'frames'), default='landmarks')
+    parser.add_argument("--sessions", default="1,4,16", help="Số phiên đồng thời, nhiều mức cách nhau dấu phẩy")
+    parser.add_argument("--fps", type=float, default=30.0, help="FPS gửi của mỗi phiên")
+    parser.add_argument("--duration", type=float, default=10.0, help="Số giây chạy mỗi mức")
+    parser.add_argument("--landmarks", help="Log landmark .npz (mặc định: sinh giả lập)")
+    parser.add_argument("--video", help="Video nguồn cho mode frames (mặc định: ảnh nhiễu)")
+    parser.add_argument("--encoding", choices=('jpeg', 'raw'), default='jpeg',
+                        help="Cách gửi frame của mode frames: JPEG hoặc BGR thô")
+    args = parser.parse_args()
+
+    items, size = load_payloads(args.mode, args.landmarks, args.video, encoding=args.encoding)
+    levels = [int(n) for n in args.sessions.split(',') if n.strip()]
+    print(f"{'phiên':>6}{'lỗi':>6}{'gửi f/s':>10}{'xong f/s':>10}{'bỏ':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for sessions in levels:
+        r = asyncio.run(run_level(args.host, args.port, args.mode, items, size, sessions, args.fps, args.duration))
+        print(f"{r['sessions']:>6}{r['failed']:>6}{r['sent_fps']:>10.1f}{r['done_fps']:>10.1f}"
+              f"{r['drop_rate']:>8.1%}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
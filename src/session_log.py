@@ -0,0 +1,359 @@
+"""Định dạng ghi phiên landmark gọn (.vslr) để phát lại và benchmark không cần camera.
+
+Mỗi frame chỉ lưu thời điểm, có tay hay không và 21x3 landmark lượng tử hoá int16
+(round(giá trị * SESSION_LOG_SCALE)), kèm (tuỳ chọn) ảnh crop thu nhỏ tại lúc chốt ký tự.
+File gồm một header JSON rồi các khối nối tiếp, ghi dần khi đang chạy:
+
+    header   b'VSLRLOG1' | uint32 độ dài JSON | JSON (scale, crop_size, frame_shape, ...) | đệm tới bội 8
+    khối     b'CHNK' | kind | flags | count | raw_nbytes | stored_nbytes | t0 (float64) | payload
+      kind 0 (frame, count frame):  int32[count] thời điểm - t0 (micro giây)
+                                    int16[count, 21, 3] landmark
+                                    uint8[count] có tay
+      kind 1 (crop, một ảnh):       int64 chỉ số frame | 8 byte nhãn utf-8 | uint8[S, S, 3]
+
+Khối không nén được đọc thẳng từ mmap (np.frombuffer, không sao chép). Khối nén (flags 1)
+lưu landmark dạng delta theo thời gian, tách byte cao / thấp rồi zlib: 1 giờ ở 30 FPS luôn
+có tay (landmark giả lập, nhiễu độc lập từng điểm) ~50 byte/frame, 5.5 MB; không nén 131
+byte/frame, 14 MB (python -m benchmarks.bench_session_log).
+
+SessionLogWriter chỉ giữ tối đa SESSION_LOG_CHUNK_FRAMES frame trong bộ nhớ; khi chương
+trình dừng đột ngột chỉ mất khối đang đệm. Header được ghi cùng khối đầu tiên để kèm
+frame_shape (h, w, c) của frame camera lúc ghi: landmark chuẩn hoá theo rộng / cao của frame,
+phát lại cần đúng tỉ lệ đó để đặc trưng MLP landmark giống lúc chạy thật. SessionLog đọc danh
+sách khối khi mở và giải mã từng khối khi cần.
+
+Ví dụ:
+    with SessionLogWriter("session.vslr") as writer:
+        writer.record(timestamp, hands, frame.shape)     # mỗi frame, trong FrameProcessor
+        writer.record_crop(timestamp, image, bbox, "A")  # khi chốt ký tự
+    log = SessionLog("session.vslr")
+    for timestamp, present, landmarks in log: ...
+
+    python -m src.session_log session.vslr --to-npz session.npz
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from src.config import SESSION_LOG_CHUNK_FRAMES, SESSION_LOG_COMPRESS, SESSION_LOG_CROP_SIZE, SESSION_LOG_SCALE
+from src.hand_frame import NUM_LANDMARKS, square_region
+
+MAGIC = b'VSLRLOG1'
+CHUNK_MAGIC = b'CHNK'
+EXTENSION = '.vslr'
+VERSION = 1
+
+KIND_FRAMES, KIND_CROP = 0, 1
+FLAG_COMPRESSED = 1
+
+_LENGTH = struct.Struct('<I')
+_CHUNK = struct.Struct('<4sBB2xIII4xd')  # 32 byte
+_CROP = struct.Struct('<q8s')            # chỉ số frame, nhãn
+_LANDMARK_SHAPE = (NUM_LANDMARKS, 3)
+_INT16 = np.iinfo(np.int16)
+# Thời điểm trong khối lưu int32 micro giây tính từ t0: khối phải kết thúc trước ~35.8 phút
+_MAX_OFFSET = np.iinfo(np.int32).max / 1e6
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _shuffle(deltas):
+    """int16 -> byte thấp của mọi giá trị rồi byte cao (byte cao của delta nhỏ gần như toàn 0, nén tốt)."""
+    return np.ascontiguousarray(deltas.view(np.uint8).reshape(-1, 2).T).tobytes()
+
+
+def _unshuffle(data, count):
+    return np.frombuffer(data, dtype=np.uint8).reshape(2, -1).T.copy().view(np.int16).reshape(
+        (count,) + _LANDMARK_SHAPE)
+
+
+class SessionLogWriter:
+    def __init__(self, path, chunk_frames=SESSION_LOG_CHUNK_FRAMES, scale=SESSION_LOG_SCALE,
+                 compress=SESSION_LOG_COMPRESS, crop_size=SESSION_LOG_CROP_SIZE, frame_shape=None):
+        """
+        Args:
+            path (str): File .vslr, ghi đè nếu đã có.
+            chunk_frames (int): Số frame đệm tối đa trước khi ghi một khối.
+            scale (float): Hệ số lượng tử hoá landmark sang int16.
+            compress (bool): Nén zlib từng khối.
+            crop_size (int): Cạnh ảnh crop của record_crop, 0 để bỏ qua crop.
+            frame_shape (tuple): Shape frame camera (h, w, c); None thì lấy từ frame đầu tiên của record().
+        """
+        if chunk_frames < 1:
+            raise ValueError(f"chunk_frames phải >= 1: {chunk_frames}")
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.scale = float(scale)
+        self.compress = compress
+        self.crop_size = crop_size
+        self.timestamps = np.zeros(chunk_frames, dtype=np.float64)
+        self.landmarks = np.zeros((chunk_frames,) + _LANDMARK_SHAPE, dtype=np.int16)
+        self.present = np.zeros(chunk_frames, dtype=np.uint8)
+        self.count = 0
+        self.frames = 0
+        self.crops = 0
+        self.chunks = 0
+        self.bytes_written = 0
+        self.frame_shape = tuple(int(v) for v in frame_shape) if frame_shape is not None else None
+        self.header_written = False
+        self.file = open(path, 'wb')
+
+    def _write_header(self):
+        header = json.dumps({'version': VERSION, 'scale': self.scale, 'crop_size': self.crop_size,
+                             'chunk_frames': self.chunk_frames,
+                             'frame_shape': list(self.frame_shape) if self.frame_shape else None}).encode('utf-8')
+        self._write(MAGIC + _LENGTH.pack(len(header)) + header)
+        self._write(b'\0' * _padding(self.bytes_written))
+        self.header_written = True
+
+    def _write(self, data):
+        self.file.write(data)
+        self.bytes_written += len(data)
+
+    def add(self, timestamp, points):
+        """Thêm một frame: points (21, 3) toạ độ chuẩn hoá, None nếu không có tay."""
+        if self.count and abs(timestamp - self.timestamps[0]) >= _MAX_OFFSET:
+            # Khoảng nghỉ dài (vd dừng camera rồi bật lại): mở khối mới với t0 mới thay vì tràn int32
+            self.flush()
+        i = self.count
+        self.timestamps[i] = timestamp
+        if points is None:
+            self.present[i] = 0
+            # Giữ giá trị frame trước: delta bằng 0 khi nén, đọc ra sẽ là 0
+            self.landmarks[i] = self.landmarks[i - 1] if i else 0
+        else:
+            self.present[i] = 1
+            np.clip(np.rint(np.asarray(points, dtype=np.float32) * self.scale), _INT16.min, _INT16.max,
+                    out=self.landmarks[i], casting='unsafe')
+        self.count += 1
+        self.frames += 1
+        if self.count == self.chunk_frames:
+            self.flush()
+
+    def record(self, timestamp, hands, frame_shape=None):
+        """Ghi frame từ kết quả findHands (danh sách HandFrame), chỉ lưu bàn tay đầu tiên.
+
+        frame_shape là shape của frame đưa vào findHands; frame đầu tiên quyết định frame_shape của log.
+        """
+        if self.frame_shape is None:
+            shape = frame_shape if frame_shape is not None else (hands[0].image_shape if hands else None)
+            if shape is not None:
+                self.frame_shape = tuple(int(v) for v in shape)
+        self.add(timestamp, hands[0].points if hands else None)
+
+    def record_crop(self, timestamp, image, bbox, label):
+        """Lưu ảnh crop vuông quanh bbox thu nhỏ còn crop_size x crop_size, gắn với frame vừa ghi."""
+        if not self.crop_size or bbox is None:
+            return
+        import cv2
+
+        x1, y1, x2, y2 = square_region(bbox, image.shape, 1.2)
+        crop = cv2.resize(image[y1:y2, x1:x2], (self.crop_size, self.crop_size), interpolation=cv2.INTER_AREA)
+        header = _CROP.pack(self.frames - 1, str(label).encode('utf-8')[:8])
+        self._write_chunk(KIND_CROP, 1, timestamp, header + np.ascontiguousarray(crop).tobytes())
+        self.crops += 1
+
+    def _write_chunk(self, kind, count, t0, payload):
+        if not self.header_written:
+            self._write_header()
+        flags = 0
+        raw_nbytes = len(payload)
+        if self.compress:
+            payload = zlib.compress(payload, 6)
+            flags = FLAG_COMPRESSED
+        self._write(_CHUNK.pack(CHUNK_MAGIC, kind, flags, count, raw_nbytes, len(payload), t0))
+        self._write(payload)
+        self._write(b'\0' * _padding(len(payload)))
+        self.chunks += 1
+
+    def flush(self):
+        """Ghi các frame đang đệm thành một khối và đẩy xuống file."""
+        count = self.count
+        if count:
+            t0 = float(self.timestamps[0])
+            offsets = np.rint((self.timestamps[:count] - t0) * 1e6).astype(np.int32)
+            landmarks = self.landmarks[:count]
+            if self.compress:
+                deltas = np.diff(landmarks, axis=0, prepend=np.zeros((1,) + _LANDMARK_SHAPE, np.int16))
+                payload = offsets.tobytes() + _shuffle(deltas.astype(np.int16)) + self.present[:count].tobytes()
+            else:
+                payload = offsets.tobytes() + landmarks.tobytes() + self.present[:count].tobytes()
+            self._write_chunk(KIND_FRAMES, count, t0, payload)
+            self.count = 0
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        if not self.header_written:
+            self._write_header()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionLog:
+    """Đọc file .vslr qua mmap; khối được giải mã khi truy cập (chunk(), duyệt frame)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} không phải file log phiên ({EXTENSION})")
+        (length,) = _LENGTH.unpack_from(self.buffer, len(MAGIC))
+        start = len(MAGIC) + _LENGTH.size
+        self.meta = json.loads(bytes(self.buffer[start:start + length]).decode('utf-8'))
+        self.scale = self.meta['scale']
+        self.crop_size = self.meta['crop_size']
+        # Log ghi trước khi có frame_shape trong header: None, người đọc tự chọn mặc định
+        self.frame_shape = tuple(self.meta['frame_shape']) if self.meta.get('frame_shape') else None
+        self.frame_chunks = []  # (offset payload, count, flags, raw_nbytes, stored_nbytes, t0, frame đầu)
+        self.crop_chunks = []
+        self._scan(start + length + _padding(start + length))
+
+    def _scan(self, offset):
+        buffer = self.buffer
+        frames = 0
+        while offset + _CHUNK.size <= len(buffer):
+            magic, kind, flags, count, raw_nbytes, stored, t0 = _CHUNK.unpack_from(buffer, offset)
+            payload = offset + _CHUNK.size
+            if magic != CHUNK_MAGIC or payload + stored > len(buffer):
+                print(f"[WARNING] {self.path}: khối hỏng / ghi dở tại byte {offset}, bỏ qua phần sau")
+                break
+            entry = (payload, count, flags, raw_nbytes, stored, t0, frames)
+            if kind == KIND_FRAMES:
+                self.frame_chunks.append(entry)
+                frames += count
+            elif kind == KIND_CROP:
+                self.crop_chunks.append(entry)
+            offset = payload + stored + _padding(stored)
+        self.num_frames = frames
+
+    def __len__(self):
+        return self.num_frames
+
+    def _payload(self, entry):
+        payload, _, flags, raw_nbytes, stored, _, _ = entry
+        if flags & FLAG_COMPRESSED:
+            return zlib.decompress(self.buffer[payload:payload + stored], bufsize=raw_nbytes)
+        return memoryview(self.buffer)[payload:payload + stored]
+
+    def chunk_quantized(self, index):
+        """(thời điểm float64, có tay bool, landmark int16 (N, 21, 3)) của khối frame thứ index.
+
+        Với khối không nén, landmark và cờ có tay là view trên mmap (chỉ đọc).
+        """
+        entry = self.frame_chunks[index]
+        count, flags, t0 = entry[1], entry[2], entry[5]
+        data = self._payload(entry)
+        offsets = np.frombuffer(data, dtype=np.int32, count=count)
+        landmark_bytes = count * NUM_LANDMARKS * 3 * 2
+        if flags & FLAG_COMPRESSED:
+            landmarks = np.cumsum(_unshuffle(data[4 * count:4 * count + landmark_bytes], count), axis=0,
+                                  dtype=np.int16)
+        else:
+            landmarks = np.frombuffer(data, dtype=np.int16, count=count * NUM_LANDMARKS * 3,
+                                      offset=4 * count).reshape((count,) + _LANDMARK_SHAPE)
+        present = np.frombuffer(data, dtype=np.uint8, count=count, offset=4 * count + landmark_bytes).view(bool)
+        return t0 + offsets / 1e6, present, landmarks
+
+    def chunk(self, index):
+        """(thời điểm, có tay, landmark float32 (N, 21, 3)); frame không có tay có landmark 0."""
+        timestamps, present, landmarks = self.chunk_quantized(index)
+        landmarks = landmarks.astype(np.float32) / np.float32(self.scale)
+        landmarks[~present] = 0.0
+        return timestamps, present, landmarks
+
+    def __iter__(self):
+        """Lần lượt (thời điểm, có tay, landmark (21, 3)) từng frame, giải mã một khối mỗi lần."""
+        for index in range(len(self.frame_chunks)):
+            timestamps, present, landmarks = self.chunk(index)
+            for i in range(len(present)):
+                yield float(timestamps[i]), bool(present[i]), landmarks[i]
+
+    def crops(self):
+        """Lần lượt (chỉ số frame, thời điểm, nhãn, ảnh BGR (S, S, 3)) của các ảnh crop đã lưu."""
+        size = self.crop_size
+        for entry in self.crop_chunks:
+            data = self._payload(entry)
+            frame_index, label = _CROP.unpack_from(data, 0)
+            image = np.frombuffer(data, dtype=np.uint8, count=size * size * 3, offset=_CROP.size)
+            yield frame_index, entry[5], label.rstrip(b'\0').decode('utf-8'), image.reshape(size, size, 3)
+
+    def to_arrays(self):
+        """(landmarks (N, 21, 3) float32, present (N,), timestamps (N,)); frame_shape đọc riêng."""
+        chunks = [self.chunk(i) for i in range(len(self.frame_chunks))]
+        if not chunks:
+            return (np.zeros((0,) + _LANDMARK_SHAPE, np.float32), np.zeros(0, bool), np.zeros(0, np.float64))
+        timestamps, present, landmarks = (np.concatenate(parts) for parts in zip(*chunks))
+        return landmarks, present, timestamps
+
+    @property
+    def duration(self):
+        if not self.frame_chunks:
+            return 0.0
+        timestamps, _, _ = self.chunk_quantized(len(self.frame_chunks) - 1)
+        return float(timestamps[-1] - self.frame_chunks[0][5])
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            try:
+                self.buffer.close()
+            except BufferError:
+                pass  # Còn mảng trỏ vào mmap: ánh xạ được giải phóng khi các mảng đó bị thu hồi
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Xem / chuyển đổi file log phiên landmark (.vslr)")
+    parser.add_argument("path", help="File .vslr")
+    parser.add_argument("--to-npz", metavar="FILE", help="Xuất landmarks / present / timestamps / frame_shape ra .npz")
+    parser.add_argument("--crops", metavar="DIR", help="Lưu các ảnh crop ra thư mục (PNG)")
+    args = parser.parse_args()
+
+    with SessionLog(args.path) as log:
+        size = os.path.getsize(args.path)
+        duration = log.duration
+        landmarks, present, timestamps = log.to_arrays()
+        per_hour = f", ~{size / 1e6 / duration * 3600:.1f} MB/giờ" if duration >= 1.0 else ""
+        shape = 'x'.join(str(v) for v in log.frame_shape[1::-1]) if log.frame_shape else 'không rõ'
+        print(f"[INFO] {args.path}: {len(log)} frame ({int(present.sum())} có tay), {duration:.1f}s, frame {shape}, "
+              f"{len(log.crop_chunks)} ảnh crop, {size / 1e6:.2f} MB "
+              f"({size / max(len(log), 1):.1f} byte/frame{per_hour})")
+        if args.to_npz:
+            from src.replay import save_landmark_log
+
+            save_landmark_log(args.to_npz, landmarks, present, timestamps, log.frame_shape)
+            print(f"[INFO] Đã lưu {args.to_npz}")
+        if args.crops:
+            import cv2
+
+            os.makedirs(args.crops, exist_ok=True)
+            for frame_index, _, label, image in log.crops():
+                cv2.imwrite(os.path.join(args.crops, f"{frame_index:07d}_{label}.png"), image)
+            print(f"[INFO] Đã lưu {len(log.crop_chunks)} ảnh crop vào {args.crops}")
+
+
+if __name__ == "__main__":
+    main()
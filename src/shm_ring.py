@@ -0,0 +1,233 @@
+"""Vòng đệm frame trong shared memory giữa process đọc camera và process suy luận.
+
+Tách đọc camera và suy luận ra hai process (tránh GIL của phần glue Python quanh
+OpenCV / MediaPipe / PyTorch) chỉ có lợi nếu frame BGR 720p / 1080p (2.7 / 6.2 MB)
+không bị pickle qua pipe. SharedFrameRing cấp phát trước N ô frame trong một khối
+multiprocessing.shared_memory, mỗi ô có số thứ tự (seq) và thời điểm chụp:
+    - put(): process ghi sao chép frame vào ô cũ nhất (không bị reader giữ), không bao
+      giờ chờ reader: khi reader chậm, frame cũ nhất chưa đọc bị ghi đè (drop-oldest)
+    - get(): process đọc nhận NumPy view trỏ thẳng vào ô (không sao chép). Ô đang được
+      đọc được "giữ" (pinned) tới lần get() / release() kế tiếp nên writer không ghi đè
+
+Giao diện put(frame, timestamp) / get(last_seq, timeout) giống LatestFrameBuffer nên
+có thể thay thế cho nhau. Chỉ hỗ trợ một reader; khoá (multiprocessing.Lock) chỉ bảo
+vệ vài phép gán metadata, phần sao chép frame nằm ngoài khoá.
+
+Ví dụ:
+    ring = SharedFrameRing.create((720, 1280, 3), slots=4)
+    Process(target=capture_to_ring, args=(0, ring, stop_event)).start()
+    item = ring.get(last_seq, timeout=0.5)   # (seq, timestamp, view) hoặc None
+"""
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Chỉ số trong mảng điều khiển
+_WRITE_SEQ, _PINNED, _CLOSED = 0, 1, 2
+_ALIGN = 64
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedFrameRing:
+    def __init__(self, shape, slots, name, lock, cond, owner=False):
+        """Dùng SharedFrameRing.create() để tạo mới; process con nhận đối tượng qua tham số Process."""
+        if slots < 2:
+            raise ValueError(f"Cần ít nhất 2 ô (1 ô đang đọc + 1 ô để ghi): {slots}")
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.name = name
+        self.lock = lock
+        self.cond = cond
+        self.owner = owner
+        self.frame_bytes = int(np.prod(self.shape))
+        self.seqs_offset = _aligned(3 * 8)
+        self.stamps_offset = _aligned(self.seqs_offset + slots * 8)
+        self.frames_offset = _aligned(self.stamps_offset + slots * 8)
+        self.size = self.frames_offset + slots * self.frame_bytes
+        self._attach(create=owner)
+
+    @classmethod
+    def create(cls, shape, slots=4, context=None):
+        """Cấp phát khối shared memory cho slots frame uint8 kích thước shape (h, w, c)."""
+        context = context or mp.get_context()
+        lock = context.Lock()
+        return cls(shape, slots, None, lock, context.Condition(lock), owner=True)
+
+    def _attach(self, create):
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.size)
+            self.name = self.shm.name
+        else:
+            # Process con (fork / spawn) dùng chung resource_tracker với owner nên việc
+            # đăng ký lại khi gắn vào không làm khối nhớ bị xoá khi process con thoát
+            self.shm = shared_memory.SharedMemory(name=self.name)
+        buf = self.shm.buf
+        self.control = np.ndarray((3,), dtype=np.int64, buffer=buf)
+        self.seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=buf, offset=self.seqs_offset)
+        self.stamps = np.ndarray((self.slots,), dtype=np.float64, buffer=buf, offset=self.stamps_offset)
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=buf, offset=self.frames_offset)
+        if create:
+            self.control[:] = (0, -1, 0)
+            self.seqs[:] = 0
+            self.stamps[:] = 0.0
+        self.written = 0
+
+    def __getstate__(self):
+        # Khi spawn: process con gắn lại vào khối nhớ theo tên, không sở hữu / không xoá
+        return {'shape': self.shape, 'slots': self.slots, 'name': self.name, 'lock': self.lock, 'cond': self.cond}
+
+    def __setstate__(self, state):
+        self.__init__(state['shape'], state['slots'], state['name'], state['lock'], state['cond'], owner=False)
+
+    def put(self, frame, timestamp=None):
+        """Sao chép frame vào ô cũ nhất không bị giữ, trả về seq của frame."""
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame {frame.shape} khác kích thước ô {self.shape}")
+        with self.lock:
+            candidates = self.seqs.copy()
+            pinned = self.control[_PINNED]
+            if pinned >= 0:
+                candidates[pinned] = np.iinfo(np.int64).max
+            slot = int(candidates.argmin())
+            self.seqs[slot] = -1  # đang ghi: reader bỏ qua ô này
+        np.copyto(self.frames[slot], frame)
+        with self.cond:
+            seq = int(self.control[_WRITE_SEQ]) + 1
+            self.stamps[slot] = time.perf_counter() if timestamp is None else timestamp
+            self.seqs[slot] = seq
+            self.control[_WRITE_SEQ] = seq
+            self.cond.notify_all()
+        self.written += 1
+        return seq
+
+    def _pick(self, last_seq, latest):
+        """Chọn ô có seq > last_seq (mới nhất hoặc cũ nhất), gọi khi đang giữ khoá."""
+        seqs = self.seqs
+        mask = seqs > last_seq
+        if not mask.any():
+            return None
+        candidates = np.where(mask, seqs, -1 if latest else np.iinfo(np.int64).max)
+        return int(candidates.argmax() if latest else candidates.argmin())
+
+    def get(self, last_seq=0, timeout=None, latest=False):
+        """Chờ frame có seq > last_seq.
+
+        Args:
+            last_seq (int): seq của frame đã xử lý gần nhất.
+            timeout (float): Giây chờ tối đa, None để chờ mãi.
+            latest (bool): True lấy frame mới nhất (như LatestFrameBuffer), False lấy frame cũ
+                nhất chưa đọc (frame bị bỏ chỉ khi writer đã ghi đè).
+
+        Returns:
+            (seq, timestamp, frame) với frame là view vào ô nhớ dùng chung, có hiệu lực tới lần
+            get() / release() kế tiếp; None nếu hết thời gian chờ hoặc vòng đệm đã đóng.
+        """
+        with self.cond:
+            ready = self.cond.wait_for(
+                lambda: self.control[_CLOSED] or self._pick(last_seq, latest) is not None, timeout)
+            slot = self._pick(last_seq, latest) if ready else None
+            if slot is None:
+                self.control[_PINNED] = -1
+                return None
+            self.control[_PINNED] = slot
+            seq = int(self.seqs[slot])
+            timestamp = float(self.stamps[slot])
+        return seq, timestamp, self.frames[slot]
+
+    def release(self):
+        """Bỏ giữ ô vừa đọc (writer được phép ghi đè)."""
+        with self.lock:
+            self.control[_PINNED] = -1
+
+    @property
+    def closed(self):
+        return bool(self.control[_CLOSED])
+
+    def close(self):
+        """Đánh thức reader đang chờ và báo không còn frame mới."""
+        with self.cond:
+            self.control[_CLOSED] = 1
+            self.cond.notify_all()
+
+    def reset(self):
+        with self.lock:
+            self.control[:] = (0, -1, 0)
+            self.seqs[:] = 0
+
+    def dispose(self):
+        """Đóng ánh xạ của process này; owner xoá luôn khối nhớ."""
+        self.control = self.seqs = self.stamps = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingReader:
+    """Hàm đọc frame kế tiếp từ SharedFrameRing cho vòng lặp xử lý, đếm frame bị bỏ.
+
+    Mỗi lần gọi trả về view của frame (hợp lệ tới lần gọi sau), None khi ring đã đóng và hết frame.
+    """
+
+    def __init__(self, ring, latest=False, timeout=0.5):
+        self.ring = ring
+        self.latest = latest
+        self.timeout = timeout
+        self.last_seq = 0
+        self.dropped = 0
+        self.timestamp = None
+
+    def __call__(self):
+        while True:
+            item = self.ring.get(self.last_seq, self.timeout, latest=self.latest)
+            if item is not None:
+                seq, self.timestamp, frame = item
+                self.dropped += seq - self.last_seq - 1
+                self.last_seq = seq
+                return frame
+            if self.ring.closed:
+                return None
+
+
+def capture_to_ring(source, ring, stop_event, fps=None):
+    """Thân process đọc camera / video: đọc frame và ghi vào ring tới khi stop_event hoặc hết nguồn.
+
+    Frame khác kích thước ô được resize về ring.shape. Với file video, fps giữ nhịp như camera.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+    height, width = ring.shape[:2]
+    interval = 1.0 / fps if fps else 0.0
+    start = time.perf_counter()
+    frames = 0
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame.shape != ring.shape:
+                frame = cv2.resize(frame, (width, height))
+            ring.put(frame)
+            frames += 1
+            if interval:
+                time.sleep(max(0.0, start + frames * interval - time.perf_counter()))
+    finally:
+        cap.release()
+        ring.close()
+
+
+def probe_source(source):
+    """(height, width, 3) của frame đầu tiên của nguồn, None nếu không đọc được."""
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+    try:
+        ret, frame = cap.read()
+        return frame.shape if ret else None
+    finally:
+        cap.release()
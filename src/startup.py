@@ -0,0 +1,105 @@
+"""Tải và làm nóng (warm-up) các mô hình song song khi khởi động ứng dụng.
+
+MediaPipe, PyTorch và TensorFlow chỉ được import bên trong load_models() để cửa sổ
+hiện ra ngay. Các module nặng được import tuần tự (import đồng thời torch và
+TensorFlow từ nhiều thread có thể crash lúc khởi tạo thư viện native), sau đó ba
+mô hình được tạo đồng thời trên thread pool (phần lớn thời gian nằm trong mã
+C/C++ giải phóng GIL). Mỗi mô hình chạy một lần suy luận giả để trả
+trước chi phí khởi tạo đồ thị / bộ cấp phát trước khi xử lý frame thật.
+"""
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from src.config import TONE_FRAMES_COUNT
+
+# Thời điểm bắt đầu process, dùng để log time-to-window / time-to-first-result
+PROCESS_START = time.perf_counter()
+
+MODEL_NAMES = ('detector', 'classifier', 'tone_predictor')
+
+# Module nặng của từng mô hình, import tuần tự trước khi tải song song
+HEAVY_MODULES = ('src.hand_tracking', 'src.classification', 'src.landmark_classifier', 'src.tone_predictor')
+
+
+def since_start(t=None):
+    """Số giây từ lúc import module này (gần với lúc process khởi động)."""
+    return (t if t is not None else time.perf_counter()) - PROCESS_START
+
+
+def load_detector():
+    from src.hand_tracking import handDetector
+
+    detector = handDetector(maxHands=1)
+    detector.findHands(np.zeros((480, 640, 3), dtype=np.uint8), draw=False)
+    return detector
+
+
+def load_classifier():
+    from src.classification import Classifier
+    from src.landmark_classifier import load_cascade
+
+    classifier = load_cascade(Classifier())
+    classifier.predict_tensor(np.zeros((1, 3, 224, 224), dtype=np.float32))
+    if hasattr(classifier, 'fast'):
+        # Gọi thẳng MLP để không tính vào thống kê của cascade
+        classifier.fast.predict(np.zeros((21, 3), dtype=np.float32))
+    return classifier
+
+
+def load_tone_predictor():
+    from src.tone_predictor import TonePredictor
+
+    tone_predictor = TonePredictor()
+    if tone_predictor.runner is not None:
+        # 21 landmark x 3 toạ độ mỗi frame
+        tone_predictor.runner(np.zeros((1, TONE_FRAMES_COUNT, 63), dtype=np.float32))
+    return tone_predictor
+
+
+LOADERS = {
+    'detector': load_detector,
+    'classifier': load_classifier,
+    'tone_predictor': load_tone_predictor,
+}
+
+
+def import_heavy_modules():
+    """Import tuần tự các module nặng; lỗi ImportError để hàm tải tương ứng báo lại."""
+    for name in HEAVY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"[WARNING] Không import được {name}: {e}")
+            continue
+        print(f"[INFO] Import {name}: {time.perf_counter() - start:.2f}s")
+
+
+def load_models(on_progress=None, max_workers=len(MODEL_NAMES)):
+    """Tải + warm-up ba mô hình song song.
+
+    Args:
+        on_progress: Hàm on_progress(name, elapsed_s, done, total) gọi mỗi khi một mô hình sẵn sàng.
+            Được gọi tuần tự trên thread gọi load_models (vòng as_completed, vd QThread ModelLoader),
+            không phải trên thread của pool; với Qt vẫn phải chuyển sang GUI thread bằng signal.
+        max_workers: Số thread tải đồng thời; 1 để tải tuần tự.
+
+    Returns:
+        dict {'detector', 'classifier', 'tone_predictor'}. Lỗi của bất kỳ mô hình nào được ném lại.
+    """
+    models = {}
+    start = time.perf_counter()
+    import_heavy_modules()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='model-loader') as pool:
+        futures = {pool.submit(LOADERS[name]): name for name in MODEL_NAMES}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            models[name] = future.result()
+            elapsed = time.perf_counter() - start
+            print(f"[INFO] {name} sẵn sàng sau {elapsed:.2f}s ({done}/{len(MODEL_NAMES)})")
+            if on_progress is not None:
+                on_progress(name, elapsed, done, len(MODEL_NAMES))
+    return models
@@ -0,0 +1,184 @@
+"""Chuyển mô hình LSTM nhận diện thanh điệu sang TFLite và so sánh độ trễ.
+
+Các bước:
+    1. Trace mô hình h5 thành concrete function với đầu vào cố định (1, 30, 63).
+    2. Chuyển sang TFLite -> trained_models/lstm_model_final.tflite
+         - none   : float32
+         - float16: trọng số float16
+         - dynamic: trọng số int8, activation float
+         - int8   : lượng tử hoá toàn phần, hiệu chỉnh bằng chuỗi landmark đã ghi
+                    (file .npz của src.replay) hoặc dữ liệu giả nếu không có
+    3. So sánh độ trễ mỗi lần dự đoán và mức trùng khớp giữa model.predict,
+       tf.function và TFLite.
+
+Ví dụ:
+    python -m src.tflite_export --quantize dynamic --calibration logs/session.npz
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+import numpy as np
+
+from src.config import TONE_FRAMES_COUNT
+from src.tone_predictor import TonePredictor, default_tflite_path
+
+QUANTIZE_MODES = ('none', 'float16', 'dynamic', 'int8')
+
+
+def load_sequences(path, sequence_length=TONE_FRAMES_COUNT, stride=5, limit=None):
+    """Cắt log landmark (.npz của src.replay) thành các chuỗi (30, 63) liên tục có tay."""
+    from src.replay import load_landmark_log
+
+    landmarks, present, _, _ = load_landmark_log(path)
+    feats = landmarks.reshape(len(landmarks), -1).astype(np.float32)
+    sequences = []
+    for start in range(0, len(feats) - sequence_length + 1, stride):
+        if present[start:start + sequence_length].all():
+            sequences.append(feats[start:start + sequence_length])
+    return sequences[:limit] if limit else sequences
+
+
+def random_sequences(count, sequence_length=TONE_FRAMES_COUNT, features=63, seed=0):
+    """Chuỗi landmark giả (toạ độ chuẩn hoá trong [0, 1]) khi không có dữ liệu ghi."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.3, 0.7, size=(count, 1, features))
+    drift = np.cumsum(rng.normal(0, 0.01, size=(count, sequence_length, features)), axis=1)
+    return list((base + drift).astype(np.float32))
+
+
+def unrolled_copy(model):
+    """Bản sao mô hình với các lớp RNN unroll=True (cùng trọng số).
+
+    Chuỗi chỉ dài 30 bước nên unroll thay vòng WHILE bằng đồ thị phẳng: bộ hiệu chỉnh
+    int8 của TFLite bị crash trên vòng lặp LSTM, và bản unroll cũng chạy nhanh hơn.
+    """
+    config = model.get_config()
+    for layer in config['layers']:
+        if layer['class_name'] in ('LSTM', 'GRU', 'SimpleRNN'):
+            layer['config']['unroll'] = True
+    copy = model.__class__.from_config(config)
+    copy.set_weights(model.get_weights())
+    return copy
+
+
+def convert_tflite(model, tflite_path, quantize='none', sequences=None,
+                   sequence_length=TONE_FRAMES_COUNT):
+    """Chuyển mô hình Keras sang TFLite với batch cố định bằng 1."""
+    import tensorflow as tf
+
+    model = unrolled_copy(model)
+    spec = tf.TensorSpec([1, sequence_length, model.input_shape[-1]], tf.float32)
+    function = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+    # Không truyền model làm trackable_obj: converter sẽ đóng băng biến thành hằng số,
+    # tránh READ_VARIABLE bên trong vòng WHILE của LSTM (lỗi khi invoke)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([function.get_concrete_function()])
+
+    if quantize == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == 'dynamic':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif quantize == 'int8':
+        if not sequences:
+            raise ValueError("Lượng tử hoá int8 cần dữ liệu hiệu chỉnh")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([s[None]] for s in sequences)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    with open(tflite_path, 'wb') as f:
+        f.write(converter.convert())
+    size_kb = os.path.getsize(tflite_path) / 1024
+    print(f"[INFO] Đã xuất TFLite ({quantize}, {size_kb:.0f} KB): {tflite_path}")
+    return tflite_path
+
+
+def compare_backends(predictors, sequences, warmup=3):
+    """So sánh độ trễ mỗi lần dự đoán và mức trùng khớp với backend đầu tiên (tham chiếu).
+
+    Args:
+        predictors: dict {tên: TonePredictor}, phần tử đầu là tham chiếu.
+        sequences: danh sách chuỗi (30, 63).
+
+    Returns:
+        dict {tên backend: {'p50_ms', 'p95_ms', 'top1_agreement', 'max_prob_diff', 'mean_prob_diff'}}
+    """
+    batches = [s[None].astype(np.float32) for s in sequences]
+
+    def run(predictor):
+        for X in batches[:warmup]:
+            predictor.runner(X)
+        latencies, probs = [], []
+        for X in batches:
+            t0 = time.perf_counter()
+            out = predictor.runner(X)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            probs.append(np.asarray(out)[0])
+        return np.array(latencies), np.array(probs)
+
+    report = {}
+    ref_probs = None
+    for name, predictor in predictors.items():
+        lat, probs = run(predictor)
+        if ref_probs is None:
+            ref_probs = probs
+        diff = np.abs(probs - ref_probs)
+        report[name] = {
+            'p50_ms': float(np.percentile(lat, 50)),
+            'p95_ms': float(np.percentile(lat, 95)),
+            'top1_agreement': float(np.mean(probs.argmax(1) == ref_probs.argmax(1))),
+            'max_prob_diff': float(diff.max()),
+            'mean_prob_diff': float(diff.mean())
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{'backend':<12}{'p50 ms':>9}{'p95 ms':>9}{'top-1':>9}{'max Δp':>9}{'mean Δp':>10}")
+    for name, r in report.items():
+        print(f"{name:<12}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['top1_agreement'] * 100:>8.1f}%"
+              f"{r['max_prob_diff']:>9.4f}{r['mean_prob_diff']:>10.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chuyển mô hình LSTM sang TFLite và so sánh với model.predict")
+    parser.add_argument("--model", default="trained_models/lstm_model_final.h5")
+    parser.add_argument("--output", help="File .tflite (mặc định đặt cạnh mô hình h5)")
+    parser.add_argument("--quantize", choices=QUANTIZE_MODES, default='none')
+    parser.add_argument("--calibration", help="Log landmark .npz (src.replay) để hiệu chỉnh / đánh giá")
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument("--report", help="Ghi báo cáo so sánh ra file JSON")
+    args = parser.parse_args()
+
+    reference = TonePredictor(model_path=args.model, backend='keras')
+    if reference.model is None:
+        return
+
+    sequences = load_sequences(args.calibration, limit=args.calibration_size) if args.calibration else []
+    if not sequences:
+        print("[WARNING] Không có chuỗi landmark, dùng dữ liệu giả: chỉ số trùng khớp / hiệu chỉnh kém ý nghĩa")
+        sequences = random_sequences(100)
+
+    tflite_path = args.output or default_tflite_path(args.model)
+    convert_tflite(reference.model, tflite_path, args.quantize, sequences)
+
+    predictors = {
+        'keras': reference,
+        'function': TonePredictor(model_path=args.model, backend='function'),
+        'tflite': TonePredictor(model_path=args.model, backend='tflite', tflite_path=tflite_path)
+    }
+    report = compare_backends(predictors, sequences)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Đã ghi báo cáo vào: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,49 @@
 import os
 import numpy as np
-import tensorflow as tf
 import pickle
-from src.config import TONE_FRAMES_COUNT, TONE_CONFIDENCE_THRESHOLD
+from src.config import TONE_FRAMES_COUNT, TONE_CONFIDENCE_THRESHOLD, TONE_BACKEND, ARTIFACT_CACHE_ENABLED
+from src.numpy_lstm import NumpyLSTM, default_npz_path, default_encoder_path, load_classes
+
+# TensorFlow chỉ được import khi backend cần tới (import_tensorflow); backend 'numpy'
+# (hoặc 'tflite' qua tflite_runtime) chạy được khi không cài TensorFlow
+tf = None
+
+TONE_BACKENDS = ('keras', 'function', 'tflite', 'numpy')
+
+
+def import_tensorflow():
+    """Import TensorFlow lần đầu cần dùng, trả về None nếu chưa cài."""
+    global tf
+    if tf is None:
+        try:
+            import tensorflow
+        except ImportError:
+            return None
+        tf = tensorflow
+    return tf
+
+
+def default_tflite_path(model_path):
+    """File TFLite mặc định cạnh mô hình h5, vd. lstm_model_final.h5 -> lstm_model_final.tflite"""
+    return os.path.splitext(model_path)[0] + ".tflite"
+
 
 class TonePredictor:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=None, tflite_path=None):
         """Khởi tạo TonePredictor với mô hình LSTM.
         
         Args:
             model_path (str): Đường dẫn đến mô hình LSTM. Nếu None, sẽ sử dụng đường dẫn mặc định
+            backend (str): 'keras', 'function', 'tflite' hoặc 'numpy'. Mặc định lấy TONE_BACKEND trong config.
+                Khi chưa cài TensorFlow, 'keras' / 'function' tự chuyển sang 'numpy'
+            tflite_path (str): File .tflite cho backend 'tflite'. Mặc định đặt cạnh model_path
         """
         self.model = None
+        self.runner = None  # Hàm X (1, 30, 63) -> xác suất (1, số lớp) của backend đang dùng
+        self.engine = None  # NumpyLSTM của backend 'numpy', dùng cho start_stream()
+        self.backend = backend or TONE_BACKEND
+        if self.backend not in TONE_BACKENDS:
+            raise ValueError(f"Backend không hợp lệ: {self.backend} (hỗ trợ: {', '.join(TONE_BACKENDS)})")
         self.sequence_length = TONE_FRAMES_COUNT  # 30 frame
         self.prediction_threshold = TONE_CONFIDENCE_THRESHOLD  # 0.8
         
@@ -20,6 +52,9 @@ class TonePredictor:
             self.model_path = "trained_models/lstm_model_final.h5"
         else:
             self.model_path = model_path
+        self.tflite_path = tflite_path or default_tflite_path(self.model_path)
+        self.use_cache = ARTIFACT_CACHE_ENABLED and tflite_path is None
+        self.npz_path = default_npz_path(self.model_path)
             
         self.label_encoder = None
         self.classes = []  # Danh sách nhãn sau khi decode từ label_encoder
@@ -31,6 +66,26 @@ class TonePredictor:
 
     def load_model(self):
         """Tải mô hình LSTM và label encoder từ đường dẫn được chỉ định."""
+        if self.backend == 'tflite':
+            if not os.path.exists(self.tflite_path) and self.use_cache:
+                self.tflite_path = self.cached_artifact('tflite') or self.tflite_path
+            if self.load_tflite(self.tflite_path):
+                self.load_label_encoder()
+                return
+            print(f"[WARNING] Không dùng được backend tflite, chuyển về 'function'. "
+                  f"Tạo file bằng: python -m src.tflite_export --model {self.model_path}")
+            self.backend = 'function'
+
+        if self.backend != 'numpy' and import_tensorflow() is None:
+            print(f"[INFO] Chưa cài TensorFlow, dùng backend 'numpy' thay cho '{self.backend}'")
+            self.backend = 'numpy'
+
+        if self.backend == 'numpy':
+            if not os.path.exists(self.npz_path) and ARTIFACT_CACHE_ENABLED:
+                self.npz_path = self.cached_artifact('numpy') or self.npz_path
+            self.load_numpy(self.npz_path)
+            return
+
         if not os.path.exists(self.model_path):
             print(f"[ERROR] Không tìm thấy mô hình tại {self.model_path}!")
             return
@@ -82,24 +137,134 @@ class TonePredictor:
                 print(f"[INFO] Mô hình LSTM đã tải thành công!")
                 print(f"[INFO] Input shape: {self.model.input_shape}")
                 print(f"[INFO] Output shape: {self.model.output_shape}")
+                self.runner = self.build_runner()
             
-            # Tải label encoder
-            encoder_path = self.model_path.replace("_final.h5", "_label_encoder.pkl")
-            
-            if os.path.exists(encoder_path):
-                with open(encoder_path, "rb") as f:
-                    self.label_encoder = pickle.load(f)
-                    self.classes = list(self.label_encoder.classes_)
-                    print(f"[INFO] Label encoder đã tải: {self.classes}")
-            else:
-                print(f"[WARNING] Không tìm thấy label encoder tại {encoder_path}")
-                self.label_encoder = None
-                self.classes = []
-
-            print(f"[INFO] Số lớp dự đoán: {len(self.classes)}")
+            self.load_label_encoder()
         except Exception as e:
             print(f"[ERROR] Lỗi khi tải mô hình hoặc label encoder: {e}")
             self.model = None
+            self.runner = None
+
+    def cached_artifact(self, kind):
+        """File .npz ('numpy') hoặc .tflite ('tflite') trong ArtifactCache, tự tạo từ h5 nếu chưa có."""
+        if not os.path.exists(self.model_path):
+            return None
+        from src.artifact_cache import ArtifactCache
+
+        cache = ArtifactCache()
+        if kind == 'numpy':
+            from src.numpy_lstm import extract_weights, save_npz, load_encoder_classes
+
+            encoder_path = default_encoder_path(self.model_path)
+            if not os.path.exists(encoder_path):
+                return None
+            options = {'labels': cache.source_hash(encoder_path)}
+            suffix = '.npz'
+
+            def build(out_path):
+                save_npz(out_path, extract_weights(self.model_path), load_encoder_classes(encoder_path))
+        else:
+            if import_tensorflow() is None:
+                return None
+            from src.tflite_export import convert_tflite
+
+            options = {'quantize': 'none', 'tensorflow': tf.__version__}
+            suffix = '.tflite'
+
+            def build(out_path):
+                model = tf.keras.models.load_model(self.model_path, compile=False)
+                convert_tflite(model, out_path, quantize='none', sequence_length=self.sequence_length)
+
+        try:
+            return cache.get_or_build(self.model_path, kind, suffix, build, options)
+        except Exception as e:
+            print(f"[WARNING] Không tạo được artifact {kind} trong cache: {e}")
+            return None
+
+    def build_runner(self):
+        """Tạo hàm suy luận cho mô hình Keras theo backend đã chọn."""
+        if self.backend == 'keras':
+            return lambda X: self.model.predict(X, verbose=0)
+
+        # Trace một lần với shape cố định, tránh chi phí data adapter / callback của predict()
+        spec = tf.TensorSpec([None, self.sequence_length, self.model.input_shape[-1]], tf.float32)
+        function = tf.function(lambda x: self.model(x, training=False), input_signature=[spec])
+        function.get_concrete_function()
+        return lambda X: function(tf.constant(X, dtype=tf.float32)).numpy()
+
+    def load_tflite(self, tflite_path):
+        """Tạo TFLite Interpreter (ưu tiên tflite_runtime nếu có), trả về False nếu thiếu file."""
+        if not os.path.exists(tflite_path):
+            print(f"[WARNING] Không tìm thấy mô hình TFLite tại {tflite_path}")
+            return False
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            if import_tensorflow() is None:
+                print("[WARNING] Chưa cài tflite-runtime hoặc TensorFlow")
+                return False
+            Interpreter = tf.lite.Interpreter
+        interpreter = Interpreter(model_path=tflite_path)
+        interpreter.allocate_tensors()
+        input_detail = interpreter.get_input_details()[0]
+        output_detail = interpreter.get_output_details()[0]
+
+        def run(X):
+            X = X.astype(np.float32)
+            if input_detail['dtype'] != np.float32:
+                # Mô hình lượng tử hoá toàn phần: lượng tử hoá đầu vào theo scale / zero point
+                scale, zero_point = input_detail['quantization']
+                X = np.round(X / scale + zero_point).astype(input_detail['dtype'])
+            interpreter.set_tensor(input_detail['index'], X)
+            interpreter.invoke()
+            out = interpreter.get_tensor(output_detail['index'])
+            if output_detail['dtype'] != np.float32:
+                scale, zero_point = output_detail['quantization']
+                out = (out.astype(np.float32) - zero_point) * scale
+            return out
+
+        self.runner = run
+        print(f"[INFO] Đã tải mô hình LSTM (TFLite) từ: {tflite_path}")
+        return True
+
+    def load_numpy(self, npz_path):
+        """Tải trọng số LSTM đã trích ra .npz, suy luận bằng NumPy (không cần TensorFlow)."""
+        if not os.path.exists(npz_path):
+            print(f"[ERROR] Không tìm thấy trọng số NumPy tại {npz_path}. "
+                  f"Tạo file bằng: python -m src.numpy_lstm --model {self.model_path}")
+            return
+        try:
+            engine = NumpyLSTM(npz_path)
+        except (KeyError, ValueError) as e:
+            print(f"[ERROR] Lỗi khi tải trọng số NumPy {npz_path}: {e}")
+            return
+        self.engine = engine
+        self.runner = engine.predict
+        self.classes = engine.classes
+        print(f"[INFO] Đã tải mô hình LSTM (NumPy) từ: {npz_path}")
+        print(f"[INFO] Số lớp dự đoán: {len(self.classes)}")
+
+    def load_label_encoder(self):
+        """Tải danh sách nhãn: ưu tiên file .npz (dữ liệu thuần), sau đó label encoder pickle."""
+        if os.path.exists(self.npz_path):
+            self.classes = load_classes(self.npz_path)
+            print(f"[INFO] Nhãn đã tải từ {self.npz_path}: {self.classes}")
+            print(f"[INFO] Số lớp dự đoán: {len(self.classes)}")
+            return
+
+        encoder_path = default_encoder_path(self.model_path)
+        
+        if os.path.exists(encoder_path):
+            with open(encoder_path, "rb") as f:
+                self.label_encoder = pickle.load(f)
+                self.classes = list(self.label_encoder.classes_)
+                print(f"[INFO] Label encoder đã tải: {self.classes}")
+        else:
+            print(f"[WARNING] Không tìm thấy label encoder tại {encoder_path}")
+            self.label_encoder = None
+            self.classes = []
+
+        print(f"[INFO] Số lớp dự đoán: {len(self.classes)}")
 
     def preprocess_keypoints(self, keypoints_sequence):
         """Chuẩn hóa chuỗi keypoints cho dự đoán LSTM."""
@@ -117,7 +282,7 @@ class TonePredictor:
 
     def predict(self, keypoints_sequence):
         """Dự đoán dấu thanh từ chuỗi keypoints."""
-        if self.model is None:
+        if self.runner is None:
             print(f"[WARNING] Không thể dự đoán: Mô hình LSTM chưa được tải.")
             return None, 0.0
 
@@ -128,19 +293,97 @@ class TonePredictor:
         try:
             X = self.preprocess_keypoints(keypoints_sequence)
             
-            predictions = self.model.predict(X, verbose=0)[0]
-            predicted_idx = np.argmax(predictions)
-            confidence = predictions[predicted_idx]
-
-            if self.label_encoder:
-                predicted_label = self.label_encoder.inverse_transform([predicted_idx])[0]
-            else:
-                predicted_label = str(predicted_idx)  # fallback nếu thiếu label_encoder
-
-            self.current_prediction = predicted_label
-            self.current_confidence = confidence
+            predictions = self.runner(X)[0]
+            self.current_prediction, self.current_confidence = self.decode(predictions)
             
             return self.current_prediction, self.current_confidence
         except Exception as e:
             print(f"[ERROR] Lỗi khi dự đoán dấu thanh với mô hình LSTM: {e}")
             return None, 0.0
+
+    def decode(self, predictions):
+        """Xác suất (số lớp,) -> (nhãn, độ tin cậy)."""
+        predicted_idx = np.argmax(predictions)
+        confidence = predictions[predicted_idx]
+        if self.classes:
+            return self.classes[predicted_idx], confidence
+        return str(predicted_idx), confidence  # fallback nếu thiếu danh sách nhãn
+
+    def predict_batch(self, sequences):
+        """Dự đoán dấu thanh cho N chuỗi keypoints trong một lần gọi mô hình.
+
+        Trả về danh sách (nhãn, độ tin cậy) theo thứ tự đầu vào; chuỗi sai số frame cho
+        (None, 0.0). Mô hình TFLite có batch cố định bằng 1 nên chạy lần lượt từng chuỗi.
+        """
+        results = [(None, 0.0)] * len(sequences)
+        if self.runner is None:
+            print("[WARNING] Không thể dự đoán: Mô hình LSTM chưa được tải.")
+            return results
+        valid = [i for i, seq in enumerate(sequences) if len(seq) == self.sequence_length]
+        if len(valid) < len(sequences):
+            print(f"[WARNING] Bỏ qua {len(sequences) - len(valid)} chuỗi không đủ {self.sequence_length} frame")
+        if not valid:
+            return results
+        try:
+            X = np.concatenate([self.preprocess_keypoints(sequences[i]) for i in valid]).astype(np.float32)
+            if self.backend == 'tflite':
+                predictions = np.concatenate([self.runner(X[j:j + 1]) for j in range(len(valid))])
+            else:
+                predictions = self.runner(X)
+            for i, row in zip(valid, predictions):
+                results[i] = self.decode(row)
+        except Exception as e:
+            print(f"[ERROR] Lỗi khi dự đoán dấu thanh với mô hình LSTM: {e}")
+        return results
+
+    def start_stream(self):
+        """ToneStream mới cho một cử chỉ, None nếu backend không chạy được từng bước (chỉ 'numpy')."""
+        if self.engine is None or not self.engine.streamable:
+            return None
+        return ToneStream(self, self.engine)
+
+
+class ToneStream:
+    """Dự đoán dấu thanh tăng dần cho một cử chỉ: mỗi frame một bước LSTM, giữ (h, c) giữa các frame.
+
+    Sau mỗi push() có dự đoán trên các frame đã nhận (label, confidence). finish() đệm bằng frame
+    cuối tới sequence_length frame như finalize_tone_recognition, nên cho cùng kết quả với
+    TonePredictor.predict trên chuỗi đã đệm nhưng chỉ phải chạy nốt các bước đệm.
+
+    Trạng thái nằm hết trong stream, kết quả chỉ được trả về cho người gọi (không ghi vào
+    current_prediction của TonePredictor): nhiều phiên chạy stream song song trên cùng một
+    TonePredictor dùng chung không ảnh hưởng nhau.
+    """
+
+    def __init__(self, predictor, engine):
+        self.predictor = predictor
+        self.engine = engine
+        self.state = engine.initial_state()
+        self.hidden = None
+        self.last_frame = None
+        self.frames = 0
+        self.label = None
+        self.confidence = 0.0
+        self.stable_steps = 0  # Số bước liên tiếp dự đoán cùng nhãn label
+
+    def push(self, keypoints):
+        """Thêm một frame keypoints (21, 3), trả về (nhãn, độ tin cậy) trên các frame đã nhận."""
+        if self.frames >= self.predictor.sequence_length:
+            return self.label, self.confidence
+        self.last_frame = np.asarray(keypoints, dtype=np.float32).reshape(-1)
+        self.hidden = self.engine.step(self.last_frame, self.state)
+        self.frames += 1
+        label, confidence = self.predictor.decode(self.engine.head(self.hidden)[0])
+        self.stable_steps = self.stable_steps + 1 if label == self.label else 1
+        self.label, self.confidence = label, confidence
+        return label, confidence
+
+    def finish(self):
+        """Đệm bằng frame cuối tới sequence_length frame, trả về (nhãn, độ tin cậy) của cả chuỗi."""
+        if self.frames == 0:
+            return None, 0.0
+        for _ in range(self.predictor.sequence_length - self.frames):
+            self.hidden = self.engine.step(self.last_frame, self.state)
+        self.frames = self.predictor.sequence_length
+        self.label, self.confidence = self.predictor.decode(self.engine.head(self.hidden)[0])
+        return self.label, self.confidence
@@ -0,0 +1,187 @@
+"""Huấn luyện và xuất MLP phân loại ký tự từ landmark cho đường nhanh.
+
+Dữ liệu vào (một trong hai):
+    --images DIR      thư mục ảnh chia theo lớp (DIR/A/*.jpg, DIR/B/*.jpg, ...);
+                      landmark được trích bằng MediaPipe (static_image_mode).
+    --landmarks FILE  file .npz có 'landmarks' (N, 21, 3), 'labels' (N,) tên lớp và
+                      'aspects' (N,) tỉ lệ rộng / cao của ảnh gốc (thiếu thì coi là 1.0).
+
+Toạ độ MediaPipe chuẩn hoá theo rộng / cao của từng ảnh, nên đặc trưng được tính kèm
+tỉ lệ ảnh (landmark_features(..., aspect)) giống lúc suy luận trên frame camera.
+
+Kết quả: file .npz (mặc định trained_models/landmark_mlp.npz) gồm trọng số, danh
+sách lớp và các lớp "dễ nhầm" (độ chính xác validation thấp) để luôn chuyển sang ResNet50.
+
+Ví dụ:
+    python -m src.train_landmark_classifier --images dataset/train --epochs 300
+"""
+import argparse
+import os
+
+import numpy as np
+
+from src.config import CLASSES, LANDMARK_MODEL_PATH
+from src.landmark_classifier import FEATURE_VERSION, landmark_features, LandmarkClassifier
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def extract_from_images(image_dir):
+    """Trích landmark từ thư mục ảnh chia theo lớp, bỏ qua ảnh không thấy tay.
+
+    Returns:
+        (landmarks (N, 21, 3), labels (N,), aspects (N,) tỉ lệ rộng / cao của từng ảnh)
+    """
+    import cv2
+    import mediapipe as mp
+
+    hands = mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=1, min_detection_confidence=0.5)
+    landmarks, labels, aspects = [], [], []
+    for label in CLASSES:
+        class_dir = os.path.join(image_dir, label)
+        if not os.path.isdir(class_dir):
+            print(f"[WARNING] Thiếu thư mục lớp: {class_dir}")
+            continue
+        found = 0
+        for name in sorted(os.listdir(class_dir)):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            img = cv2.imread(os.path.join(class_dir, name))
+            if img is None:
+                continue
+            results = hands.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            if results.multi_hand_landmarks:
+                lms = results.multi_hand_landmarks[0].landmark
+                landmarks.append([[lm.x, lm.y, lm.z] for lm in lms])
+                labels.append(label)
+                aspects.append(img.shape[1] / img.shape[0])
+                found += 1
+        print(f"[INFO] {label}: {found} mẫu")
+    hands.close()
+    return np.array(landmarks, dtype=np.float32), np.array(labels), np.array(aspects, dtype=np.float32)
+
+
+def augment(feats, rng, noise=0.01, max_angle=15.0, scale_range=0.1):
+    """Xoay nhẹ trong mặt phẳng ảnh, co giãn và thêm nhiễu cho đặc trưng đã chuẩn hoá."""
+    pts = feats.reshape(-1, 21, 3).copy()
+    theta = np.deg2rad(rng.uniform(-max_angle, max_angle, size=len(pts)))
+    cos, sin = np.cos(theta), np.sin(theta)
+    x, y = pts[..., 0].copy(), pts[..., 1].copy()
+    pts[..., 0] = cos[:, None] * x - sin[:, None] * y
+    pts[..., 1] = sin[:, None] * x + cos[:, None] * y
+    pts *= rng.uniform(1 - scale_range, 1 + scale_range, size=(len(pts), 1, 1))
+    pts += rng.normal(0, noise, size=pts.shape)
+    return pts.reshape(len(pts), -1).astype(np.float32)
+
+
+def train(features, targets, hidden=(128, 64), epochs=300, lr=1e-3, batch_size=256, seed=0):
+    """Huấn luyện MLP bằng PyTorch, trả về danh sách (W, b) dạng NumPy (W có shape (vào, ra))."""
+    import torch
+    import torch.nn as nn
+
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    sizes = [features.shape[1], *hidden, len(CLASSES)]
+    layers = []
+    for i in range(len(sizes) - 1):
+        layers.append(nn.Linear(sizes[i], sizes[i + 1]))
+        if i < len(sizes) - 2:
+            layers.append(nn.ReLU())
+    model = nn.Sequential(*layers)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr, weight_decay=1e-4)
+    loss_fn = nn.CrossEntropyLoss()
+    y = torch.from_numpy(targets.astype(np.int64))
+
+    for epoch in range(epochs):
+        model.train()
+        x = torch.from_numpy(augment(features, rng))
+        order = torch.randperm(len(x))
+        total = 0.0
+        for start in range(0, len(x), batch_size):
+            idx = order[start:start + batch_size]
+            optimizer.zero_grad()
+            loss = loss_fn(model(x[idx]), y[idx])
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(idx)
+        if (epoch + 1) % 50 == 0:
+            print(f"[INFO] Epoch {epoch + 1}/{epochs}, loss {total / len(x):.4f}")
+
+    linears = [m for m in model if isinstance(m, nn.Linear)]
+    return [(m.weight.detach().numpy().T.copy(), m.bias.detach().numpy().copy()) for m in linears]
+
+
+def save_model(path, params, ambiguous):
+    arrays = {'num_layers': np.array(len(params)), 'classes': np.array(CLASSES),
+              'ambiguous': np.array(sorted(ambiguous), dtype=str), 'feature_version': np.array(FEATURE_VERSION)}
+    for i, (w, b) in enumerate(params):
+        arrays[f'W{i}'] = w.astype(np.float32)
+        arrays[f'b{i}'] = b.astype(np.float32)
+    np.savez(path, **arrays)
+    print(f"[INFO] Đã lưu mô hình landmark vào: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Huấn luyện MLP phân loại ký tự từ landmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images", help="Thư mục ảnh chia theo lớp")
+    source.add_argument("--landmarks", help="File .npz có 'landmarks' và 'labels'")
+    parser.add_argument("--output", default=LANDMARK_MODEL_PATH)
+    parser.add_argument("--save-landmarks", help="Lưu landmark đã trích từ ảnh ra .npz để dùng lại")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--val-split", type=float, default=0.2)
+    parser.add_argument("--ambiguous-accuracy", type=float, default=0.95,
+                        help="Lớp có độ chính xác validation thấp hơn ngưỡng này luôn dùng ResNet50")
+    args = parser.parse_args()
+
+    if args.images:
+        landmarks, labels, aspects = extract_from_images(args.images)
+        if args.save_landmarks:
+            np.savez_compressed(args.save_landmarks, landmarks=landmarks, labels=labels, aspects=aspects)
+    else:
+        data = np.load(args.landmarks)
+        landmarks, labels = data['landmarks'].astype(np.float32), data['labels'].astype(str)
+        if 'aspects' in data:
+            aspects = data['aspects'].astype(np.float32)
+        else:
+            print(f"[WARNING] {args.landmarks} không có 'aspects', coi mọi ảnh là vuông (1.0)")
+            aspects = np.ones(len(landmarks), dtype=np.float32)
+    if len(landmarks) == 0:
+        print("[ERROR] Không có dữ liệu huấn luyện")
+        return
+
+    targets = np.array([CLASSES.index(label) for label in labels])
+    features = landmark_features(landmarks, aspects)
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(features))
+    n_val = int(len(order) * args.val_split)
+    val_idx, train_idx = order[:n_val], order[n_val:]
+
+    params = train(features[train_idx], targets[train_idx], epochs=args.epochs)
+    save_model(args.output, params, ambiguous=[])
+
+    # Đánh giá trên tập validation, đánh dấu các lớp dễ nhầm. Lớp không có mẫu validation
+    # (kể cả khi không có tập validation hay lớp thiếu trong dữ liệu) chưa được đo độ chính xác
+    # nên cũng bị coi là dễ nhầm: đường nhanh luôn chuyển lớp đó sang ResNet50
+    ambiguous = []
+    result = LandmarkClassifier(args.output).predict(landmarks[val_idx], aspects[val_idx]) if n_val else None
+    if n_val:
+        correct = result.indices == targets[val_idx]
+        print(f"[INFO] Độ chính xác validation: {correct.mean() * 100:.1f}%")
+    for i, label in enumerate(CLASSES):
+        mask = targets[val_idx] == i
+        if not mask.any():
+            print(f"    {label:<8} không có mẫu validation")
+            ambiguous.append(label)
+            continue
+        acc = correct[mask].mean()
+        confident = (result.confidences[mask] >= 0.98).mean()
+        print(f"    {label:<8} acc {acc * 100:5.1f}%  tự tin {confident * 100:5.1f}%  ({mask.sum()} mẫu)")
+        if acc < args.ambiguous_accuracy:
+            ambiguous.append(label)
+    save_model(args.output, params, ambiguous)
+    print(f"[INFO] Lớp dễ nhầm (luôn dùng ResNet50): {ambiguous or 'không có'}")
+
+
+if __name__ == "__main__":
+    main()